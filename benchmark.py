@@ -0,0 +1,140 @@
+import logging
+import os
+import random
+import tempfile
+import timeit
+import simulation.calculations
+from simulation import TYPES, TYPE_CHART, get_type_effectiveness, OutcomeNode, decide_option, decide_option_pruned, \
+    load_prediction_model, set_static_option_order, set_debug_logging, searchCounters, SplitReason
+from tests.conftest import make_random_state
+
+
+# Times type effectiveness lookups against the old approach, where calculate_damage, attacks_to_consider and
+# switches_to_consider built the nested type chart dict on every call. Returns (old, new) microseconds per lookup.
+def benchmark_type_chart(lookups=20000):
+    generator = random.Random(0)
+    attackTypes = TYPES + ['freeze-dry']
+    cases = [(generator.choice(attackTypes), generator.sample(TYPES, generator.choice([1, 2])))
+             for i in range(lookups)]
+    # The old functions had the chart as a dict literal, which is rebuilt each time its code is evaluated
+    chartLiteral = compile(repr({attackType: dict(zip(TYPES, row)) for attackType, row in
+                                 zip(attackTypes, TYPE_CHART.tolist())}), 'typeChart', 'eval')
+
+    def old_lookup(attack_type, defender_types):
+        typeChart = eval(chartLiteral)
+        typeEffectiveness = 1
+        for defenderType in defender_types:
+            typeEffectiveness *= typeChart[attack_type][defenderType]
+        return typeEffectiveness
+
+    for attackType, defenderTypes in cases:
+        if old_lookup(attackType, defenderTypes) != get_type_effectiveness(attackType, defenderTypes):
+            raise Exception('Type chart lookups differ for ' + attackType + ' against ' + str(defenderTypes))
+    oldTime = timeit.timeit(lambda: [old_lookup(*case) for case in cases], number=1)
+    newTime = timeit.timeit(lambda: [get_type_effectiveness(*case) for case in cases], number=1)
+    return oldTime / lookups * 1e6, newTime / lookups * 1e6
+
+
+# Returns the number of outcomes in the tree below the outcome, including the outcome
+def count_nodes(outcome):
+    count = 0
+    stack = [outcome]
+    while stack:
+        node = stack.pop()
+        count += 1
+        stack += node.children
+    return count
+
+
+# Runs decide_option_pruned on random battle states with and without static option ordering. Returns a dict of
+# ordering -> (nodes created, nodes searched up to and including the best option, replies searched), summed over the
+# states. The best option is the same either way, since the pruned search always finds decide_option's top option.
+def benchmark_option_order(states=10, turn_depth=1, model_name='model3'):
+    predictionFunction, scalar = load_prediction_model(model_name)
+    results = {}
+    for staticOptionOrder in [False, True]:
+        set_static_option_order(staticOptionOrder)
+        nodesCreated = 0
+        nodesToBestOption = 0
+        repliesSearched = 0
+        for seed in range(states):
+            rootNode = OutcomeNode(make_random_state(seed), 1, SplitReason.ROOT)
+            startNodes = searchCounters['nodes']
+            decisionList = decide_option_pruned(rootNode, turn_depth, predictionFunction, scalar)
+            nodesCreated += searchCounters['nodes'] - startNodes
+            # The root's children are my options, in the order they were searched
+            bestChoice = decisionList[0].parent
+            for myChoice in rootNode.children:
+                nodesToBestOption += count_nodes(myChoice)
+                if myChoice is bestChoice:
+                    break
+            repliesSearched += sum(len(myChoice.children) for myChoice in rootNode.children)
+        results[staticOptionOrder] = (nodesCreated, nodesToBestOption, repliesSearched)
+    set_static_option_order(False)
+    return results
+
+
+# Times the string building each outcome used to do against the split reason codes and debug logging check it does now.
+# Outcomes built their split reason string when they were created, and use_move built and logged a line at the info
+# level, which main.py writes to log.txt, for every move it simulated. The moves simulated per node are counted from the
+# lines a search logs with debug logging on. Returns (old, new) microseconds per node, and the moves simulated per node.
+def benchmark_hot_path_logging(repeats=20000, states=5, turn_depth=1, model_name='model3'):
+    battleState = make_random_state(0)
+    attacker = battleState.myTeam[0]
+    defender = battleState.opponentTeam[0]
+    move = attacker.knownMoves[0]
+    simulationLogger = logging.getLogger('simulation')
+    predictionFunction, scalar = load_prediction_model(model_name)
+    with tempfile.TemporaryDirectory() as directory:
+        logPath = os.path.join(directory, 'log.txt')
+        handler = logging.FileHandler(logPath)
+        simulationLogger.addHandler(handler)
+        set_debug_logging(True)
+        nodesCreated = 0
+        for seed in range(states):
+            rootNode = OutcomeNode(make_random_state(seed), 1, SplitReason.ROOT)
+            startNodes = searchCounters['nodes']
+            decide_option(rootNode, turn_depth, predictionFunction, scalar)
+            nodesCreated += searchCounters['nodes'] - startNodes
+        handler.flush()
+        with open(logPath) as file:
+            movesPerNode = sum(1 for line in file) / nodesCreated
+
+        set_debug_logging(False)
+        simulationLogger.setLevel(logging.INFO)
+
+        def old_split_reason():
+            return attacker.name + "'s " + move.name + ' KOd ' + defender.name
+
+        def new_split_reason():
+            return SplitReason.KNOCKED_OUT, (attacker.name, move.name, defender.name)
+
+        def old_move_logging():
+            simulationLogger.info('Calculating ' + attacker.name + ' using ' + move.name + ' against ' + defender.name)
+
+        # The same check use_move makes, on the module's flag
+        def new_move_logging():
+            if simulation.calculations.debugLogging:
+                simulationLogger.debug('Calculating %s using %s against %s', attacker.name, move.name, defender.name)
+
+        times = [timeit.timeit(function, number=repeats) / repeats * 1e6 for function in
+                 [old_split_reason, new_split_reason, old_move_logging, new_move_logging]]
+        simulationLogger.removeHandler(handler)
+        handler.close()
+    set_debug_logging(False)
+    return times[0] + movesPerNode * times[2], times[1] + movesPerNode * times[3], movesPerNode
+
+
+if __name__ == '__main__':
+    oldTime, newTime = benchmark_type_chart()
+    print('Type chart: ' + str(round(oldTime, 3)) + 'us per lookup rebuilding the chart, ' + str(round(newTime, 3))
+          + 'us per lookup with the shared chart (' + str(round(oldTime / newTime)) + 'x faster)')
+    orderResults = benchmark_option_order()
+    for staticOptionOrder, label in [(False, 'Unordered options'), (True, 'Static option order')]:
+        nodesCreated, nodesToBestOption, repliesSearched = orderResults[staticOptionOrder]
+        print(label + ': ' + str(nodesCreated) + ' nodes created, ' + str(nodesToBestOption) +
+              ' nodes to the best option, ' + str(repliesSearched) + ' replies searched')
+    oldTime, newTime, movesPerNode = benchmark_hot_path_logging()
+    print('Hot path logging: ' + str(round(oldTime, 3)) + 'us per node building split reason strings and logging ' +
+          str(round(movesPerNode, 2)) + ' moves per node, ' + str(round(newTime, 3)) + 'us per node with split reason '
+          'codes and debug logging off')
@@ -1,21 +1,76 @@
 import asyncio
 import logging
 import os
-import pickle
 import time
 import webInterface
-from simulation import OutcomeNode, decide_option
+from simulation import OutcomeNode, decide_option, decide_option_batched, decide_option_iterative, \
+    decide_option_pruned, decide_option_parallel, decide_option_mcts, create_search_pool, load_prediction_model, \
+    TranspositionTable, SearchStatistics, write_search_metrics, enable_damage_cache, enable_turn_cache, \
+    set_min_branch_probability, set_option_selection, set_static_option_order, set_max_opponent_replies, \
+    set_min_move_probability, set_debug_logging, make_decision_records, SplitReason
 from selenium.webdriver.chrome.service import Service
 from webdriver_manager.chrome import ChromeDriverManager
 from selenium import webdriver
 import traceback
-from tensorflow import keras
-from pickle import load
 from simulation import save_results
 from dotenv import load_dotenv
 
 
 TURN_DEPTH = 1
+# EXHAUSTIVE scores each leaf as it is reached, BATCHED expands the whole tree and scores every leaf in one model call.
+# ITERATIVE searches deeper and deeper, up to MAX_TURN_DEPTH, until TURN_TIME_BUDGET seconds have passed.
+# PRUNED stops searching my options once they can't beat the best option found so far. It picks the same top option as
+# EXHAUSTIVE. PRUNE_ROOT_OPTIONS applies the same pruning to each depth of ITERATIVE.
+# PARALLEL searches each of my options in its own process, using SEARCH_WORKERS processes.
+# MCTS samples the tree to MAX_TURN_DEPTH for TURN_TIME_BUDGET seconds, or MCTS_MAX_ITERATIONS iterations if it is set.
+# MCTS_EXPLORATION weighs trying less visited options against the best options found so far.
+# Scores backed up past depth 1 are sums over every leaf below an outcome, rather than averages, so ITERATIVE and the
+# deeper searches are left to be turned on here.
+SEARCH_MODE = 'EXHAUSTIVE'
+MAX_TURN_DEPTH = 3
+TURN_TIME_BUDGET = 8
+PRUNE_ROOT_OPTIONS = True
+# When True, options are searched in the order of a static damage, KO, speed and hazard estimate instead of the order
+# they're listed in. It changes which options PRUNED cuts off and MCTS tries first, but not the top option found.
+# benchmark.py compares the nodes searched with and without it.
+STATIC_OPTION_ORDER = False
+# Most opponent replies searched each turn. The replies with the highest static damage and matchup estimate are kept,
+# along with any attack expected to KO my lead. The rest aren't scored, so the worst case found can miss a reply the
+# model would score lower, such as a switch. Keep it None, which searches every reply, unless the search is too slow.
+MAX_OPPONENT_REPLIES = None
+# Unrevealed opponent moves less likely than this to be in their set, going by their possible sets and what has been
+# revealed, aren't searched. With a number, moves their set can't hold are never searched. None searches every possible
+# move.
+MIN_MOVE_PROBABILITY = None
+SEARCH_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+MCTS_MAX_ITERATIONS = None
+MCTS_EXPLORATION = 1
+# When True, the scalar is folded into the model so leaves are scored without a scalar.transform call
+USE_INFERENCE_BUNDLE = False
+# Backend for the .h5 models. NUMPY runs the network with NumPy, KERAS loads it through TensorFlow.
+INFERENCE_BACKEND = 'KERAS'
+# Most battle states kept in each turn's transposition table
+TRANSPOSITION_TABLE_SIZE = 100000
+# When True, calculate_damage results are kept in an LRU cache of DAMAGE_CACHE_SIZE entries, and its hit rate is logged
+# each turn. Not used by the PARALLEL search processes.
+USE_DAMAGE_CACHE = False
+DAMAGE_CACHE_SIZE = 50000
+# When True, simulated turns are kept in an LRU cache of TURN_CACHE_SIZE entries between turns, so the turns below the
+# options played last turn are copied instead of simulated again. Turns are cached before MIN_BRANCH_PROBABILITY drops
+# any outcomes, and pruned once copied, so with it set, turns are pruned at the end of the turn instead of after each
+# move. Each entry takes around 50KB. Not used by the PARALLEL search processes.
+USE_TURN_CACHE = False
+TURN_CACHE_SIZE = 5000
+# Outcomes less likely than this, counted from the start of the turn, are dropped from the search and the outcomes next
+# to them are scaled up to make up the probability. 0 keeps every outcome.
+MIN_BRANCH_PROBABILITY = 0
+# How my option is picked from each turn's payoff matrix. MAXIMIN assumes my opponent replies to the option I pick,
+# EQUILIBRIUM plays the turn as a simultaneous move game. PRUNED and PARALLEL use MAXIMIN at the root either way.
+OPTION_SELECTION = 'MAXIMIN'
+# Each turn's search statistics and cache counters are appended to this file as a line of JSON. None turns it off.
+METRICS_FILE = None
+# When True, the simulation logs a debug line to log.txt for every move it simulates. This slows the search down.
+DEBUG_LOGGING = False
 
 
 async def main():
@@ -58,15 +113,24 @@ async def main():
     with open('log.txt', 'w'):
         pass
     logging.basicConfig(filename='log.txt', encoding='utf-8', level=logging.INFO)
-    if MODEL_NAME in ['model1', 'model2']:
-        path = os.path.dirname(__file__) + '/battle_ai/models/' + MODEL_NAME + '.h5'
-        model = keras.models.load_model(path)
-        prediction_function = model.predict
-    else:
-        with open('battle_ai/models/' + MODEL_NAME + '.pkl', 'rb') as file:
-            model = pickle.load(file)
-            prediction_function = model.predict_proba
-    scalar = load(open('battle_ai/models/scalar.pkl', 'rb'))
+    set_debug_logging(DEBUG_LOGGING)
+    # With an inference bundle the scalar is folded into the model, and scalar is None
+    prediction_function, scalar = load_prediction_model(MODEL_NAME, INFERENCE_BACKEND, USE_INFERENCE_BUNDLE)
+    damageCache = None
+    if USE_DAMAGE_CACHE:
+        damageCache = enable_damage_cache(DAMAGE_CACHE_SIZE)
+    turnCache = None
+    if USE_TURN_CACHE:
+        turnCache = enable_turn_cache(TURN_CACHE_SIZE)
+    set_min_branch_probability(MIN_BRANCH_PROBABILITY)
+    set_option_selection(OPTION_SELECTION)
+    set_static_option_order(STATIC_OPTION_ORDER)
+    set_max_opponent_replies(MAX_OPPONENT_REPLIES)
+    set_min_move_probability(MIN_MOVE_PROBABILITY)
+    if SEARCH_MODE == 'PARALLEL':
+        searchPool = create_search_pool(SEARCH_WORKERS, MODEL_NAME, INFERENCE_BACKEND, USE_INFERENCE_BUNDLE,
+                                        MIN_BRANCH_PROBABILITY, OPTION_SELECTION, MAX_OPPONENT_REPLIES,
+                                        MIN_MOVE_PROBABILITY)
 
     chrome_options = webdriver.ChromeOptions()
     chrome_options.add_argument("--mute-audio")
@@ -104,7 +168,56 @@ async def main():
                 if webInterface.check_for_multi_turn_moves(driver):
                     continue
                 currentBattleState = await webInterface.getBattleState(driver, currentBattleState, current_elo, USER_NAME)
-                decision_list = decide_option(OutcomeNode(currentBattleState, 1, 'Root'), TURN_DEPTH, prediction_function, scalar)
+                rootNode = OutcomeNode(currentBattleState, 1, SplitReason.ROOT)
+                transpositionTable = TranspositionTable(TRANSPOSITION_TABLE_SIZE)
+                searchStatistics = SearchStatistics()
+                searchStatistics.start()
+                if damageCache is not None:
+                    damageCache.reset_counters()
+                if turnCache is not None:
+                    turnCache.reset_counters()
+                if SEARCH_MODE == 'BATCHED':
+                    decision_list = decide_option_batched(rootNode, TURN_DEPTH, prediction_function, scalar,
+                                                          transpositionTable)
+                elif SEARCH_MODE == 'EXHAUSTIVE':
+                    decision_list = decide_option(rootNode, TURN_DEPTH, prediction_function, scalar,
+                                                  transpositionTable)
+                elif SEARCH_MODE == 'ITERATIVE':
+                    decision_list = decide_option_iterative(rootNode, MAX_TURN_DEPTH, TURN_TIME_BUDGET,
+                                                            prediction_function, scalar, transpositionTable,
+                                                            PRUNE_ROOT_OPTIONS, searchStatistics)
+                elif SEARCH_MODE == 'PRUNED':
+                    decision_list = decide_option_pruned(rootNode, TURN_DEPTH, prediction_function, scalar,
+                                                         transpositionTable, None, searchStatistics)
+                elif SEARCH_MODE == 'PARALLEL':
+                    decision_list = decide_option_parallel(rootNode, TURN_DEPTH, prediction_function, scalar,
+                                                           searchPool, searchStatistics)
+                elif SEARCH_MODE == 'MCTS':
+                    decision_list = decide_option_mcts(rootNode, MAX_TURN_DEPTH, TURN_TIME_BUDGET, prediction_function,
+                                                       scalar, transpositionTable, MCTS_MAX_ITERATIONS,
+                                                       MCTS_EXPLORATION)
+                else:
+                    raise Exception('Invalid SEARCH_MODE entered. '
+                                    '(Either enter BATCHED, EXHAUSTIVE, ITERATIVE, PRUNED, PARALLEL or MCTS)')
+                searchStatistics.stop()
+                searchStatistics.add_cache(transpositionTable)
+                logging.info(str(transpositionTable))
+                # Only the decisions are kept, the search tree is released and the table is cleared
+                decision_list = make_decision_records(decision_list, transpositionTable, searchStatistics)
+                logging.info(str(searchStatistics))
+                if damageCache is not None:
+                    searchStatistics.add_cache(damageCache)
+                    logging.info(str(damageCache))
+                if turnCache is not None:
+                    searchStatistics.add_cache(turnCache)
+                    logging.info(str(turnCache))
+                if METRICS_FILE is not None:
+                    write_search_metrics(METRICS_FILE, searchStatistics, {
+                        'turn': currentBattleState.turnNumber, 'model': MODEL_NAME, 'searchMode': SEARCH_MODE,
+                        'turnDepth': MAX_TURN_DEPTH if SEARCH_MODE in ['ITERATIVE', 'MCTS'] else TURN_DEPTH,
+                        'options': len(decision_list)})
+                if decision_list:
+                    logging.info('Expected line: ' + str(decision_list[0]))
                 # Select best option from decision list. If False is returned, try next best option.
                 option_selected = False
                 for i in range(len(decision_list)):
@@ -141,6 +254,10 @@ async def main():
 
         time.sleep(15)
     driver.close()
+    if SEARCH_MODE == 'PARALLEL':
+        searchPool.shutdown()
     exit()
 
-asyncio.run(main())
+# Search worker processes import this module, so only the main process runs the bot
+if __name__ == '__main__':
+    asyncio.run(main())
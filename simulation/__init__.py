@@ -1,2 +1,12 @@
 from .calculations import *
 from .statistics import *
+from .search import *
+from .features import *
+from .inference import *
+from .transposition import *
+from .typechart import *
+from .damage import *
+from .mcts import *
+from .equilibrium import *
+from .sets import *
+from .splitreason import *
@@ -1,12 +1,59 @@
 import logging
-from copy import deepcopy
+import time
+from collections import Counter
 import numpy as np
 import pandas as pd
 import webInterface
+from .features import FeatureLayout
+from .transposition import get_battle_state_fingerprint, get_simulation_fingerprint, make_subtree_entry, \
+    graft_subtree_entry, TranspositionTable
+from .typechart import get_type_effectiveness
+from .damage import FIXED_DAMAGE_MOVES, get_damage_distributions, get_ko_outcomes
+from .equilibrium import solve_matrix_game
+from .sets import get_likely_moves, get_move_probabilities
+from .splitreason import SplitReason
+
+
+# Running totals of the outcome nodes created, turns simulated, outcomes merged, outcomes pruned and the probability
+# discarded with them, battle states copied, damage calculations run, calls to the prediction function and the rows
+# they scored, read by SearchStatistics. The times are the seconds spent in simulate_turn, encoding and scaling feature
+# rows, the prediction function, and backing scores up through select_option_outcomes and score_option_pairs.
+searchCounters = {'nodes': 0, 'turns': 0, 'merged': 0, 'pruned': 0, 'discarded': 0, 'copies': 0, 'damage': 0,
+                  'modelCalls': 0, 'rows': 0, 'simulationTime': 0, 'encodingTime': 0, 'inferenceTime': 0,
+                  'backupTime': 0}
+# Damage results from calculate_damage_core, keyed by get_damage_key. None until enable_damage_cache is called. The
+# keys are made of values rather than objects, so the cache can be kept between turns.
+damageCache = None
+# Unpruned outcomes of simulate_turn, keyed by the simulation fingerprint of the battle state and both options. None
+# until enable_turn_cache is called. It is kept between turns, so the turns simulated below the options played last
+# turn are grafted from the cache instead of simulated again.
+turnCache = None
+# Outcomes less likely than this are dropped after each move. Set with set_min_branch_probability, 0 keeps every outcome.
+minBranchProbability = 0
+# How my option and the opponent's reply are picked from the payoff matrix of a turn. MAXIMIN assumes the opponent sees
+# my option before replying, EQUILIBRIUM treats the turn as simultaneous and plays the mixed Nash equilibrium. Set with
+# set_option_selection.
+OPTION_SELECTIONS = ['MAXIMIN', 'EQUILIBRIUM']
+optionSelection = 'MAXIMIN'
+# When True, turn options without a stored order are searched in the order of their static score. Set with
+# set_static_option_order.
+staticOptionOrder = False
+# Most opponent replies searched each turn, picked by their static score. Set with set_max_opponent_replies, None
+# searches every reply. The replies dropped aren't scored by the model, so nothing bounds how much worse they could be
+# for me than the replies searched, and it stays None unless it's set.
+maxOpponentReplies = None
+# Opponent moves less likely than this to be in the opponent's set aren't searched. Moves no set could hold are only
+# searched while it is None, which searches every possible move. Set with set_min_move_probability.
+minMoveProbability = None
+# Logger for the simulation's hot path. Its messages are only built while debugLogging is set with set_debug_logging,
+# so they cost one check when it's off.
+simulationLogger = logging.getLogger('simulation')
+debugLogging = False
 
 
 class OutcomeNode:
-    def __init__(self, parent, probability, split_reason):
+    def __init__(self, parent, probability, split_reason, split_details=()):
+        searchCounters['nodes'] += 1
         # If root node
         if isinstance(parent, webInterface.BattleState):
             self.battleState = parent
@@ -16,12 +63,15 @@ class OutcomeNode:
             self.opponentSelectedOption = None
         elif isinstance(parent, OutcomeNode):
             self.parent = parent
-            self.battleState = deepcopy(parent.battleState)
-            parent.addChild(self)
+            self.battleState = parent.battleState.copy()
+            searchCounters['copies'] += 1
             self.probability = probability * parent.probability  # Range between 0 and 1
             self.mySelectedOption = parent.mySelectedOption
             self.opponentSelectedOption = parent.opponentSelectedOption
         self.children = []
+        # The leaves below this outcome, as a dict used as an ordered set. It is kept up to date as the tree changes, so
+        # the frontier is read without walking the tree, and is None while the outcome is a leaf.
+        self.leaves = None
         if probability > 1:
             self.probability = 1
         elif probability < 0:
@@ -32,50 +82,93 @@ class OutcomeNode:
         self.myForcedSwitch = False
         self.forcedSwitchChoice = None
         self.opponentForcedSwitch = False
+        # A SplitReason, and the names describe_split fills its description in with
         self.split_reason = split_reason
+        self.splitDetails = split_details
+        if self.parent is not None:
+            parent.addChild(self)
 
     def addChild(self, childOutcome):
+        if not self.children:
+            # This outcome stops being a leaf
+            if self.parent is not None:
+                self.parent.discard_leaf(self)
+            self.leaves = {}
         self.children.append(childOutcome)
+        for leaf in childOutcome.get_children():
+            self.add_leaf(leaf)
+
+    # Removes a child and the leaves below it. If no children are left, the outcome is a leaf again.
+    def remove_child(self, childOutcome):
+        self.children.remove(childOutcome)
+        for leaf in childOutcome.get_children():
+            self.discard_leaf(leaf)
+        if not self.children:
+            self.leaves = None
+            if self.parent is not None:
+                self.parent.add_leaf(self)
+
+    # Replaces the outcome's children, and the leaves below it with theirs
+    def set_children(self, children):
+        oldLeaves = self.get_children()
+        self.children = list(children)
+        self.rebuild_leaves()
+        if self.parent is not None:
+            for leaf in oldLeaves:
+                self.parent.discard_leaf(leaf)
+            for leaf in self.get_children():
+                self.parent.add_leaf(leaf)
+
+    # Sets the outcome's leaves from its children's
+    def rebuild_leaves(self):
+        if not self.children:
+            self.leaves = None
+            return
+        self.leaves = {}
+        for child in self.children:
+            if child.children:
+                self.leaves.update(child.leaves)
+            else:
+                self.leaves[child] = None
+
+    # Adds a leaf to the leaves of this outcome and its ancestors
+    def add_leaf(self, leaf):
+        ancestor = self
+        while ancestor is not None:
+            ancestor.leaves[leaf] = None
+            ancestor = ancestor.parent
+
+    # Removes a leaf from the leaves of this outcome and its ancestors
+    def discard_leaf(self, leaf):
+        ancestor = self
+        while ancestor is not None:
+            ancestor.leaves.pop(leaf, None)
+            ancestor = ancestor.parent
 
     def get_children(self):
         if not self.children:
             return [self]
-        returnList = []
-        for child in self.children:
-            returnList += child.get_children()
-        return returnList
+        return list(self.leaves)
 
     def get_non_end_children(self):
         if not self.children:
-            if not self.endNode:
-                return [self]
-            else:
-                return []
-        returnList = []
-        for child in self.children:
-            childNodes = child.get_non_end_children()
-            returnList += childNodes
-        return returnList
+            return [] if self.endNode else [self]
+        return [leaf for leaf in self.leaves if not leaf.endNode]
 
+    # Returns the leaves still being simulated this turn, from every branch below the outcome. The next stage of a move,
+    # and the second move of the turn, are simulated from these.
     def get_non_frozen_children(self):
         if not self.children:
-            if not self.frozen and not self.endNode:
-                return [self]
-            else:
-                return []
-        returnList = []
-        for child in self.children:
-            childNodes = child.get_non_frozen_children()
-        returnList += childNodes
-        return returnList
+            return [] if self.frozen or self.endNode else [self]
+        return [leaf for leaf in self.leaves if not leaf.frozen and not leaf.endNode]
 
     def freeze_node(self):
         self.frozen = True
 
+    # Unfreezes the leaves below the outcome. Only leaves are frozen, since a frozen outcome isn't expanded.
     def unfreeze_nodes(self):
-        self.frozen = False
-        for child in self.children:
-            child.unfreeze_nodes()
+        for leaf in self.get_children():
+            leaf.frozen = False
 
     def set_as_endNode(self):
         self.endNode = True
@@ -96,79 +189,377 @@ class OutcomeNode:
         self.opponentSelectedOption = option
 
 
-# Takes an outcome object, and returns the best perceived possible outcome for the current turn
-def decide_option(outcome, turn_depth, prediction_function, scalar):
-    myPossibleOptions = []
-    opponentPossibleOptions = []
+# Breaks the links between the outcomes of the tree below outcome and drops their battle states, so the tree is freed as
+# soon as it is unreferenced instead of waiting for the garbage collector to find the parent and child cycles. Returns
+# the number of outcomes released.
+def release_tree(outcome):
+    released = 0
+    stack = [outcome]
+    while stack:
+        node = stack.pop()
+        stack += node.children
+        node.children = []
+        node.leaves = None
+        node.parent = None
+        node.battleState = None
+        released += 1
+    return released
+
+
+# Raised when a search passes its deadline
+class SearchTimeout(Exception):
+    pass
+
+
+# Takes an outcome object, and returns the best perceived possible outcome for the current turn. If a transposition
+# table is given, leaf scores and option ordering found earlier this turn are reused.
+# If a deadline (a time.perf_counter() value) is given, SearchTimeout is raised once it has passed.
+def decide_option(outcome, turn_depth, prediction_function, scalar, transposition_table=None, deadline=None):
+    if deadline is not None and time.perf_counter() > deadline:
+        raise SearchTimeout('Search deadline passed')
+    return expand_option(outcome, turn_depth, prediction_function, scalar, transposition_table, deadline)
+
+
+# Searches the outcome to the given depth. Used by decide_option.
+def expand_option(outcome, turn_depth, prediction_function, scalar, transposition_table, deadline):
     # Check if myself or opponent needs to switch in and look at possible switch options
     if not outcome.battleState.myTeam[outcome.battleState.myLeadIndex].inBattle:
-        # Get possible switch options
-        switch_options = check_for_switch_options(outcome.battleState.myTeam, outcome.battleState.myLeadIndex)
+        myPossibleOptions = get_my_forced_switch_options(outcome.battleState)
         # If I have no lead, and no switch options, I've lost
-        if not switch_options:
+        if not myPossibleOptions:
             outcome.set_score(0)
             return [outcome]
-        opponentLead = outcome.battleState.opponentTeam[outcome.battleState.opponentLeadIndex]
-        switch_options = switches_to_consider(switch_options, opponentLead, opponentLead.possibleMoves)
-        for option in switch_options:
-            optionTuple = (None, webInterface.get_pokemon_index(outcome.battleState.myTeam, option.name))
-            myPossibleOptions.append(optionTuple)
 
         # Find the best possible switch
         possibleOutcomes = []
         for myOption in myPossibleOptions:
-            newNode = OutcomeNode(outcome, 1, 'My forced switch. Index: ' + str(myOption[1]))
+            newNode = OutcomeNode(outcome, 1, SplitReason.MY_FORCED_SWITCH, (myOption[1],))
             newNode.set_my_selected_option(myOption)
             simulate_switch(newNode, True, myOption[1])
-            possibleOutcomes.append(decide_option(newNode, turn_depth - 1, prediction_function, scalar)[0])
+            possibleOutcomes.append(decide_option(newNode, turn_depth - 1, prediction_function, scalar,
+                                                  transposition_table, deadline)[0])
         for possibleOutcome in possibleOutcomes:
-            calculate_score(possibleOutcome, prediction_function, scalar)
+            calculate_score(possibleOutcome, prediction_function, scalar, transposition_table)
         mySelectedOutcome = get_best_case(possibleOutcomes)
         # Remove the other options from the children list
-        mySelectedOutcome.parent.children = [mySelectedOutcome]
+        mySelectedOutcome.parent.set_children([mySelectedOutcome])
         return [mySelectedOutcome]
 
     if not outcome.battleState.opponentTeam[outcome.battleState.opponentLeadIndex].inBattle:
-        # Get known possible switch options
-        switch_options = check_for_switch_options(outcome.battleState.opponentTeam, outcome.battleState.opponentLeadIndex)
-        optionIndex = 0
-        endPoint = len(switch_options)
-        while optionIndex < endPoint:
-            if not switch_options[optionIndex].isRevealed:
-                switch_options.remove(switch_options[optionIndex])
-                endPoint -= 1
-            else:
-                optionIndex += 1
+        opponentPossibleOptions = get_opponent_forced_switch_options(outcome.battleState)
         # If opponent has no lead, and no switch options, I've won
-        if not switch_options:
+        if not opponentPossibleOptions:
             outcome.set_score(1)
             return [outcome]
-        for option in switch_options:
-            optionTuple = (None, webInterface.get_pokemon_index(outcome.battleState.opponentTeam, option.name))
-            opponentPossibleOptions.append(optionTuple)
 
         # Find the best possible switch
         possibleOutcomes = []
         for opponentOption in opponentPossibleOptions:
-            newNode = OutcomeNode(outcome, 1, 'Opponent forced switch. Index: ' + str(opponentOption[1]))
+            newNode = OutcomeNode(outcome, 1, SplitReason.OPPONENT_FORCED_SWITCH, (opponentOption[1],))
             newNode.set_oppponent_selected_option(opponentOption)
             simulate_switch(newNode, False, opponentOption[1])
-            possibleOutcomes.append(decide_option(newNode, turn_depth, prediction_function, scalar)[-1])
+            possibleOutcomes.append(decide_option(newNode, turn_depth, prediction_function, scalar,
+                                                  transposition_table, deadline)[-1])
         for possibleOutcome in possibleOutcomes:
-            calculate_score(possibleOutcome, prediction_function, scalar)
+            calculate_score(possibleOutcome, prediction_function, scalar, transposition_table)
         opponentSelectedOutcome = get_worst_case(possibleOutcomes)
-        opponentSelectedOutcome.parent.children = [opponentSelectedOutcome]
+        opponentSelectedOutcome.parent.set_children([opponentSelectedOutcome])
         return [opponentSelectedOutcome]
 
     # Terminal Condition
     if turn_depth <= 0:
         return [outcome]
 
+    myPossibleOptions, opponentPossibleOptions, orderKey = get_ordered_turn_options(outcome, transposition_table)
+
+    # Calculate possible outcomes if no switch is needed. The outcomes of the whole payoff matrix are scored together.
+    optionMatrix = []
+    optionPairs = []
+    for myOption in myPossibleOptions:
+        oppOptionOutcomes = []
+        myChoice = OutcomeNode(outcome, 1, SplitReason.MY_TURN_DECISION)
+        myChoice.set_my_selected_option((myOption[0], myOption[1]))
+        for opponentOption in opponentPossibleOptions:
+            optionPair = expand_option_pair(myChoice, myOption, opponentOption, turn_depth, prediction_function,
+                                            scalar, transposition_table, deadline)
+            oppOptionOutcomes.append(optionPair[0])
+            optionPairs.append(optionPair)
+        optionMatrix.append(oppOptionOutcomes)
+    score_option_pairs(optionPairs, prediction_function, scalar, transposition_table)
+    myOptionOutcomes = select_option_outcomes(optionMatrix)
+    store_option_order(orderKey, myOptionOutcomes, transposition_table)
+    return myOptionOutcomes
+
+
+# Simulates the turn for my option against one opponent option, searches the resulting outcomes and returns the
+# opponent choice node, scored with the average of the outcomes.
+def search_option_pair(myChoice, myOption, opponentOption, turn_depth, prediction_function, scalar,
+                       transposition_table, deadline):
+    optionPair = expand_option_pair(myChoice, myOption, opponentOption, turn_depth, prediction_function, scalar,
+                                    transposition_table, deadline)
+    score_option_pairs([optionPair], prediction_function, scalar, transposition_table)
+    return optionPair[0]
+
+
+# Simulates the turn for my option against one opponent option and searches the resulting outcomes. Returns the
+# opponent choice node and the outcomes to score it with.
+def expand_option_pair(myChoice, myOption, opponentOption, turn_depth, prediction_function, scalar,
+                       transposition_table, deadline):
+    myLead = myChoice.parent.battleState.myTeam[myChoice.parent.battleState.myLeadIndex]
+    opponentLead = myChoice.parent.battleState.opponentTeam[myChoice.parent.battleState.opponentLeadIndex]
+    opponentChoice = OutcomeNode(myChoice, 1, SplitReason.OPPONENT_TURN_DECISION)
+    opponentChoice.set_oppponent_selected_option((opponentOption[0], opponentOption[1]))
+    nodeList = simulate_turn(opponentChoice, myLead, opponentLead,
+                             myOption[0], opponentOption[0], myOption[1], opponentOption[1])
+    possibleOutcomes = []
+    for possibleOutcome in nodeList:
+        possibleOutcomes.append(decide_option(possibleOutcome, turn_depth - 1, prediction_function, scalar,
+                                              transposition_table, deadline)[0])
+    return opponentChoice, possibleOutcomes
+
+
+# Scores the outcomes of every (opponent choice, outcomes) pair with one call to the prediction function, and scores
+# each opponent choice with the average of its outcomes
+def score_option_pairs(option_pairs, prediction_function, scalar, transposition_table):
+    outcomeList = [possibleOutcome for opponentChoice, possibleOutcomes in option_pairs
+                   for possibleOutcome in possibleOutcomes]
+    for possibleOutcome, score in zip(outcomeList, calculate_scores(outcomeList, prediction_function, scalar,
+                                                                    transposition_table)):
+        possibleOutcome.set_score(score)
+    startTime = time.perf_counter()
+    for opponentChoice, possibleOutcomes in option_pairs:
+        opponentChoice.set_score(get_average_score(possibleOutcomes))
+    searchCounters['backupTime'] += time.perf_counter() - startTime
+
+
+# Returns my options and my opponent's options for the outcome, and the table key for their order. If the battle
+# state has been searched before this turn, the options are put in the order they finished in that search. Otherwise,
+# with staticOptionOrder set, my options are put best first and my opponent's most threatening first.
+def get_ordered_turn_options(outcome, transposition_table):
+    myPossibleOptions, opponentPossibleOptions = get_turn_options(outcome)
+    if staticOptionOrder:
+        myPossibleOptions = sort_options_by_static_score(outcome.battleState, myPossibleOptions, True)
+        opponentPossibleOptions = sort_options_by_static_score(outcome.battleState, opponentPossibleOptions, False)
+    if transposition_table is None:
+        return myPossibleOptions, opponentPossibleOptions, None
+    orderKey = ('Order', get_battle_state_fingerprint(outcome.battleState))
+    optionOrder = transposition_table.get(orderKey)
+    if optionOrder is not None:
+        myPossibleOptions = order_options(myPossibleOptions, optionOrder[0])
+        opponentPossibleOptions = order_options(opponentPossibleOptions, optionOrder[1])
+    return myPossibleOptions, opponentPossibleOptions, orderKey
+
+
+# Stores my options best first, and the opponent's replies to my best option worst (for me) first, for the next
+# search of this battle state
+def store_option_order(order_key, my_option_outcomes, transposition_table):
+    if transposition_table is None or not my_option_outcomes:
+        return
+    opponentReplies = sorted(my_option_outcomes[0].parent.children, key=lambda node: node.score)
+    transposition_table.put(order_key,
+                            ([get_option_key(node.mySelectedOption) for node in my_option_outcomes],
+                             [get_option_key(node.opponentSelectedOption) for node in opponentReplies]))
+
+
+# Returns a hashable key for an option tuple of (move, switch index)
+def get_option_key(option):
+    if option[0] is None:
+        return None, option[1]
+    return option[0].name, option[1]
+
+
+# Returns the options sorted by the given list of option keys. Options not in the list keep their order, at the end.
+def order_options(options, option_keys):
+    rank = {optionKey: i for i, optionKey in enumerate(option_keys)}
+    return sorted(options, key=lambda option: rank.get(get_option_key(option), len(rank)))
+
+
+# Sets whether turn options are searched in the order of their static score
+def set_static_option_order(static_option_order):
+    global staticOptionOrder
+    staticOptionOrder = static_option_order
+
+
+# Sets the most opponent replies searched each turn. None searches every reply.
+def set_max_opponent_replies(max_opponent_replies):
+    global maxOpponentReplies
+    maxOpponentReplies = max_opponent_replies
+
+
+# Sets the least likely an unrevealed opponent move can be to be in their set and still be searched. None searches every
+# possible move.
+def set_min_move_probability(min_move_probability):
+    global minMoveProbability
+    minMoveProbability = min_move_probability
+
+
+# Turns the simulation's debug logging on or off. While it's on, the simulation logger logs at the debug level, and a
+# line is logged for every move simulated.
+def set_debug_logging(enabled):
+    global debugLogging
+    debugLogging = enabled
+    simulationLogger.setLevel(logging.DEBUG if enabled else logging.NOTSET)
+
+
+# Returns the maxOpponentReplies opponent options with the highest static score, along with any other attack the static
+# estimate expects to KO my lead. The KO threats are the only part of the worst case the static estimate can vouch for,
+# since it is in HP fractions and the worst case is in model scores. The options keep their order.
+def narrow_opponent_replies(battleState, opponent_options):
+    kept = set(id(option) for option in
+               sort_options_by_static_score(battleState, opponent_options, False)[:maxOpponentReplies])
+    myLead = battleState.myTeam[battleState.myLeadIndex]
+    opponentLead = battleState.opponentTeam[battleState.opponentLeadIndex]
+    hpRemaining = get_ko_threshold(myLead)
+    for option in opponent_options:
+        if id(option) in kept or option[0] is None:
+            continue
+        damage = get_static_damage(opponentLead, myLead, option[0], battleState.myField, battleState)
+        if damage is not None and damage >= hpRemaining:
+            kept.add(id(option))
+    return [option for option in opponent_options if id(option) in kept]
+
+
+# Returns the options sorted by get_option_static_score, highest first
+def sort_options_by_static_score(battleState, options, isMyOption):
+    if isMyOption:
+        attacker = battleState.myTeam[battleState.myLeadIndex]
+        defender = battleState.opponentTeam[battleState.opponentLeadIndex]
+        attackerField = battleState.myField
+        defenderField = battleState.opponentField
+    else:
+        attacker = battleState.opponentTeam[battleState.opponentLeadIndex]
+        defender = battleState.myTeam[battleState.myLeadIndex]
+        attackerField = battleState.opponentField
+        defenderField = battleState.myField
+    webInterface.calculate_effective_stats(attacker, attackerField, battleState)
+    webInterface.calculate_effective_stats(defender, defenderField, battleState)
+    scores = {id(option): get_option_static_score(battleState, option, attacker, defender, attackerField,
+                                                  defenderField, isMyOption) for option in options}
+    return sorted(options, key=lambda option: scores[id(option)], reverse=True)
+
+
+# Returns a cheap estimate of how good the option is for the player picking it, in fractions of HP. An attack scores its
+# expected damage to the defender, plus 1 if it is expected to KO before the defender moves, or .5 if it KOs after.
+# The opponent's attacks are weighted by the probability they're in the opponent's set. Status moves score 0. A switch
+# scores how much less damage the defender's strongest attack would do to the pokemon switching in than to the attacker,
+# less the HP the hazards on its side would take.
+def get_option_static_score(battleState, option, attacker, defender, attacker_field, defender_field, isMyOption):
+    move, switchIndex = option
+    if move is None:
+        team = battleState.myTeam if isMyOption else battleState.opponentTeam
+        switchTarget = webInterface.peek_member(team, switchIndex)
+        score = -get_hazard_cost(switchTarget, attacker_field['entryHazards'])
+        # Pokemon which haven't been in battle may not have effective stats yet
+        if switchTarget.effectiveStats['HP'] is None:
+            return score
+        defenderMoves = get_static_move_list(defender, not isMyOption)
+        return score + get_static_threat(defender, attacker, defenderMoves, attacker_field, battleState) - \
+            get_static_threat(defender, switchTarget, defenderMoves, attacker_field, battleState)
+    damage = get_static_damage(attacker, defender, move, defender_field, battleState)
+    if damage is None:
+        return 0
+    hpRemaining = get_ko_threshold(defender)
+    accuracy = 1 if move.accuracy is None else move.accuracy / 100
+    score = accuracy * min(damage / hpRemaining, 1) if hpRemaining > 0 else accuracy
+    if damage >= hpRemaining:
+        score += accuracy if moves_first(attacker, defender, move, battleState) else accuracy * .5
+    if not isMyOption:
+        score *= get_move_probabilities(attacker).get(move.name, 1)
+    return score
+
+
+# Returns the damage the move would do at an average roll without a crit, or None for status moves
+def get_static_damage(attacker, defender, move, defender_field, battleState):
+    if move.damage_class.name == 'status' or (move.power is None and move.name not in FIXED_DAMAGE_MOVES):
+        return None
+    return get_damage_result(attacker, defender, move, False, defender_field, battleState)[0]
+
+
+# Returns the moves the pokemon is expected to pick from, the same way get_turn_options does
+def get_static_move_list(pokemon, isMyPokemon):
+    if isMyPokemon or len(pokemon.knownMoves) >= 4:
+        return pokemon.knownMoves
+    return get_likely_moves(pokemon, minMoveProbability)
+
+
+# Returns the highest expected damage any of the moves would do to the defender, as a fraction of its remaining HP
+def get_static_threat(attacker, defender, move_list, defender_field, battleState):
+    hpRemaining = get_ko_threshold(defender)
+    threat = 0
+    for move in move_list:
+        damage = get_static_damage(attacker, defender, move, defender_field, battleState)
+        if damage is None:
+            continue
+        accuracy = 1 if move.accuracy is None else move.accuracy / 100
+        threat = max(threat, accuracy * min(damage / hpRemaining, 1) if hpRemaining > 0 else accuracy)
+    return threat
+
+
+# Returns True if the attacker moves before the defender with the given move, as long as the defender attacks with a
+# priority 0 move
+def moves_first(attacker, defender, move, battleState):
+    if move.priority != 0:
+        return move.priority > 0
+    if battleState.trickRoom['isUp']:
+        return attacker.effectiveStats['Spe'] < defender.effectiveStats['Spe']
+    return attacker.effectiveStats['Spe'] > defender.effectiveStats['Spe']
+
+
+# Returns the fraction of its max HP the pokemon would lose to entry hazards when switching in. Follows switch_in.
+def get_hazard_cost(pokemon, entry_hazards):
+    if 'Heavy Duty Boots' in pokemon.item or 'Magic Guard' in pokemon.ability:
+        return 0
+    cost = 0
+    if 'Spikes' in entry_hazards and 'flying' not in pokemon.type and 'Levitate' not in pokemon.ability:
+        cost += 1 / 8
+    if 'Stealth Rock' in entry_hazards:
+        cost += get_type_effectiveness('rock', pokemon.type) / 8
+    return cost
+
+
+# Returns my possible switch options (as option tuples) when my lead has fainted
+def get_my_forced_switch_options(battleState):
+    myPossibleOptions = []
+    # Get possible switch options
+    switch_options = check_for_switch_options(battleState.myTeam, battleState.myLeadIndex)
+    if not switch_options:
+        return myPossibleOptions
+    opponentLead = battleState.opponentTeam[battleState.opponentLeadIndex]
+    switch_options = switches_to_consider(switch_options, opponentLead, opponentLead.possibleMoves)
+    for option in switch_options:
+        optionTuple = (None, webInterface.get_pokemon_index(battleState.myTeam, option.name))
+        myPossibleOptions.append(optionTuple)
+    return myPossibleOptions
+
+
+# Returns the opponent's known switch options (as option tuples) when their lead has fainted
+def get_opponent_forced_switch_options(battleState):
+    opponentPossibleOptions = []
+    # Get known possible switch options
+    switch_options = check_for_switch_options(battleState.opponentTeam, battleState.opponentLeadIndex)
+    optionIndex = 0
+    endPoint = len(switch_options)
+    while optionIndex < endPoint:
+        if not switch_options[optionIndex].isRevealed:
+            switch_options.remove(switch_options[optionIndex])
+            endPoint -= 1
+        else:
+            optionIndex += 1
+    for option in switch_options:
+        optionTuple = (None, webInterface.get_pokemon_index(battleState.opponentTeam, option.name))
+        opponentPossibleOptions.append(optionTuple)
+    return opponentPossibleOptions
+
+
+# Returns my possible options and my opponent's possible options for a turn where both leads are in battle.
+# Options are tuples of (move, switch index).
+def get_turn_options(outcome):
+    myPossibleOptions = []
+    opponentPossibleOptions = []
     myLead = outcome.battleState.myTeam[outcome.battleState.myLeadIndex]
     opponentLead = outcome.battleState.opponentTeam[outcome.battleState.opponentLeadIndex]
     if outcome.battleState.myTeam[outcome.battleState.myLeadIndex].inBattle and \
             outcome.battleState.opponentTeam[outcome.battleState.opponentLeadIndex].inBattle:
-
         # Get my possible switches
         possibleSwitchOptions = check_for_switch_options(outcome.battleState.myTeam, outcome.battleState.myLeadIndex)
         for option in possibleSwitchOptions:
@@ -223,6 +614,8 @@ def decide_option(outcome, turn_depth, prediction_function, scalar):
             optionTuple = (get_move(opponentMoveList, webInterface.adjust_name(opponentLead.lastUsedMove)), None)
             opponentPossibleOptions.append(optionTuple)
         else:
+            if len(opponentLead.knownMoves) < 4:
+                opponentMoveList = get_likely_moves(opponentLead, minMoveProbability)
             opponentMoveList = attacks_to_consider(outcome, opponentMoveList, opponentLead, myLead)
             for move in opponentMoveList:
                 '''
@@ -234,37 +627,72 @@ def decide_option(outcome, turn_depth, prediction_function, scalar):
                 '''
                 optionTuple = (move, None)
                 opponentPossibleOptions.append(optionTuple)
-
-    # Calculate possible outcomes if no switch is needed
-    myOptionOutcomes = []
-    for myOption in myPossibleOptions:
-        oppOptionOutcomes = []
-        myChoice = OutcomeNode(outcome, 1, 'My Turn decision')
-        myChoice.set_my_selected_option((myOption[0], myOption[1]))
-        for opponentOption in opponentPossibleOptions:
-            opponentChoice = OutcomeNode(myChoice, 1, 'Opponent Turn Decision')
-            opponentChoice.set_oppponent_selected_option((opponentOption[0], opponentOption[1]))
-            nodeList = simulate_turn(opponentChoice, myLead, opponentLead,
-                                     myOption[0], opponentOption[0], myOption[1], opponentOption[1])
-            possibleOutcomes = []
-            for possibleOutcome in nodeList:
-                possibleOutcomes.append(decide_option(possibleOutcome, turn_depth - 1, prediction_function, scalar)[0])
-            # Calculate Outcome Scores
-            for possibleOutcome in possibleOutcomes:
-                calculate_score(possibleOutcome, prediction_function, scalar)
-            # Get average score for possible outcomes
-            opponentChoice.set_score(get_average_score(possibleOutcomes))
-            oppOptionOutcomes.append(opponentChoice)
-        # Determine best option for the opponent
-        oppSelectedOptionScore = get_worst_outcome(oppOptionOutcomes)
-        # Determine best option for myself
-        myOptionOutcomes.append(oppSelectedOptionScore)
-    sort_best_outcomes(myOptionOutcomes)
-    return myOptionOutcomes
+    if maxOpponentReplies is not None and len(opponentPossibleOptions) > maxOpponentReplies:
+        opponentPossibleOptions = narrow_opponent_replies(outcome.battleState, opponentPossibleOptions)
+    return myPossibleOptions, opponentPossibleOptions
 
 
 # Returns a list of OutcomeNode objects. myOption and opponentOption can be either a move object or switch index (int).
+# With the turn cache enabled, a turn already simulated from the same battle state with the same options is copied from
+# the cache.
 def simulate_turn(outcome, myPokemon, opponentPokemon, myOption, opponentOption, mySwitchIndex, opponentSwitchIndex):
+    startTime = time.perf_counter()
+    if turnCache is None or outcome.children or outcome.probability <= 0:
+        nodeList = simulate_turn_core(outcome, myPokemon, opponentPokemon, myOption, opponentOption, mySwitchIndex,
+                                      opponentSwitchIndex)
+    else:
+        nodeList = simulate_cached_turn(outcome, myPokemon, opponentPokemon, myOption, opponentOption, mySwitchIndex,
+                                        opponentSwitchIndex)
+    searchCounters['simulationTime'] += time.perf_counter() - startTime
+    return nodeList
+
+
+# Returns the turn's outcomes from the turn cache, simulating and storing them if they aren't in it. Used by
+# simulate_turn. Turns are stored without min branch probability, so an entry can be copied below an outcome of any
+# probability, and the outcomes are pruned once they're below the outcome. Turns simulated through the cache are only
+# pruned at the end of the turn, rather than after each move.
+def simulate_cached_turn(outcome, myPokemon, opponentPokemon, myOption, opponentOption, mySwitchIndex,
+                         opponentSwitchIndex):
+    global minBranchProbability
+    # Effective stats are part of the key, and are set the same way simulate_turn_core sets them
+    webInterface.calculate_effective_stats(myPokemon, outcome.battleState.myField, outcome.battleState)
+    webInterface.calculate_effective_stats(opponentPokemon, outcome.battleState.opponentField, outcome.battleState)
+    turnKey = (get_simulation_fingerprint(outcome.battleState), get_option_key((myOption, mySwitchIndex)),
+               get_option_key((opponentOption, opponentSwitchIndex)))
+    entry = turnCache.get(turnKey)
+    if entry is not None:
+        # Parts of the turn which don't split the outcome are simulated on the outcome itself
+        snapshot = entry[0]
+        outcome.battleState = snapshot.battleState
+        outcome.endNode = snapshot.endNode
+        outcome.myForcedSwitch = snapshot.myForcedSwitch
+        outcome.opponentForcedSwitch = snapshot.opponentForcedSwitch
+        outcome.forcedSwitchChoice = snapshot.forcedSwitchChoice
+        graft_subtree_entry(outcome, entry)
+    else:
+        branchProbability = minBranchProbability
+        minBranchProbability = 0
+        try:
+            nodeList = simulate_turn_core(outcome, myPokemon, opponentPokemon, myOption, opponentOption,
+                                          mySwitchIndex, opponentSwitchIndex)
+        finally:
+            minBranchProbability = branchProbability
+        turnCache.put(turnKey, make_subtree_entry(outcome, nodeList))
+    prune_unlikely_outcomes(outcome)
+    return outcome.get_children()
+
+
+# Creates the turn cache used by simulate_turn in this process, and returns it
+def enable_turn_cache(max_size=20000):
+    global turnCache
+    turnCache = TranspositionTable(max_size, 'Turn cache')
+    return turnCache
+
+
+# Simulates the turn below the outcome. Used by simulate_turn.
+def simulate_turn_core(outcome, myPokemon, opponentPokemon, myOption, opponentOption, mySwitchIndex,
+                       opponentSwitchIndex):
+    searchCounters['turns'] += 1
     webInterface.calculate_effective_stats(myPokemon, outcome.battleState.myField, outcome.battleState)
     webInterface.calculate_effective_stats(opponentPokemon, outcome.battleState.opponentField, outcome.battleState)
 
@@ -289,7 +717,7 @@ def simulate_turn(outcome, myPokemon, opponentPokemon, myOption, opponentOption,
             # Speed Tie Split
             if myLead.effectiveStats['Spe'] == opponentLead.effectiveStats['Spe']:
                 # I win the speed tie
-                newNode = OutcomeNode(node, .5, 'Speed tie')
+                newNode = OutcomeNode(node, .5, SplitReason.SPEED_TIE)
                 myLead = newNode.battleState.myTeam[newNode.battleState.myLeadIndex]
                 opponentLead = newNode.battleState.myTeam[newNode.battleState.opponentLeadIndex]
                 simulate_switch(newNode, True, mySwitchIndex)
@@ -298,7 +726,7 @@ def simulate_turn(outcome, myPokemon, opponentPokemon, myOption, opponentOption,
                 simulate_switch(newNode, False, opponentSwitchIndex)
 
                 # Opponent wins the speed tie
-                newNode = OutcomeNode(node, .5, 'Speed tie')
+                newNode = OutcomeNode(node, .5, SplitReason.SPEED_TIE)
                 myLead = newNode.battleState.myTeam[newNode.battleState.myLeadIndex]
                 opponentLead = newNode.battleState.myTeam[newNode.battleState.opponentLeadIndex]
                 simulate_switch(newNode, False, opponentSwitchIndex)
@@ -365,7 +793,7 @@ def simulate_turn(outcome, myPokemon, opponentPokemon, myOption, opponentOption,
                 # If speed tie
                 else:
                     # I win the speed tie
-                    newNode = OutcomeNode(node, .5, 'Speed Tie')
+                    newNode = OutcomeNode(node, .5, SplitReason.SPEED_TIE)
                     myLead = newNode.battleState.myTeam[newNode.battleState.myLeadIndex]
                     opponentLead = newNode.battleState.opponentTeam[newNode.battleState.opponentLeadIndex]
                     use_move(newNode, myLead, opponentLead, myOption, True, mySwitchIndex)
@@ -376,7 +804,7 @@ def simulate_turn(outcome, myPokemon, opponentPokemon, myOption, opponentOption,
                     use_move(newNode, opponentLead, myLead, opponentOption, False, opponentSwitchIndex)
 
                     # Opponent wins the speed tie
-                    newNode = OutcomeNode(node, .5, 'Speed Tie')
+                    newNode = OutcomeNode(node, .5, SplitReason.SPEED_TIE)
                     myLead = newNode.battleState.myTeam[newNode.battleState.myLeadIndex]
                     opponentLead = newNode.battleState.opponentTeam[newNode.battleState.opponentLeadIndex]
                     use_move(newNode, opponentLead, myLead, opponentOption, False, opponentSwitchIndex)
@@ -421,7 +849,8 @@ def simulate_turn(outcome, myPokemon, opponentPokemon, myOption, opponentOption,
 
 # Returns list of potential outcomes after using a move
 def use_move(outcome, attacker, defender, move, isMyAttack, attackSwitchIndex):
-    logging.info('Calculating ' + attacker.name + ' using ' + move.name + ' against ' + defender.name)
+    if debugLogging:
+        simulationLogger.debug('Calculating %s using %s against %s', attacker.name, move.name, defender.name)
     statusAbbreviation = {
         'burn': 'BRN',
         'sleep': 'SLP',
@@ -482,9 +911,10 @@ def use_move(outcome, attacker, defender, move, isMyAttack, attackSwitchIndex):
             }
             # Attacker stays asleep
             try:
-                newNode = OutcomeNode(node, sleepChance[attacker.sleepTurns], attacker.name + ' stayed asleep')
+                newNode = OutcomeNode(node, sleepChance[attacker.sleepTurns], SplitReason.STAYED_ASLEEP,
+                                      (attacker.name,))
             except KeyError:
-                newNode = OutcomeNode(node, 0, attacker.name + ' stayed asleep')
+                newNode = OutcomeNode(node, 0, SplitReason.STAYED_ASLEEP, (attacker.name,))
             newNode.freeze_node()
             attackerPokemon = find_pokemon(newNode.battleState, attacker.name, isMyAttack)
             try:
@@ -492,20 +922,20 @@ def use_move(outcome, attacker, defender, move, isMyAttack, attackSwitchIndex):
             except TypeError:
                 attackerPokemon.sleepTurns = 1
             # Attacker wakes up
-            newNode = OutcomeNode(node, 1 - sleepChance[attacker.sleepTurns], attacker.name + ' woke up')
+            newNode = OutcomeNode(node, 1 - sleepChance[attacker.sleepTurns], SplitReason.WOKE_UP, (attacker.name,))
             attackerPokemon = find_pokemon(newNode.battleState, attacker.name, isMyAttack)
             attackerPokemon.statusCondition = None
             attackerPokemon.sleepTurns = 0
         elif attacker.statusCondition == 'PAR':
             # Attacker cannot move
-            newNode = OutcomeNode(node, .25, attacker.name + " can't move due to paralysis")
+            newNode = OutcomeNode(node, .25, SplitReason.FULLY_PARALYZED, (attacker.name,))
             newNode.freeze_node()
             # Attacker can move
-            OutcomeNode(node, .75, attacker.name + ' paralyzed, but moved')
+            OutcomeNode(node, .75, SplitReason.MOVED_THROUGH_PARALYSIS, (attacker.name,))
         elif attacker.statusCondition == 'FRZ':
-            newNode = OutcomeNode(node, .8, attacker.name + ' is frozen')
+            newNode = OutcomeNode(node, .8, SplitReason.FROZEN, (attacker.name,))
             newNode.freeze_node()
-            newNode = OutcomeNode(node, .2, attacker.name + ' thawed out')
+            newNode = OutcomeNode(node, .2, SplitReason.THAWED_OUT, (attacker.name,))
             attackerPokemon = find_pokemon(newNode.battleState, attacker.name, isMyAttack)
             attackerPokemon.statusCondition = None
 
@@ -523,22 +953,22 @@ def use_move(outcome, attacker, defender, move, isMyAttack, attackSwitchIndex):
         nodeList = outcome.get_non_frozen_children()
         for node in nodeList:
             # Attacker gets out of confusion
-            newNode = OutcomeNode(node, confusionOdds[attacker.confusionTurns], attacker.name +
-                                  ' snapped out of confusion')
+            newNode = OutcomeNode(node, confusionOdds[attacker.confusionTurns], SplitReason.SNAPPED_OUT_OF_CONFUSION,
+                                  (attacker.name,))
             attackerPokemon = find_pokemon(newNode.battleState, attacker.name, isMyAttack)
             attackerPokemon.remove_volatile_condition('Confused')
             attackerPokemon.confusionTurns = 0
             # Attacker attacks through confusion
             newNode = OutcomeNode(node, confusionOdds[attackerPokemon.confusionTurns] * .667,
-                                  attacker.name + ' attacked through confusion')
+                                  SplitReason.ATTACKED_THROUGH_CONFUSION, (attacker.name,))
             attackerPokemon = find_pokemon(newNode.battleState, attacker.name, isMyAttack)
             attackerPokemon.confusionTurns += 1
             # Attacker hits itself through confusion
             try:
                 newNode = OutcomeNode(node, confusionOdds[attackerPokemon.confusionTurns] * .333,
-                                    attacker.name + ' hit itself in confusion')
+                                      SplitReason.HIT_ITSELF_IN_CONFUSION, (attacker.name,))
             except KeyError:
-                newNode = OutcomeNode(node, .3, attacker.name + ' hit itself in confusion')
+                newNode = OutcomeNode(node, .3, SplitReason.HIT_ITSELF_IN_CONFUSION, (attacker.name,))
             newNode.freeze_node()
             attackerPokemon = find_pokemon(newNode.battleState, attacker.name, isMyAttack)
             damage = calculate_confusion_damage(attackerPokemon)
@@ -553,8 +983,7 @@ def use_move(outcome, attacker, defender, move, isMyAttack, attackSwitchIndex):
         nodeList = outcome.get_non_frozen_children()
         for node in nodeList:
             # If the attack misses
-            newNode = OutcomeNode(node, (100 - move.accuracy) * .01,
-                                  attacker.name + ' missed their attack')
+            newNode = OutcomeNode(node, (100 - move.accuracy) * .01, SplitReason.MISSED, (attacker.name,))
             newNode.freeze_node()
             if move.name == 'high-jump-kick':
                 if isMyAttack:
@@ -565,13 +994,15 @@ def use_move(outcome, attacker, defender, move, isMyAttack, attackSwitchIndex):
                     attackerIndex = webInterface.get_pokemon_index(newNode.battleState.opponentTeam, attacker.name)
                     theirAttacker = newNode.battleState.opponentTeam[attackerIndex]
                     theirAttacker.take_damage(theirAttacker.effectiveStats['HP'] / 2)
-            OutcomeNode(node, move.accuracy * .01, attacker.name + ' hit their attack')
+            OutcomeNode(node, move.accuracy * .01, SplitReason.HIT, (attacker.name,))
 
     # If the attack is a status move and doesn't miss
     if move.damage_class.name == 'status':
         # Dark type pokemon are immune to prankster
         if 'Prankster' in attacker.ability and 'dark' in defender.type:
             outcome.unfreeze_nodes()
+            merge_equal_outcomes(outcome)
+            prune_unlikely_outcomes(outcome)
             return outcome.get_children()
         nodeList = outcome.get_non_frozen_children()
         for node in nodeList:
@@ -609,9 +1040,9 @@ def use_move(outcome, attacker, defender, move, isMyAttack, attackSwitchIndex):
                 if defenderPokemon.lastUsedMove in ['protect', 'detect', 'kings-shield', 'baneful-bunker', 'spiky-shield',
                                              'max-guard']:
                     # Protect fails
-                    newNode = OutcomeNode(node, .5, attacker.name + ' failed their protect')
+                    newNode = OutcomeNode(node, .5, SplitReason.PROTECT_FAILED, (attacker.name,))
                     # Protect succeeds
-                    newNode = OutcomeNode(node, .5, attacker.name + ' protected')
+                    newNode = OutcomeNode(node, .5, SplitReason.PROTECTED, (attacker.name,))
                     if isMyAttack:
                         attackerPokemon = newNode.battleState.myTeam[
                             webInterface.get_pokemon_index(newNode.battleState.myTeam, attacker.name)]
@@ -638,8 +1069,9 @@ def use_move(outcome, attacker, defender, move, isMyAttack, attackSwitchIndex):
                     team = node.battleState.myTeam
                 else:
                     team = node.battleState.opponentTeam
-                for member in team:
-                    member.statusCondition = None
+                # Team members are changed through an index, so the copy-on-write team copies them
+                for index in range(len(team)):
+                    team[index].statusCondition = None
             elif move.name == 'leech-seed':
                 defender.add_volatile_condition('Leech Seed')
             elif move.name in ['trick', 'Switcheroo']:
@@ -700,112 +1132,72 @@ def use_move(outcome, attacker, defender, move, isMyAttack, attackSwitchIndex):
                 node.battleState.set_weather('Rain')
 
             outcome.unfreeze_nodes()
+            merge_equal_outcomes(outcome)
+            prune_unlikely_outcomes(outcome)
             return outcome.get_children()
 
     # Poltergeist fails if defender has no item
     if len(defender.item) == 0:
         outcome.unfreeze_nodes()
+        merge_equal_outcomes(outcome)
+        prune_unlikely_outcomes(outcome)
         return outcome.get_children()
 
     # Moves that can only be used on the first turn the pokemon is out
     if move.name in ['fake-out', 'first-impression']:
         if attacker.lastUsedMove is not None:
             outcome.unfreeze_nodes()
+            merge_equal_outcomes(outcome)
+            prune_unlikely_outcomes(outcome)
             return outcome.get_children()
 
     # Temporary solution for solar moves
     if move.name in ['solar-beam', 'solar-blade'] and outcome.battleState.weather['type'] != 'Sun':
         outcome.unfreeze_nodes()
+        merge_equal_outcomes(outcome)
+        prune_unlikely_outcomes(outcome)
         return outcome.get_children()
 
     # If the attack doesn't miss
     nodeList = outcome.get_non_frozen_children()
-    for node in nodeList:
-        if move.damage_class.name != 'status':
-            # Calculate crit chance
-            crit_rate = {
-                0: .0417,
-                1: .125,
-                2: .5,
-                3: 1,
-                4: 1,
-                5: 1,
-                6: 1,
-                7: 1
-            }
-            crit_stage = move.meta.crit_rate
-            if 'Scope Lens' in attacker.item:
-                crit_stage += 1
-            # # If attack crits
-            # newNode = OutcomeNode(node, crit_rate[crit_stage], attacker.name + ' crit')
-            # if isMyAttack:
-            #     damage = calculate_damage(attacker, defender, move, True, newNode.battleState.opponentField,
-            #                               newNode.battleState)
-            #     defenderIndex = get_pokemon_index(newNode.battleState.opponentTeam, defender.name)
-            #     attackerIndex = get_pokemon_index(newNode.battleState.myTeam, attacker.name)
-            #     newNode.battleState.opponentTeam[defenderIndex].take_damage(damage)
-            #     if move.meta.drain > 0:
-            #         newNode.battleState.myTeam[attackerIndex].heal(damage * move.meta.drain * .01)
-            #     if move.meta.drain < 0:
-            #         recoil = damage * abs(move.meta.drain * .01)
-            #         newNode.battleState.myTeam[attackerIndex].take_damage(recoil)
-            #     if 'Life Orb' in newNode.battleState.myTeam[attackerIndex].item \
-            #             and not newNode.battleState.myTeam[attackerIndex].isDynamaxed:
-            #         newNode.battleState.myTeam[attackerIndex].take_life_orb_recoil()
-            # else:
-            #     damage = calculate_damage(attacker, defender, move, True, newNode.battleState.myField,
-            #                               newNode.battleState)
-            #     defenderIndex = get_pokemon_index(newNode.battleState.myTeam, defender.name)
-            #     attackerIndex = get_pokemon_index(newNode.battleState.opponentTeam, attacker.name)
-            #     newNode.battleState.myTeam[defenderIndex].take_damage(damage)
-            #     if move.meta.drain > 0:
-            #         newNode.battleState.opponentTeam[attackerIndex].heal(damage * move.meta.drain * .01)
-            #     if move.meta.drain < 0:
-            #         recoil = damage * abs(move.meta.drain * .01)
-            #         newNode.battleState.opponentTeam[attackerIndex].take_damage(recoil)
-            #     if 'Life Orb' in newNode.battleState.opponentTeam[attackerIndex].item \
-            #             and not newNode.battleState.opponentTeam[attackerIndex].isDynamaxed:
-            #         newNode.battleState.opponentTeam[attackerIndex].take_life_orb_recoil()
-
-            # If attack doesn't crit
-            # newNode = OutcomeNode(node, 1 - crit_rate[crit_stage], attacker.name + " didn't crit")
-            newNode = node
-            if isMyAttack:
-                damage = calculate_damage(attacker, defender, move, False, newNode.battleState.opponentField,
-                                          newNode.battleState)
-                defenderIndex = webInterface.get_pokemon_index(newNode.battleState.opponentTeam, defender.name)
-                attackerIndex = webInterface.get_pokemon_index(newNode.battleState.myTeam, attacker.name)
-                newNode.battleState.opponentTeam[defenderIndex].take_damage(damage)
-                if move.meta.drain > 0:
-                    newNode.battleState.myTeam[attackerIndex].heal(damage * move.meta.drain * .01)
-                if move.meta.drain < 0:
-                    recoil = damage * abs(move.meta.drain * .01)
-                    newNode.battleState.myTeam[attackerIndex].take_damage(recoil)
-                if 'Life Orb' in newNode.battleState.myTeam[attackerIndex].item \
-                        and not newNode.battleState.myTeam[attackerIndex].isDynamaxed:
-                    newNode.battleState.myTeam[attackerIndex].take_life_orb_recoil()
+    if move.damage_class.name != 'status' and nodeList:
+        # Calculate crit chance
+        crit_rate = {
+            0: .0417,
+            1: .125,
+            2: .5,
+            3: 1,
+            4: 1,
+            5: 1,
+            6: 1,
+            7: 1
+        }
+        crit_stage = move.meta.crit_rate
+        if 'Scope Lens' in attacker.item:
+            crit_stage += 1
+        hitOutcomes = get_hit_outcomes(attacker, defender, move, nodeList, isMyAttack, crit_rate[crit_stage])
+        for node, (koProbability, koDamage, surviveDamage, sideEffects) in zip(nodeList, hitOutcomes):
+            # The defender passed in is shared with the parent outcome, so the side effects go on the node's own copy
+            apply_damage_side_effects(find_pokemon(node.battleState, defender.name, not isMyAttack), sideEffects)
+            # Branch only if some of the damage rolls KO the defender and some don't
+            if koProbability == 0:
+                apply_attack_damage(node, attacker, defender, move, surviveDamage, isMyAttack)
+            elif koProbability == 1:
+                apply_attack_damage(node, attacker, defender, move, koDamage, isMyAttack)
             else:
-                damage = calculate_damage(attacker, defender, move, False, newNode.battleState.myField,
-                                          newNode.battleState)
-                defenderIndex = webInterface.get_pokemon_index(newNode.battleState.myTeam, defender.name)
-                attackerIndex = webInterface.get_pokemon_index(newNode.battleState.opponentTeam, attacker.name)
-                newNode.battleState.myTeam[defenderIndex].take_damage(damage)
-                if move.meta.drain > 0:
-                    newNode.battleState.opponentTeam[attackerIndex].heal(damage * move.meta.drain * .01)
-                if move.meta.drain < 0:
-                    recoil = damage * abs(move.meta.drain * .01)
-                    newNode.battleState.opponentTeam[attackerIndex].take_damage(recoil)
-                if 'Life Orb' in newNode.battleState.opponentTeam[attackerIndex].item \
-                        and not newNode.battleState.opponentTeam[attackerIndex].isDynamaxed:
-                    newNode.battleState.opponentTeam[attackerIndex].take_life_orb_recoil()
+                newNode = OutcomeNode(node, koProbability, SplitReason.KNOCKED_OUT,
+                                      (attacker.name, move.name, defender.name))
+                apply_attack_damage(newNode, attacker, defender, move, koDamage, isMyAttack)
+                newNode = OutcomeNode(node, 1 - koProbability, SplitReason.SURVIVED, (defender.name, move.name))
+                apply_attack_damage(newNode, attacker, defender, move, surviveDamage, isMyAttack)
 
     # If the attack can inflict a status
     if move.meta.ailment_chance > 0:
         nodeList = outcome.get_non_frozen_children()
         for node in nodeList:
             # Move inflicts status
-            newNode = OutcomeNode(node, move.meta.ailment_chance * .01,
-                                  attacker.name + "'s " + move.name + ' inflicted status')
+            newNode = OutcomeNode(node, move.meta.ailment_chance * .01, SplitReason.INFLICTED_STATUS,
+                                  (attacker.name, move.name))
             if isMyAttack:
                 defenderIndex = webInterface.get_pokemon_index(newNode.battleState.opponentTeam, defender.name)
                 if move.meta.ailment.name in statusAbbreviation:
@@ -821,16 +1213,16 @@ def use_move(outcome, attacker, defender, move, isMyAttack, attackSwitchIndex):
                 else:
                     newNode.battleState.myTeam[defenderIndex].add_volatile_condition(move.meta.ailment.name)
             # Move doesn't inflict status
-            newNode = OutcomeNode(node, (100 - move.meta.ailment_chance) * .01,
-                                  attacker.name + "'s " + move.name + " didn't inflict side effect status")
+            newNode = OutcomeNode(node, (100 - move.meta.ailment_chance) * .01, SplitReason.DIDNT_INFLICT_STATUS,
+                                  (attacker.name, move.name))
 
     # If the attack can flinch
     if move.meta.flinch_chance > 0 and not defender.hasMoved:
         nodeList = outcome.get_non_frozen_children()
         for node in nodeList:
             # Move flinches
-            newNode = OutcomeNode(node, move.meta.flinch_chance * .01,
-                                  move.name + ' caused ' + defender.name + ' to flinch')
+            newNode = OutcomeNode(node, move.meta.flinch_chance * .01, SplitReason.FLINCHED,
+                                  (move.name, defender.name))
             if isMyAttack:
                 defenderIndex = webInterface.get_pokemon_index(newNode.battleState.opponentTeam, defender.name)
                 if newNode.battleState.opponentTeam[defenderIndex].substituteHP == 0 and \
@@ -842,16 +1234,16 @@ def use_move(outcome, attacker, defender, move, isMyAttack, attackSwitchIndex):
                         'Inner Focus' not in defender.ability:
                     newNode.battleState.myTeam[defenderIndex].flinched = True
             # Move doesn't flinch
-            newNode = OutcomeNode(node, (100 - move.meta.flinch_chance) * .01,
-                                  attacker.name + "'s " + move.name + " didn't flinch")
+            newNode = OutcomeNode(node, (100 - move.meta.flinch_chance) * .01, SplitReason.DIDNT_FLINCH,
+                                  (attacker.name, move.name))
 
     # If the attack adjusts stats
     if move.stat_changes:
         nodeList = outcome.get_non_frozen_children()
         for node in nodeList:
             # Stat change happens
-            newNode = OutcomeNode(node, move.effect_chance * .01,
-                                  attacker.name + "'s " + move.name + ' caused a stat change')
+            newNode = OutcomeNode(node, move.effect_chance * .01, SplitReason.CHANGED_STATS,
+                                  (attacker.name, move.name))
             if move.meta.category.name == 'damage+raise':
                 if isMyAttack:
                     target = newNode.battleState.myTeam[webInterface.get_pokemon_index(newNode.battleState.myTeam, attacker.name)]
@@ -868,8 +1260,8 @@ def use_move(outcome, attacker, defender, move, isMyAttack, attackSwitchIndex):
                 target.boost_stat(statAbbreviation[stat.stat.name], stat.change)
 
             # Stat change doesn't happen
-            newNode = OutcomeNode(node, (100 - move.effect_chance) * .01,
-                                  attacker.name + "'s " + move.name + " didn't cause stat change")
+            newNode = OutcomeNode(node, (100 - move.effect_chance) * .01, SplitReason.DIDNT_CHANGE_STATS,
+                                  (attacker.name, move.name))
 
     # If the attack is a max attack
     if attacker.isDynamaxed:
@@ -929,9 +1321,9 @@ def use_move(outcome, attacker, defender, move, isMyAttack, attackSwitchIndex):
         if attacker.lastUsedMove == move.name and 'Confused' not in attacker.volatileConditions:
             for node in nodeList:
                 # Outrage doesn't confuse
-                OutcomeNode(node, .5, attacker.name + "'s " + move.name + " didn't confuse")
+                OutcomeNode(node, .5, SplitReason.DIDNT_CONFUSE, (attacker.name, move.name))
                 # Outrage does confuse
-                newNode = OutcomeNode(node, .5, attacker.name + "'s " + move.name + " caused confusion")
+                newNode = OutcomeNode(node, .5, SplitReason.CAUSED_CONFUSION, (attacker.name, move.name))
                 attackerPokemon = find_pokemon(newNode.battleState, attacker.name, isMyAttack)
                 if 'Confused' not in attacker.volatileConditions:
                     attacker.add_volatile_condition('Confused')
@@ -951,9 +1343,98 @@ def use_move(outcome, attacker, defender, move, isMyAttack, attackSwitchIndex):
         attackerPokemon.hasMoved = True
 
     outcome.unfreeze_nodes()
+    merge_equal_outcomes(outcome)
+    prune_unlikely_outcomes(outcome)
     return outcome.get_children()
 
 
+# Merges sibling leaves below the outcome which ended up with the same battle state, like a missed status move and one
+# which failed against an already statused defender. The first leaf is kept and the probabilities of the others are
+# added to it, so the probability weighted scores above are unchanged.
+def merge_equal_outcomes(outcome):
+    if not outcome.children:
+        return
+    for child in outcome.children:
+        merge_equal_outcomes(child)
+    leaves = [child for child in outcome.children if not child.children]
+    if len(leaves) < 2:
+        return
+    # Only leaves which share the cheap key can have the same battle state, so only those are fingerprinted
+    keyCounts = Counter([get_merge_key(leaf) for leaf in leaves])
+    if len(keyCounts) == len(leaves):
+        return
+    keptLeaves = {}
+    for leaf in leaves:
+        mergeKey = get_merge_key(leaf)
+        if keyCounts[mergeKey] == 1:
+            continue
+        mergeKey = (mergeKey, get_battle_state_fingerprint(leaf.battleState))
+        keptLeaf = keptLeaves.get(mergeKey)
+        if keptLeaf is None:
+            keptLeaves[mergeKey] = leaf
+        else:
+            keptLeaf.probability += leaf.probability
+            keptLeaf.splitDetails = ((keptLeaf.split_reason, keptLeaf.splitDetails),
+                                     (leaf.split_reason, leaf.splitDetails))
+            keptLeaf.split_reason = SplitReason.MERGED
+            outcome.remove_child(leaf)
+            searchCounters['merged'] += 1
+
+
+# Returns the node flags and the leads' HP of an outcome. Outcomes with the same battle state have the same merge key.
+def get_merge_key(outcome):
+    battleState = outcome.battleState
+    return (outcome.endNode, outcome.frozen, outcome.myForcedSwitch, outcome.opponentForcedSwitch,
+            battleState.myLeadIndex, battleState.opponentLeadIndex, battleState.myTeam[battleState.myLeadIndex].hp,
+            battleState.opponentTeam[battleState.opponentLeadIndex].hp)
+
+
+# Sets the probability below which outcomes are dropped from the search. Probabilities are from the root of the search,
+# so a branch is dropped once the chances leading to it multiply to less than min_branch_probability.
+def set_min_branch_probability(min_branch_probability):
+    global minBranchProbability
+    minBranchProbability = min_branch_probability
+
+
+# Sets how my options are picked from the payoff matrix of each turn searched. Must be one of OPTION_SELECTIONS.
+def set_option_selection(option_selection):
+    global optionSelection
+    if option_selection not in OPTION_SELECTIONS:
+        raise Exception('Invalid option selection: ' + str(option_selection) + '. (Either enter ' +
+                        ' or '.join(OPTION_SELECTIONS) + ')')
+    optionSelection = option_selection
+
+
+# Drops the leaves below the outcome which are less likely than minBranchProbability, and scales up the leaves left so
+# they add up to the same probability. The most likely leaf is always kept. The dropped probability is added to
+# searchCounters['discarded'].
+def prune_unlikely_outcomes(outcome):
+    if minBranchProbability <= 0 or not outcome.children:
+        return
+    leaves = outcome.get_children()
+    keptLeaves = [leaf for leaf in leaves if leaf.probability >= minBranchProbability]
+    if len(keptLeaves) == len(leaves):
+        return
+    if not keptLeaves:
+        keptLeaves = [max(leaves, key=lambda leaf: leaf.probability)]
+    totalProbability = sum(leaf.probability for leaf in leaves)
+    keptProbability = sum(leaf.probability for leaf in keptLeaves)
+    keptLeafIds = set(id(leaf) for leaf in keptLeaves)
+    for leaf in leaves:
+        if id(leaf) in keptLeafIds:
+            continue
+        # Nodes left without children are removed as well. A kept leaf is always below the outcome, so this stops
+        # before the outcome.
+        node = leaf
+        while len(node.parent.children) == 1:
+            node = node.parent
+        node.parent.remove_child(node)
+    for leaf in keptLeaves:
+        leaf.probability *= totalProbability / keptProbability
+    searchCounters['pruned'] += len(leaves) - len(keptLeaves)
+    searchCounters['discarded'] += totalProbability - keptProbability
+
+
 # Returns True if switch is possible. Returns False otherwise
 def simulate_switch(outcome, isMySwitch, index):
     if isMySwitch:
@@ -972,118 +1453,191 @@ def simulate_switch(outcome, isMySwitch, index):
 def check_for_switch_options(team, lead_index):
     returnList = []
     for member in range(len(team)):
-        if (not team[member].fainted) and (not team[member].inBattle) and (member != lead_index):
-            returnList.append(team[member])
+        # The members are only read, so they aren't copied out of a copy-on-write team
+        pokemon = webInterface.peek_member(team, member)
+        if (not pokemon.fainted) and (not pokemon.inBattle) and (member != lead_index):
+            returnList.append(pokemon)
     return returnList
 
 
-# Returns amount of damage (as a #) dealt by an attack
+# Applies an attack's damage, drain, recoil and life orb recoil to the attacker and defender in the node
+def apply_attack_damage(node, attacker, defender, move, damage, isMyAttack):
+    if isMyAttack:
+        attackingTeam = node.battleState.myTeam
+        defendingTeam = node.battleState.opponentTeam
+    else:
+        attackingTeam = node.battleState.opponentTeam
+        defendingTeam = node.battleState.myTeam
+    defenderIndex = webInterface.get_pokemon_index(defendingTeam, defender.name)
+    attackerIndex = webInterface.get_pokemon_index(attackingTeam, attacker.name)
+    defendingTeam[defenderIndex].take_damage(damage)
+    if move.meta.drain > 0:
+        attackingTeam[attackerIndex].heal(damage * move.meta.drain * .01)
+    if move.meta.drain < 0:
+        recoil = damage * abs(move.meta.drain * .01)
+        attackingTeam[attackerIndex].take_damage(recoil)
+    if 'Life Orb' in attackingTeam[attackerIndex].item and not attackingTeam[attackerIndex].isDynamaxed:
+        attackingTeam[attackerIndex].take_life_orb_recoil()
+
+
+# Returns a (KO probability, KO damage, survive damage, side effects) tuple for an attack against the defender in each
+# node. All 16 damage rolls, with and without a crit, of every node are split into KO and survive rolls in one NumPy
+# call. The damage of each side is the average of its rolls.
+def get_hit_outcomes(attacker, defender, move, node_list, isMyAttack, crit_chance):
+    maxRollDamage = []
+    fixed = []
+    hpRemaining = []
+    sideEffectList = []
+    for node in node_list:
+        if isMyAttack:
+            defenderField = node.battleState.opponentField
+            defendingTeam = node.battleState.opponentTeam
+        else:
+            defenderField = node.battleState.myField
+            defendingTeam = node.battleState.myTeam
+        damage, sideEffects = get_damage_result(attacker, defender, move, False, defenderField, node.battleState, 100)
+        critDamage = get_damage_result(attacker, defender, move, True, defenderField, node.battleState, 100)[0]
+        maxRollDamage.append((damage, critDamage))
+        # Fixed damage moves and blocked attacks don't depend on the roll
+        fixed.append(move.name in FIXED_DAMAGE_MOVES or damage == 0)
+        sideEffectList.append(sideEffects)
+        hpRemaining.append(get_ko_threshold(defendingTeam[webInterface.get_pokemon_index(defendingTeam,
+                                                                                         defender.name)]))
+    distributions = get_damage_distributions(maxRollDamage, fixed)
+    koProbabilities, koDamage, surviveDamage = get_ko_outcomes(distributions, [crit_chance] * len(node_list),
+                                                               hpRemaining)
+    return [(float(koProbabilities[i]), float(koDamage[i]), float(surviveDamage[i]), sideEffectList[i])
+            for i in range(len(node_list))]
+
+
+# Returns the damage that KOs the pokemon in one hit, or infinity if one hit can't KO it
+def get_ko_threshold(pokemon):
+    if pokemon.substituteHP > 0:
+        return np.inf
+    if pokemon.hp == 100 and ('Sturdy' in pokemon.ability or 'Focus Sash' in pokemon.item):
+        return np.inf
+    if pokemon.effectiveStats['HP']:
+        threshold = pokemon.effectiveStats['HP'] * (pokemon.hp * .01)
+    else:
+        threshold = pokemon.leveledStats['HP'] * (pokemon.hp * .01)
+    # Multiscale and Shadow Shield halve damage taken at full hp
+    if pokemon.hp == 100 and ('Multiscale' in pokemon.ability or 'Shadow Shield' in pokemon.ability):
+        threshold *= 2
+    return threshold
+
+
+# Returns amount of damage (as a #) dealt by an attack. The attack's side effects on the defender are applied on every
+# call, even if the damage came from the damage cache, so the defender must belong to the battle state being changed.
 def calculate_damage(attacker, defender, attack, isCrit, defenderField, battleState):
+    damage, sideEffects = get_damage_result(attacker, defender, attack, isCrit, defenderField, battleState)
+    apply_damage_side_effects(defender, sideEffects)
+    return damage
 
-    typeChart = {
-        'normal': {'normal': 1, 'fighting': 1, 'flying': 1, 'poison': 1, 'ground': 1, 'rock': .5, 'bug': 1, 'ghost': 0,
-                   'steel': .5, 'fire': 1, 'water': 1, 'grass': 1, 'electric': 1, 'psychic': 1, 'ice': 1, 'dragon': 1,
-                   'dark': 1, 'fairy': 1},
-        'fighting': {'normal': 2, 'fighting': 1, 'flying': .5, 'poison': .5, 'ground': 1, 'rock': 2, 'bug': .5, 'ghost': 0,
-                   'steel': 2, 'fire': 1, 'water': 1, 'grass': 1, 'electric': 1, 'psychic': .5, 'ice': 2, 'dragon': 1,
-                   'dark': 2, 'fairy': .5},
-        'flying': {'normal': 1, 'fighting': 2, 'flying': 1, 'poison': 1, 'ground': 1, 'rock': .5, 'bug': 2, 'ghost': 1,
-                   'steel': .5, 'fire': 1, 'water': 1, 'grass': 2, 'electric': .5, 'psychic': 1, 'ice': 1, 'dragon': 1,
-                   'dark': 1, 'fairy': 1},
-        'poison': {'normal': 1, 'fighting': 1, 'flying': 1, 'poison': .5, 'ground': .5, 'rock': .5, 'bug': 1, 'ghost': .5,
-                   'steel': 0, 'fire': 1, 'water': 1, 'grass': 2, 'electric': 1, 'psychic': 1, 'ice': 1, 'dragon': 1,
-                   'dark': 1, 'fairy': 2},
-        'ground': {'normal': 1, 'fighting': 1, 'flying': 0, 'poison': 2, 'ground': 1, 'rock': 2, 'bug': .5, 'ghost': 1,
-                   'steel': 2, 'fire': 2, 'water': 1, 'grass': .5, 'electric': 2, 'psychic': 1, 'ice': 1, 'dragon': 1,
-                   'dark': 1, 'fairy': 1},
-        'rock': {'normal': 1, 'fighting': .5, 'flying': 2, 'poison': 1, 'ground': .5, 'rock': .5, 'bug': 2, 'ghost': 1,
-                   'steel': .5, 'fire': 2, 'water': 1, 'grass': 1, 'electric': 1, 'psychic': 1, 'ice': 2, 'dragon': 1,
-                   'dark': 1, 'fairy': 1},
-        'bug': {'normal': 1, 'fighting':.5, 'flying': .5, 'poison': .5, 'ground': 1, 'rock': 1, 'bug': 1, 'ghost': .5,
-                   'steel': .5, 'fire': .5, 'water': 1, 'grass': 2, 'electric': 1, 'psychic': 2, 'ice': 1, 'dragon': 1,
-                   'dark': 2, 'fairy': .5},
-        'ghost': {'normal': 0, 'fighting': 1, 'flying': 1, 'poison': 1, 'ground': 1, 'rock': 1, 'bug': 1, 'ghost': 2,
-                   'steel': 1, 'fire': 1, 'water': 1, 'grass': 1, 'electric': 1, 'psychic': 2, 'ice': 1, 'dragon': 1,
-                   'dark': 2, 'fairy': 1},
-        'steel': {'normal': 1, 'fighting': 1, 'flying': 1, 'poison': 1, 'ground': 1, 'rock': 2, 'bug': 1, 'ghost': 1,
-                  'steel': .5, 'fire': .5, 'water': .5, 'grass': 1, 'electric': .5, 'psychic': 1, 'ice': 2, 'dragon': 1,
-                  'dark': 1, 'fairy': 2},
-        'fire': {'normal': 1, 'fighting': 1, 'flying': 1, 'poison': 1, 'ground': 1, 'rock': .5, 'bug': 2, 'ghost': 1,
-                   'steel': 2, 'fire': .5, 'water': .5, 'grass': 2, 'electric': 1, 'psychic': 1, 'ice': 2, 'dragon': .5,
-                   'dark': 1, 'fairy': 1},
-        'water': {'normal': 1, 'fighting': 1, 'flying': 1, 'poison': 1, 'ground': 2, 'rock': 2, 'bug': 1, 'ghost': 1,
-                   'steel': 1, 'fire': 2, 'water': .5, 'grass': .5, 'electric': 1, 'psychic': 1, 'ice': 1, 'dragon': .5,
-                   'dark': 1, 'fairy': 1},
-        'grass': {'normal': 1, 'fighting': 1, 'flying': .5, 'poison': .5, 'ground': 2, 'rock': 2, 'bug': .5, 'ghost': 1,
-                   'steel': .5, 'fire': .5, 'water': 2, 'grass': .5, 'electric': 1, 'psychic': 1, 'ice': 1, 'dragon': .5,
-                   'dark': 1, 'fairy': 1},
-        'electric': {'normal': 1, 'fighting': 1, 'flying': 2, 'poison': 1, 'ground': 0, 'rock': 1, 'bug': 1, 'ghost': 1,
-                   'steel': 1, 'fire': 1, 'water': 2, 'grass': .5, 'electric': .5, 'psychic': 1, 'ice': 1, 'dragon': .5,
-                   'dark': 1, 'fairy': 1},
-        'psychic': {'normal': 1, 'fighting': 2, 'flying': 1, 'poison': 2, 'ground': 1, 'rock': 1, 'bug': 1, 'ghost': 1,
-                   'steel': .5, 'fire': 1, 'water': 1, 'grass': 1, 'electric': 1, 'psychic': .5, 'ice': 1, 'dragon': 1,
-                   'dark': 0, 'fairy': 1},
-        'ice': {'normal': 1, 'fighting': 1, 'flying': 2, 'poison': 1, 'ground': 2, 'rock': 1, 'bug': 1, 'ghost': 1,
-                   'steel': .5, 'fire': .5, 'water': .5, 'grass': 2, 'electric': 1, 'psychic': 1, 'ice': .5, 'dragon': 2,
-                   'dark': 1, 'fairy': 1},
-        'dragon': {'normal': 1, 'fighting': 1, 'flying': 1, 'poison': 1, 'ground': 1, 'rock': 1, 'bug': 1, 'ghost': 1,
-                   'steel': .5, 'fire': 1, 'water': 1, 'grass': 1, 'electric': 1, 'psychic': 1, 'ice': 1, 'dragon': 2,
-                   'dark': 1, 'fairy': 0},
-        'dark': {'normal': 1, 'fighting': .5, 'flying': 1, 'poison': 1, 'ground': 1, 'rock': 1, 'bug': 1, 'ghost': 2,
-                   'steel': 1, 'fire': 1, 'water': 1, 'grass': 1, 'electric': 1, 'psychic': 2, 'ice': 1, 'dragon': 1,
-                   'dark': .5, 'fairy': .5},
-        'fairy': {'normal': 1, 'fighting': 2, 'flying': 1, 'poison': .5, 'ground': 1, 'rock': 1, 'bug': 1, 'ghost': 1,
-                    'steel': .5, 'fire': .5, 'water': 1, 'grass': 1, 'electric': 1, 'psychic': 1, 'ice': 1, 'dragon': 2,
-                    'dark': 2, 'fairy': 1},
-        'freeze-dry': {'normal': 1, 'fighting': 1, 'flying': 2, 'poison': 1, 'ground': 2, 'rock': 1, 'bug': 1, 'ghost': 1,
-                        'steel': .5, 'fire': .5, 'water': 2, 'grass': 2, 'electric': 1, 'psychic': 1, 'ice': .5, 'dragon': 2,
-                        'dark': 1, 'fairy': 1},
-    }
+
+# Returns calculate_damage_core's result, from the damage cache if it's enabled
+def get_damage_result(attacker, defender, attack, isCrit, defenderField, battleState, randomDamage=91):
+    damageKey = None
+    if damageCache is not None:
+        damageKey = get_damage_key(attacker, defender, attack, isCrit, defenderField, battleState, randomDamage)
+    if damageKey is None:
+        return calculate_damage_core(attacker, defender, attack, isCrit, defenderField, battleState, randomDamage)
+    result = damageCache.get(damageKey)
+    if result is None:
+        result = calculate_damage_core(attacker, defender, attack, isCrit, defenderField, battleState, randomDamage)
+        damageCache.put(damageKey, result)
+    return result
+
+
+# Creates the damage cache used by get_damage_result in this process, and returns it. Building a key costs about half as
+# much as calculate_damage_core itself, so the cache only pays off when most lookups hit.
+def enable_damage_cache(max_size=50000):
+    global damageCache
+    damageCache = TranspositionTable(max_size, 'Damage cache')
+    return damageCache
+
+
+# Returns a key made of everything calculate_damage_core reads, or None if the attack's type can't be put in a key
+def get_damage_key(attacker, defender, attack, isCrit, defenderField, battleState, randomDamage=91):
+    typeName = getattr(attack.type, 'name', None)
+    if typeName is None:
+        return None
+    attackerStats = attacker.effectiveStats
+    defenderStats = defender.effectiveStats
+    attackerAbility = attacker.ability
+    attackerItem = attacker.item
+    defenderAbility = defender.ability
+    defenderItem = defender.item
+    return (attack.name, typeName, attack.power, attack.damage_class.name, isCrit, randomDamage,
+            attacker.level, attacker.hp, attacker.weight, attacker.statusCondition, attacker.isDynamaxed,
+            attacker.lastDamageTaken, tuple(attacker.type),
+            tuple(attackerAbility) if isinstance(attackerAbility, list) else attackerAbility,
+            tuple(attackerItem) if isinstance(attackerItem, list) else attackerItem,
+            attackerStats['Atk'], attackerStats['Def'], attackerStats['Spa'], attackerStats['Spe'],
+            attacker.leveledStats['Atk'], attacker.leveledStats['Spa'], tuple(attacker.boosts.values()),
+            defender.hp, defender.weight, defender.statusCondition, defender.isDynamaxed, defender.hasMoved,
+            defender.isProtected, tuple(defender.type),
+            tuple(defenderAbility) if isinstance(defenderAbility, list) else defenderAbility,
+            tuple(defenderItem) if isinstance(defenderItem, list) else defenderItem,
+            defenderStats['HP'], defenderStats['Atk'], defenderStats['Def'], defenderStats['SpD'], defenderStats['Spe'],
+            defender.leveledStats['HP'], defender.leveledStats['Def'], defender.leveledStats['SpD'],
+            defenderField['auroraVeil']['isUp'], defenderField['reflect']['isUp'], defenderField['lightScreen']['isUp'],
+            battleState.weather['type'])
+
+
+# Applies the side effects returned by calculate_damage_core to the defender
+def apply_damage_side_effects(defender, side_effects):
+    for sideEffect in side_effects:
+        if sideEffect[0] == 'Heal':
+            defender.heal(sideEffect[1])
+        elif sideEffect[0] == 'Boost':
+            defender.boost_stat(sideEffect[1], sideEffect[2])
+
+
+# Returns the damage dealt by an attack, and a list of side effects for apply_damage_side_effects. Doesn't change the
+# attacker, defender or attack. randomDamage is the damage roll as a percentage, 91 being the median roll.
+def calculate_damage_core(attacker, defender, attack, isCrit, defenderField, battleState, randomDamage=91):
+    searchCounters['damage'] += 1
     # Damage = ((((2 * level/ 5) + 2) * Power * attackStat/defenseStat)/50) * Weather * Critical * STAB * TypeEffectiveness * Random * Burn * other
     # Damage is always at least 1
 
     if attack.name == 'seismic-toss' or attack.name == 'night-shade':
-        return attacker.level
+        return attacker.level, []
     elif attack.name == 'super-fang':
-        return defender.effectiveStats['HP'] * (defender.hp / 100)
+        return defender.effectiveStats['HP'] * (defender.hp / 100), []
     elif attack.name in ['counter', 'mirror-coat']:
         if not defender.hasMoved:
-            return 0
-        return attacker.lastDamageTaken * 2
+            return 0, []
+        return attacker.lastDamageTaken * 2, []
 
+    sideEffects = []
+    attackType = attack.type
     if attack.name == 'pyro-ball':
-        attack.type = attack.type[0]
+        attackType = attack.type[0]
+    typeName = attackType.name
 
     # Items that block damage
-    if 'Air Balloon' in defender.item and attack.type.name == 'ground':
-        return 0
+    if 'Air Balloon' in defender.item and typeName == 'ground':
+        return 0, sideEffects
 
     # Abilities that block or absorb damage
-    if 'Levitate' in defender.ability and attack.type.name == 'ground':
-        return 0
-    elif 'Flash Fire' in defender.ability and attack.type.name == 'fire':
-        return 0
-    elif 'Water Absorb' in defender.ability and attack.type.name == 'water':
-        defender.heal(defender.leveledStats['HP'] * .25)
-        return 0
-    elif 'Volt Absorb' in defender.ability and attack.type.name == 'electric':
-        defender.heal(defender.leveledStats['HP'] * .25)
-        return 0
-    elif 'Dry Skin' in defender.ability and attack.type.name == 'water':
-        defender.heal(defender.leveledStats['HP'] * .25)
-        return 0
-    elif 'Storm Drain' in defender.ability and attack.type.name == 'water':
-        defender.boost_stat('Spa', 1)
-        return 0
-    elif 'Sap Sipper' in defender.ability and attack.type.name == 'grass':
-        defender.boost_stat('Atk', 1)
-        return 0
-    elif 'Motor Drive' in defender.ability and attack.type.name == 'electric':
-        defender.boost_stat('Spe', 1)
-        return 0
-    elif 'Lightning Rod' in defender.ability and attack.type.name == 'electric':
-        defender.boost_stat('Spa', 1)
-        return 0
+    if 'Levitate' in defender.ability and typeName == 'ground':
+        return 0, sideEffects
+    elif 'Flash Fire' in defender.ability and typeName == 'fire':
+        return 0, sideEffects
+    elif 'Water Absorb' in defender.ability and typeName == 'water':
+        return 0, sideEffects + [('Heal', defender.leveledStats['HP'] * .25)]
+    elif 'Volt Absorb' in defender.ability and typeName == 'electric':
+        return 0, sideEffects + [('Heal', defender.leveledStats['HP'] * .25)]
+    elif 'Dry Skin' in defender.ability and typeName == 'water':
+        return 0, sideEffects + [('Heal', defender.leveledStats['HP'] * .25)]
+    elif 'Storm Drain' in defender.ability and typeName == 'water':
+        return 0, sideEffects + [('Boost', 'Spa', 1)]
+    elif 'Sap Sipper' in defender.ability and typeName == 'grass':
+        return 0, sideEffects + [('Boost', 'Atk', 1)]
+    elif 'Motor Drive' in defender.ability and typeName == 'electric':
+        return 0, sideEffects + [('Boost', 'Spe', 1)]
+    elif 'Lightning Rod' in defender.ability and typeName == 'electric':
+        return 0, sideEffects + [('Boost', 'Spa', 1)]
 
     # Battle Armor and Shell Armor ignores crits
     if 'Battle Armor' in defender.ability or 'Shell Armor' in defender.ability:
@@ -1141,7 +1695,7 @@ def calculate_damage(attacker, defender, attack, isCrit, defenderField, battleSt
         power = 40
     elif attack.name == 'techno-blast':
         if attacker.item == 'Douse Drive':
-            attack.type.name = 'water'
+            typeName = 'water'
             power = 120
     elif attack.name == 'hex':
         if defender.statusCondition is not None:
@@ -1185,7 +1739,7 @@ def calculate_damage(attacker, defender, attack, isCrit, defenderField, battleSt
             if isCrit:
                 defenseStat = defender.leveledStats['SpD']
     try:
-        if attack.type.name in attacker.type:
+        if typeName in attacker.type:
             if 'Adaptability' in attacker.ability:
                 stab = 2
             else:
@@ -1193,7 +1747,7 @@ def calculate_damage(attacker, defender, attack, isCrit, defenderField, battleSt
         else:
             stab = 1
     except AttributeError:
-        if attack.type[0] in attacker.type:
+        if attackType[0] in attacker.type:
             if 'Adaptability' in attacker.ability:
                 stab = 2
             else:
@@ -1202,17 +1756,11 @@ def calculate_damage(attacker, defender, attack, isCrit, defenderField, battleSt
             stab = 1
 
     # Calculate type effectiveness
-    typeEffectiveness = 1
     # Freeze dry has a unique type effectiveness
     if attack.name == 'freeze-dry':
-        for defenderType in defender.type:
-            typeEffectiveness *= typeChart['freeze-dry'][defenderType]
+        typeEffectiveness = get_type_effectiveness('freeze-dry', defender.type)
     else:
-        for defenderType in defender.type:
-            typeEffectiveness *= typeChart[attack.type.name][defenderType]
-
-    # This is the median damage roll
-    randomDamage = 91
+        typeEffectiveness = get_type_effectiveness(typeName, defender.type)
 
     # Factor in Burn damage reduction
     if attacker.statusCondition != 'BRN' or attack.damage_class.name != 'physical':
@@ -1227,16 +1775,16 @@ def calculate_damage(attacker, defender, attack, isCrit, defenderField, battleSt
     if battleState.weather['type'] is None:
         pass
     elif battleState.weather['type'] == 'Rain':
-        if attack.type.name == 'water':
+        if typeName == 'water':
             weather = 1.5
-        elif attack.type.name == 'fire':
+        elif typeName == 'fire':
             weather = .5
         elif attack.name == 'solar-beam' or attack.name == 'solar-blade':
             power *= .5
     elif battleState.weather['type'] == 'Sun':
-        if attack.type.name == 'fire':
+        if typeName == 'fire':
             weather = 1.5
-        elif attack.type.name == 'water':
+        elif typeName == 'water':
             weather = .5
     elif battleState.weather['type'] == 'Sandstorm' or battleState.weather['type'] == 'Hail':
         if attack.name == 'solar-beam' or attack.name == 'solar-blade':
@@ -1276,45 +1824,44 @@ def calculate_damage(attacker, defender, attack, isCrit, defenderField, battleSt
     # Misc attacker abilities
     if 'Analytic' in attacker.ability and defender.hasMoved:
         other *= 1.3
-    elif 'Torrent' in attacker.ability and attacker.hp < 33.4 and attack.type.name == 'water':
+    elif 'Torrent' in attacker.ability and attacker.hp < 33.4 and typeName == 'water':
         attackStat *= 1.5
-    elif 'Blaze' in attacker.ability and attacker.hp < 33.4 and attack.type.name == 'fire':
+    elif 'Blaze' in attacker.ability and attacker.hp < 33.4 and typeName == 'fire':
         attackStat *= 1.5
-    elif 'Overgrow' in attacker.ability and attacker.hp < 33.4 and attack.type.name == 'grass':
+    elif 'Overgrow' in attacker.ability and attacker.hp < 33.4 and typeName == 'grass':
         attackStat *= 1.5
-    elif 'Swarm' in attacker.ability and attacker.hp < 33.4 and attack.type.name == 'bug':
+    elif 'Swarm' in attacker.ability and attacker.hp < 33.4 and typeName == 'bug':
         attackStat *= 1.5
-    elif 'Sand Force' in attacker.ability and battleState.weather['type'] == 'Sandstorm' and attack.type.name in ['rock', 'ground', 'steel']:
+    elif 'Sand Force' in attacker.ability and battleState.weather['type'] == 'Sandstorm' and typeName in ['rock', 'ground', 'steel']:
         other *= 1.3
     elif 'Tinted Lens' in attacker.ability and typeEffectiveness < 1:
         typeEffectiveness *= 2
     elif 'Libero' in attacker.ability:
-        attack.type = [attack.type.name]
         stab = 1.5
-    elif 'Steelworker' in attacker.ability and attack.type.name == 'steel':
+    elif 'Steelworker' in attacker.ability and typeName == 'steel':
         attackStat *= 1.5
     elif 'Technician' in attacker.ability and attack.power <= 60:
         other *= 1.5
-    elif 'Steely Spirit' in attacker.ability and attack.type.name == 'steel':
+    elif 'Steely Spirit' in attacker.ability and typeName == 'steel':
         other *= 1.5
 
     # Misc defender abilities
     if 'Ice Scales' in defender.ability and attack.damage_class.name == 'special':
         other *= .5
-    elif 'Dry Skin' in defender.ability and attack.type.name == 'fire':
+    elif 'Dry Skin' in defender.ability and typeName == 'fire':
         other *= 1.25
-    elif 'Thick Fat' in defender.ability and attack.type.name in ['fire', 'ice']:
+    elif 'Thick Fat' in defender.ability and typeName in ['fire', 'ice']:
         attackStat *= .5
     elif ('Filter' in defender.ability or 'Prism Armor' in defender.ability or 'Solid Rock' in defender.ability)\
             and typeEffectiveness > 1:
         other *= .75
     elif 'Wonder Guard' in defender.ability and typeEffectiveness <= 1:
-        return 0
+        return 0, sideEffects
 
     damage = (((2 * level / 5) + 2) * power * attackStat/defenseStat/50) * weather * critical * stab * typeEffectiveness * (randomDamage / 100) * burn * other
     if damage < 1:
         damage = 1
-    return damage
+    return damage, sideEffects
 
 
 # Returns amount of damage caused by confusion self hit
@@ -1351,8 +1898,87 @@ def get_average_score(outcome_list):
     return average
 
 
-# Sets the given outcome's score from the AI model
-def calculate_score(outcome, prediction_function, scalar):
+# Sets the given outcome's score from the AI model. scalar is None when prediction_function is an inference bundle.
+def calculate_score(outcome, prediction_function, scalar, transposition_table=None):
+    if transposition_table is not None:
+        scoreKey = ('Score', get_battle_state_fingerprint(outcome.battleState))
+        score = transposition_table.get(scoreKey)
+        if score is not None:
+            outcome.set_score(score)
+            return
+    startTime = time.perf_counter()
+    layout = get_feature_layout(scalar)
+    arr = layout.encode_row(outcome.battleState)
+    # Without a scalar the prediction function is an inference bundle, which takes the unscaled row
+    if scalar is not None:
+        arr = scalar.transform(arr)
+        arr = np.asarray(arr.astype('float32'))
+    prediction = run_prediction(prediction_function, arr, startTime)
+    outcome.set_score(prediction[0][-1])
+    if transposition_table is not None:
+        transposition_table.put(scoreKey, outcome.score)
+
+
+# Returns the AI model scores for a list of outcomes, using a single call to the prediction function. With a
+# transposition table, only battle states not already in the table are scored, each one once.
+def calculate_scores(outcome_list, prediction_function, scalar, transposition_table=None):
+    if not outcome_list:
+        return []
+    if transposition_table is not None:
+        scores = [None] * len(outcome_list)
+        unscoredIndexes = {}
+        for i, outcome in enumerate(outcome_list):
+            scoreKey = ('Score', get_battle_state_fingerprint(outcome.battleState))
+            # A repeat of a battle state earlier in the list counts as a table hit
+            if scoreKey in unscoredIndexes:
+                unscoredIndexes[scoreKey].append(i)
+                transposition_table.hits += 1
+                continue
+            scores[i] = transposition_table.get(scoreKey)
+            if scores[i] is None:
+                unscoredIndexes[scoreKey] = [i]
+        unscoredOutcomes = [outcome_list[indexes[0]] for indexes in unscoredIndexes.values()]
+        newScores = calculate_scores(unscoredOutcomes, prediction_function, scalar)
+        for (scoreKey, indexes), score in zip(unscoredIndexes.items(), newScores):
+            transposition_table.put(scoreKey, score)
+            for i in indexes:
+                scores[i] = score
+        return scores
+    startTime = time.perf_counter()
+    arr = get_feature_layout(scalar).encode_outcomes(outcome_list)
+    # Without a scalar the prediction function is an inference bundle, which takes the unscaled row
+    if scalar is not None:
+        arr = scalar.transform(arr)
+        arr = np.asarray(arr.astype('float32'))
+    prediction = run_prediction(prediction_function, arr, startTime)
+    return [prediction[i][-1] for i in range(len(outcome_list))]
+
+
+# Returns the prediction function's output for the feature rows, and adds to the search counters. encoding_start is
+# when encoding the rows started.
+def run_prediction(prediction_function, arr, encoding_start):
+    startTime = time.perf_counter()
+    searchCounters['encodingTime'] += startTime - encoding_start
+    prediction = prediction_function(arr)
+    searchCounters['inferenceTime'] += time.perf_counter() - startTime
+    searchCounters['modelCalls'] += 1
+    searchCounters['rows'] += len(arr)
+    return prediction
+
+
+featureLayouts = {}
+
+
+# Returns the feature layout for the given scalar. Layouts are only built once.
+def get_feature_layout(scalar):
+    if id(scalar) not in featureLayouts:
+        featureLayouts[id(scalar)] = FeatureLayout(scalar)
+    return featureLayouts[id(scalar)]
+
+
+# Returns the unscaled model input row for the given outcome as a one row DataFrame, with its columns in training order,
+# built through pandas. This is the reference tests/test_feature_layout.py checks the FeatureLayout encoder against.
+def get_score_features(outcome):
     myLead = outcome.battleState.myTeam[outcome.battleState.myLeadIndex]
     opponentLead = outcome.battleState.opponentTeam[outcome.battleState.opponentLeadIndex]
     battleState = outcome.battleState
@@ -1505,17 +2131,9 @@ def calculate_score(outcome, prediction_function, scalar):
     # Change boolean columns to 1s and 0s
     for column in df.columns:
         if column not in numerical_columns:
-            logging.debug('Converting column: ' + str(column))
             df[column] = df[column].astype(int)
 
-    df = df.sort_index(axis=1)
-    arr = df.to_numpy()
-    #min_max_scaler = MinMaxScaler()
-    #arr = min_max_scaler.fit_transform(arr)
-    arr = scalar.transform(arr)
-    arr = np.asarray(arr.astype('float32'))
-    prediction = prediction_function(arr.reshape(1, -1))
-    outcome.set_score(prediction[0][-1])
+    return df.sort_index(axis=1)
 
 
 # Takes a list of outcomes. Returns the outcome with the lowest score
@@ -1537,7 +2155,7 @@ def get_best_case(outcome_list):
 
 
 def get_worst_outcome(outcome_list):
-    worst_score = 99
+    worst_score = float('inf')
     worst_outcome = outcome_list[0]
     for outcome in outcome_list:
         children_list = outcome.get_children()
@@ -1548,6 +2166,38 @@ def get_worst_outcome(outcome_list):
     return worst_outcome
 
 
+# Takes the payoff matrix of a turn, as a list with a row of opponent choice nodes for each of my options. Returns the
+# opponent's reply to each of my options, best option first, as picked by optionSelection. With EQUILIBRIUM, the reply
+# is the one the opponent's equilibrium strategy plays most, and it is scored with my option's average score against
+# that strategy.
+def select_option_outcomes(option_matrix):
+    startTime = time.perf_counter()
+    if optionSelection == 'MAXIMIN':
+        myOptionOutcomes = [get_worst_outcome(oppOptionOutcomes) for oppOptionOutcomes in option_matrix]
+        sort_best_outcomes(myOptionOutcomes)
+    else:
+        myOptionOutcomes = select_equilibrium_outcomes(option_matrix)
+    searchCounters['backupTime'] += time.perf_counter() - startTime
+    return myOptionOutcomes
+
+
+# EQUILIBRIUM version of select_option_outcomes
+def select_equilibrium_outcomes(option_matrix):
+    payoffs = np.array([[get_average_score(opponentChoice.get_children()) for opponentChoice in oppOptionOutcomes]
+                        for oppOptionOutcomes in option_matrix])
+    myStrategy, opponentStrategy = solve_matrix_game(payoffs)
+    myValues = payoffs @ opponentStrategy
+    opponentReplyIndex = opponentStrategy.argmax()
+    myOptionOutcomes = []
+    for i, oppOptionOutcomes in enumerate(option_matrix):
+        oppSelectedOutcome = oppOptionOutcomes[opponentReplyIndex]
+        oppSelectedOutcome.set_score(myValues[i])
+        myOptionOutcomes.append(oppSelectedOutcome)
+    # Options my equilibrium strategy plays more come first among options with the same score
+    order = sorted(range(len(myOptionOutcomes)), key=lambda i: (myValues[i], myStrategy[i]), reverse=True)
+    return [myOptionOutcomes[i] for i in order]
+
+
 # Best outcome at index 0, worst outcome at index -1
 def sort_best_outcomes(outcome_list):
     # Assign scores to each outcome in the given list based on their children's scores
@@ -1567,70 +2217,6 @@ def sort_best_outcomes(outcome_list):
 
 # Returns list of moves to consider on a given turn
 def attacks_to_consider(outcome, move_list, attacker, defender):
-    typeChart = {
-        'normal': {'normal': 1, 'fighting': 1, 'flying': 1, 'poison': 1, 'ground': 1, 'rock': .5, 'bug': 1, 'ghost': 0,
-                   'steel': .5, 'fire': 1, 'water': 1, 'grass': 1, 'electric': 1, 'psychic': 1, 'ice': 1, 'dragon': 1,
-                   'dark': 1, 'fairy': 1},
-        'fighting': {'normal': 2, 'fighting': 1, 'flying': .5, 'poison': .5, 'ground': 1, 'rock': 2, 'bug': .5,
-                     'ghost': 0,
-                     'steel': 2, 'fire': 1, 'water': 1, 'grass': 1, 'electric': 1, 'psychic': .5, 'ice': 2, 'dragon': 1,
-                     'dark': 2, 'fairy': .5},
-        'flying': {'normal': 1, 'fighting': 2, 'flying': 1, 'poison': 1, 'ground': 1, 'rock': .5, 'bug': 2, 'ghost': 1,
-                   'steel': .5, 'fire': 1, 'water': 1, 'grass': 2, 'electric': .5, 'psychic': 1, 'ice': 1, 'dragon': 1,
-                   'dark': 1, 'fairy': 1},
-        'poison': {'normal': 1, 'fighting': 1, 'flying': 1, 'poison': .5, 'ground': .5, 'rock': .5, 'bug': 1,
-                   'ghost': .5,
-                   'steel': 0, 'fire': 1, 'water': 1, 'grass': 2, 'electric': 1, 'psychic': 1, 'ice': 1, 'dragon': 1,
-                   'dark': 1, 'fairy': 2},
-        'ground': {'normal': 1, 'fighting': 1, 'flying': 0, 'poison': 2, 'ground': 1, 'rock': 2, 'bug': .5, 'ghost': 1,
-                   'steel': 2, 'fire': 2, 'water': 1, 'grass': .5, 'electric': 2, 'psychic': 1, 'ice': 1, 'dragon': 1,
-                   'dark': 1, 'fairy': 1},
-        'rock': {'normal': 1, 'fighting': .5, 'flying': 2, 'poison': 1, 'ground': .5, 'rock': .5, 'bug': 2, 'ghost': 1,
-                 'steel': .5, 'fire': 2, 'water': 1, 'grass': 1, 'electric': 1, 'psychic': 1, 'ice': 2, 'dragon': 1,
-                 'dark': 1, 'fairy': 1},
-        'bug': {'normal': 1, 'fighting': .5, 'flying': .5, 'poison': .5, 'ground': 1, 'rock': 1, 'bug': 1, 'ghost': .5,
-                'steel': .5, 'fire': .5, 'water': 1, 'grass': 2, 'electric': 1, 'psychic': 2, 'ice': 1, 'dragon': 1,
-                'dark': 2, 'fairy': .5},
-        'ghost': {'normal': 0, 'fighting': 1, 'flying': 1, 'poison': 1, 'ground': 1, 'rock': 1, 'bug': 1, 'ghost': 2,
-                  'steel': 1, 'fire': 1, 'water': 1, 'grass': 1, 'electric': 1, 'psychic': 2, 'ice': 1, 'dragon': 1,
-                  'dark': 2, 'fairy': 1},
-        'steel': {'normal': 1, 'fighting': 1, 'flying': 1, 'poison': 1, 'ground': 1, 'rock': 2, 'bug': 1, 'ghost': 1,
-                  'steel': .5, 'fire': .5, 'water': .5, 'grass': 1, 'electric': .5, 'psychic': 1, 'ice': 2, 'dragon': 1,
-                  'dark': 1, 'fairy': 2},
-        'fire': {'normal': 1, 'fighting': 1, 'flying': 1, 'poison': 1, 'ground': 1, 'rock': .5, 'bug': 2, 'ghost': 1,
-                 'steel': 2, 'fire': .5, 'water': .5, 'grass': 2, 'electric': 1, 'psychic': 1, 'ice': 2, 'dragon': .5,
-                 'dark': 1, 'fairy': 1},
-        'water': {'normal': 1, 'fighting': 1, 'flying': 1, 'poison': 1, 'ground': 2, 'rock': 2, 'bug': 1, 'ghost': 1,
-                  'steel': 1, 'fire': 2, 'water': .5, 'grass': .5, 'electric': 1, 'psychic': 1, 'ice': 1, 'dragon': .5,
-                  'dark': 1, 'fairy': 1},
-        'grass': {'normal': 1, 'fighting': 1, 'flying': .5, 'poison': .5, 'ground': 2, 'rock': 2, 'bug': .5, 'ghost': 1,
-                  'steel': .5, 'fire': .5, 'water': 2, 'grass': .5, 'electric': 1, 'psychic': 1, 'ice': 1, 'dragon': .5,
-                  'dark': 1, 'fairy': 1},
-        'electric': {'normal': 1, 'fighting': 1, 'flying': 2, 'poison': 1, 'ground': 0, 'rock': 1, 'bug': 1, 'ghost': 1,
-                     'steel': 1, 'fire': 1, 'water': 2, 'grass': .5, 'electric': .5, 'psychic': 1, 'ice': 1,
-                     'dragon': .5,
-                     'dark': 1, 'fairy': 1},
-        'psychic': {'normal': 1, 'fighting': 2, 'flying': 1, 'poison': 2, 'ground': 1, 'rock': 1, 'bug': 1, 'ghost': 1,
-                    'steel': .5, 'fire': 1, 'water': 1, 'grass': 1, 'electric': 1, 'psychic': .5, 'ice': 1, 'dragon': 1,
-                    'dark': 0, 'fairy': 1},
-        'ice': {'normal': 1, 'fighting': 1, 'flying': 2, 'poison': 1, 'ground': 2, 'rock': 1, 'bug': 1, 'ghost': 1,
-                'steel': .5, 'fire': .5, 'water': .5, 'grass': 2, 'electric': 1, 'psychic': 1, 'ice': .5, 'dragon': 2,
-                'dark': 1, 'fairy': 1},
-        'dragon': {'normal': 1, 'fighting': 1, 'flying': 1, 'poison': 1, 'ground': 1, 'rock': 1, 'bug': 1, 'ghost': 1,
-                   'steel': .5, 'fire': 1, 'water': 1, 'grass': 1, 'electric': 1, 'psychic': 1, 'ice': 1, 'dragon': 2,
-                   'dark': 1, 'fairy': 0},
-        'dark': {'normal': 1, 'fighting': .5, 'flying': 1, 'poison': 1, 'ground': 1, 'rock': 1, 'bug': 1, 'ghost': 2,
-                 'steel': 1, 'fire': 1, 'water': 1, 'grass': 1, 'electric': 1, 'psychic': 2, 'ice': 1, 'dragon': 1,
-                 'dark': .5, 'fairy': .5},
-        'fairy': {'normal': 1, 'fighting': 2, 'flying': 1, 'poison': .5, 'ground': 1, 'rock': 1, 'bug': 1, 'ghost': 1,
-                  'steel': .5, 'fire': .5, 'water': 1, 'grass': 1, 'electric': 1, 'psychic': 1, 'ice': 1, 'dragon': 2,
-                  'dark': 2, 'fairy': 1},
-        'freeze-dry': {'normal': 1, 'fighting': 1, 'flying': 2, 'poison': 1, 'ground': 2, 'rock': 1, 'bug': 1,
-                       'ghost': 1,
-                       'steel': .5, 'fire': .5, 'water': 2, 'grass': 2, 'electric': 1, 'psychic': 1, 'ice': .5,
-                       'dragon': 2,
-                       'dark': 1, 'fairy': 1},
-    }
     high_priority_moves = []
     standard_priority_moves = []
     low_priority_moves = []
@@ -1645,13 +2231,11 @@ def attacks_to_consider(outcome, move_list, attacker, defender):
                 status_moves.append(move)
             continue
         type_effectiveness = 1
-        for defender_type in defender.type:
-            if move_in_list(move, status_moves):
-                continue
+        if not move_in_list(move, status_moves):
             if move.name == 'freeze-dry':
-                type_effectiveness *= typeChart['freeze-dry'][defender_type]
+                type_effectiveness = get_type_effectiveness('freeze-dry', defender.type)
             else:
-                type_effectiveness *= typeChart[move.type.name][defender_type]
+                type_effectiveness = get_type_effectiveness(move.type.name, defender.type)
         if 'Levitate' in defender.ability and move.type.name == 'ground':
             type_effectiveness = 0
         elif 'Flash Fire' in defender.ability and move.type.name == 'fire':
@@ -1702,70 +2286,6 @@ def move_in_list(move, move_list):
 
 # Returns list of switch options
 def switches_to_consider(team, opposing_lead, opposing_move_list):
-    typeChart = {
-        'normal': {'normal': 1, 'fighting': 1, 'flying': 1, 'poison': 1, 'ground': 1, 'rock': .5, 'bug': 1, 'ghost': 0,
-                   'steel': .5, 'fire': 1, 'water': 1, 'grass': 1, 'electric': 1, 'psychic': 1, 'ice': 1, 'dragon': 1,
-                   'dark': 1, 'fairy': 1},
-        'fighting': {'normal': 2, 'fighting': 1, 'flying': .5, 'poison': .5, 'ground': 1, 'rock': 2, 'bug': .5,
-                     'ghost': 0,
-                     'steel': 2, 'fire': 1, 'water': 1, 'grass': 1, 'electric': 1, 'psychic': .5, 'ice': 2, 'dragon': 1,
-                     'dark': 2, 'fairy': .5},
-        'flying': {'normal': 1, 'fighting': 2, 'flying': 1, 'poison': 1, 'ground': 1, 'rock': .5, 'bug': 2, 'ghost': 1,
-                   'steel': .5, 'fire': 1, 'water': 1, 'grass': 2, 'electric': .5, 'psychic': 1, 'ice': 1, 'dragon': 1,
-                   'dark': 1, 'fairy': 1},
-        'poison': {'normal': 1, 'fighting': 1, 'flying': 1, 'poison': .5, 'ground': .5, 'rock': .5, 'bug': 1,
-                   'ghost': .5,
-                   'steel': 0, 'fire': 1, 'water': 1, 'grass': 2, 'electric': 1, 'psychic': 1, 'ice': 1, 'dragon': 1,
-                   'dark': 1, 'fairy': 2},
-        'ground': {'normal': 1, 'fighting': 1, 'flying': 0, 'poison': 2, 'ground': 1, 'rock': 2, 'bug': .5, 'ghost': 1,
-                   'steel': 2, 'fire': 2, 'water': 1, 'grass': .5, 'electric': 2, 'psychic': 1, 'ice': 1, 'dragon': 1,
-                   'dark': 1, 'fairy': 1},
-        'rock': {'normal': 1, 'fighting': .5, 'flying': 2, 'poison': 1, 'ground': .5, 'rock': .5, 'bug': 2, 'ghost': 1,
-                 'steel': .5, 'fire': 2, 'water': 1, 'grass': 1, 'electric': 1, 'psychic': 1, 'ice': 2, 'dragon': 1,
-                 'dark': 1, 'fairy': 1},
-        'bug': {'normal': 1, 'fighting': .5, 'flying': .5, 'poison': .5, 'ground': 1, 'rock': 1, 'bug': 1, 'ghost': .5,
-                'steel': .5, 'fire': .5, 'water': 1, 'grass': 2, 'electric': 1, 'psychic': 2, 'ice': 1, 'dragon': 1,
-                'dark': 2, 'fairy': .5},
-        'ghost': {'normal': 0, 'fighting': 1, 'flying': 1, 'poison': 1, 'ground': 1, 'rock': 1, 'bug': 1, 'ghost': 2,
-                  'steel': 1, 'fire': 1, 'water': 1, 'grass': 1, 'electric': 1, 'psychic': 2, 'ice': 1, 'dragon': 1,
-                  'dark': 2, 'fairy': 1},
-        'steel': {'normal': 1, 'fighting': 1, 'flying': 1, 'poison': 1, 'ground': 1, 'rock': 2, 'bug': 1, 'ghost': 1,
-                  'steel': .5, 'fire': .5, 'water': .5, 'grass': 1, 'electric': .5, 'psychic': 1, 'ice': 2, 'dragon': 1,
-                  'dark': 1, 'fairy': 2},
-        'fire': {'normal': 1, 'fighting': 1, 'flying': 1, 'poison': 1, 'ground': 1, 'rock': .5, 'bug': 2, 'ghost': 1,
-                 'steel': 2, 'fire': .5, 'water': .5, 'grass': 2, 'electric': 1, 'psychic': 1, 'ice': 2, 'dragon': .5,
-                 'dark': 1, 'fairy': 1},
-        'water': {'normal': 1, 'fighting': 1, 'flying': 1, 'poison': 1, 'ground': 2, 'rock': 2, 'bug': 1, 'ghost': 1,
-                  'steel': 1, 'fire': 2, 'water': .5, 'grass': .5, 'electric': 1, 'psychic': 1, 'ice': 1, 'dragon': .5,
-                  'dark': 1, 'fairy': 1},
-        'grass': {'normal': 1, 'fighting': 1, 'flying': .5, 'poison': .5, 'ground': 2, 'rock': 2, 'bug': .5, 'ghost': 1,
-                  'steel': .5, 'fire': .5, 'water': 2, 'grass': .5, 'electric': 1, 'psychic': 1, 'ice': 1, 'dragon': .5,
-                  'dark': 1, 'fairy': 1},
-        'electric': {'normal': 1, 'fighting': 1, 'flying': 2, 'poison': 1, 'ground': 0, 'rock': 1, 'bug': 1, 'ghost': 1,
-                     'steel': 1, 'fire': 1, 'water': 2, 'grass': .5, 'electric': .5, 'psychic': 1, 'ice': 1,
-                     'dragon': .5,
-                     'dark': 1, 'fairy': 1},
-        'psychic': {'normal': 1, 'fighting': 2, 'flying': 1, 'poison': 2, 'ground': 1, 'rock': 1, 'bug': 1, 'ghost': 1,
-                    'steel': .5, 'fire': 1, 'water': 1, 'grass': 1, 'electric': 1, 'psychic': .5, 'ice': 1, 'dragon': 1,
-                    'dark': 0, 'fairy': 1},
-        'ice': {'normal': 1, 'fighting': 1, 'flying': 2, 'poison': 1, 'ground': 2, 'rock': 1, 'bug': 1, 'ghost': 1,
-                'steel': .5, 'fire': .5, 'water': .5, 'grass': 2, 'electric': 1, 'psychic': 1, 'ice': .5, 'dragon': 2,
-                'dark': 1, 'fairy': 1},
-        'dragon': {'normal': 1, 'fighting': 1, 'flying': 1, 'poison': 1, 'ground': 1, 'rock': 1, 'bug': 1, 'ghost': 1,
-                   'steel': .5, 'fire': 1, 'water': 1, 'grass': 1, 'electric': 1, 'psychic': 1, 'ice': 1, 'dragon': 2,
-                   'dark': 1, 'fairy': 0},
-        'dark': {'normal': 1, 'fighting': .5, 'flying': 1, 'poison': 1, 'ground': 1, 'rock': 1, 'bug': 1, 'ghost': 2,
-                 'steel': 1, 'fire': 1, 'water': 1, 'grass': 1, 'electric': 1, 'psychic': 2, 'ice': 1, 'dragon': 1,
-                 'dark': .5, 'fairy': .5},
-        'fairy': {'normal': 1, 'fighting': 2, 'flying': 1, 'poison': .5, 'ground': 1, 'rock': 1, 'bug': 1, 'ghost': 1,
-                  'steel': .5, 'fire': .5, 'water': 1, 'grass': 1, 'electric': 1, 'psychic': 1, 'ice': 1, 'dragon': 2,
-                  'dark': 2, 'fairy': 1},
-        'freeze-dry': {'normal': 1, 'fighting': 1, 'flying': 2, 'poison': 1, 'ground': 2, 'rock': 1, 'bug': 1,
-                       'ghost': 1,
-                       'steel': .5, 'fire': .5, 'water': 2, 'grass': 2, 'electric': 1, 'psychic': 1, 'ice': .5,
-                       'dragon': 2,
-                       'dark': 1, 'fairy': 1},
-    }
     high_priority_switches = []
     standard_priority_switches = []
     low_priority_switches = []
@@ -1784,9 +2304,7 @@ def switches_to_consider(team, opposing_lead, opposing_move_list):
         if outspeeded:
             added = False
             for move in member.possibleMoves:
-                type_effectiveness = 1
-                for defender_type in opposing_lead.type:
-                    type_effectiveness *= typeChart[move.type.name][defender_type]
+                type_effectiveness = get_type_effectiveness(move.type.name, opposing_lead.type)
                 if type_effectiveness > 1:
                     high_priority_switches.append(member)
                     added = True
@@ -1796,12 +2314,10 @@ def switches_to_consider(team, opposing_lead, opposing_move_list):
         resistances = 0
         weaknesses = 0
         for move in opposing_move_list:
-            type_effectiveness = 1
-            for defender_type in member.type:
-                try:
-                    type_effectiveness *= typeChart[move.type.name][defender_type]
-                except AttributeError:
-                    type_effectiveness *= typeChart[move.type[0].name][defender_type]
+            try:
+                type_effectiveness = get_type_effectiveness(move.type.name, member.type)
+            except AttributeError:
+                type_effectiveness = get_type_effectiveness(move.type[0].name, member.type)
             if type_effectiveness < 1:
                 resistances += 1
             elif type_effectiveness > 1:
@@ -0,0 +1,38 @@
+import numpy as np
+
+# The 16 random damage rolls, as percentages of the highest roll
+DAMAGE_ROLLS = np.arange(85, 101, dtype=np.float64)
+# Moves whose damage doesn't depend on the random roll or a crit
+FIXED_DAMAGE_MOVES = ['seismic-toss', 'night-shade', 'super-fang', 'counter', 'mirror-coat']
+
+
+# Returns a (hits, 2, 16) array with the damage of every roll of each hit, without and with a crit. max_roll_damage is a
+# (hits, 2) array of the damage at the highest roll. Hits marked as fixed take the same damage on every roll.
+def get_damage_distributions(max_roll_damage, fixed):
+    maxRollDamage = np.asarray(max_roll_damage, dtype=np.float64)[:, :, None]
+    # Damage is always at least 1, unless the attack was blocked
+    distributions = np.maximum(maxRollDamage * (DAMAGE_ROLLS / 100), 1)
+    return np.where(np.asarray(fixed, dtype=bool)[:, None, None], maxRollDamage, distributions)
+
+
+# Splits each hit's damage distribution into the rolls that KO the defender and the rolls that don't. Returns arrays
+# with the probability of a KO, the average damage of the KO rolls and the average damage of the other rolls. Where a
+# side has no rolls, its average damage is the average of all rolls.
+def get_ko_outcomes(distributions, crit_chances, hp_remaining):
+    critChances = np.asarray(crit_chances, dtype=np.float64)
+    weights = np.empty(distributions.shape[:2])
+    weights[:, 0] = 1 - critChances
+    weights[:, 1] = critChances
+    weights = np.broadcast_to(weights[:, :, None] / len(DAMAGE_ROLLS), distributions.shape)
+    knockedOut = distributions >= np.asarray(hp_remaining, dtype=np.float64)[:, None, None]
+
+    koWeights = np.where(knockedOut, weights, 0)
+    surviveWeights = weights - koWeights
+    koMass = koWeights.sum(axis=(1, 2))
+    surviveMass = surviveWeights.sum(axis=(1, 2))
+    averageDamage = (weights * distributions).sum(axis=(1, 2)) / (koMass + surviveMass)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        koDamage = np.where(koMass > 0, (koWeights * distributions).sum(axis=(1, 2)) / koMass, averageDamage)
+        surviveDamage = np.where(surviveMass > 0, (surviveWeights * distributions).sum(axis=(1, 2)) / surviveMass,
+                                 averageDamage)
+    return koMass / (koMass + surviveMass), koDamage, surviveDamage
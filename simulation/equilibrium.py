@@ -0,0 +1,56 @@
+import numpy as np
+
+# Most regret matching iterations run when the game has no pure equilibrium
+EQUILIBRIUM_ITERATIONS = 2000
+# Regret matching stops once neither player can gain more than this fraction of the payoff range by changing strategy
+EQUILIBRIUM_TOLERANCE = 0.01
+
+
+# Returns a strategy playing each option in proportion to its positive regret, or uniformly if no regret is positive
+def get_regret_strategy(regrets):
+    total = regrets.sum()
+    if total <= 0:
+        return np.full(len(regrets), 1 / len(regrets))
+    return regrets / total
+
+
+# Solves the zero-sum game with the given (my options, opponent options) payoff matrix, where I maximise the payoff and
+# my opponent minimises it. Returns my mixed strategy and my opponent's, as arrays of probabilities. A pure equilibrium
+# is returned directly, otherwise the strategies are found with regret matching+.
+def solve_matrix_game(payoffs, iterations=EQUILIBRIUM_ITERATIONS, tolerance=EQUILIBRIUM_TOLERANCE):
+    payoffs = np.asarray(payoffs, dtype=np.float64)
+    rows, columns = payoffs.shape
+    rowMinimums = payoffs.min(axis=1)
+    columnMaximums = payoffs.max(axis=0)
+    # A saddle point is an equilibrium in pure strategies
+    if rowMinimums.max() >= columnMaximums.min():
+        myStrategy = np.zeros(rows)
+        myStrategy[rowMinimums.argmax()] = 1
+        opponentStrategy = np.zeros(columns)
+        opponentStrategy[columnMaximums.argmin()] = 1
+        return myStrategy, opponentStrategy
+
+    maxGain = tolerance * (payoffs.max() - payoffs.min())
+    myRegrets = np.zeros(rows)
+    opponentRegrets = np.zeros(columns)
+    myStrategy = np.full(rows, 1 / rows)
+    opponentStrategy = np.full(columns, 1 / columns)
+    myStrategySum = np.zeros(rows)
+    opponentStrategySum = np.zeros(columns)
+    for iteration in range(1, iterations + 1):
+        myValues = payoffs @ opponentStrategy
+        opponentValues = myStrategy @ payoffs
+        value = myStrategy @ myValues
+        myRegrets = np.maximum(myRegrets + myValues - value, 0)
+        opponentRegrets = np.maximum(opponentRegrets + value - opponentValues, 0)
+        myStrategy = get_regret_strategy(myRegrets)
+        opponentStrategy = get_regret_strategy(opponentRegrets)
+        # Later iterations are weighted more, which makes the average converge faster
+        myStrategySum += iteration * myStrategy
+        opponentStrategySum += iteration * opponentStrategy
+        if iteration % 10 == 0:
+            myAverage = myStrategySum / myStrategySum.sum()
+            opponentAverage = opponentStrategySum / opponentStrategySum.sum()
+            if (payoffs @ opponentAverage).max() - (myAverage @ payoffs).min() <= maxGain:
+                break
+    return myStrategySum / myStrategySum.sum(), opponentStrategySum / opponentStrategySum.sum()
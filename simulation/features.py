@@ -0,0 +1,173 @@
+import numpy as np
+
+
+# Builds the model input column names the same way battle_ai/ai.py does before sorting them
+def get_feature_columns():
+    columns = ['Elo', 'Weather_Hail', 'Weather_None', 'Weather_Rain', 'Weather_Sandstorm', 'Weather_Sun',
+               'Terrain_Electric Terrain', 'Terrain_Grassy Terrain', 'Terrain_Misty Terrain', 'Terrain_None',
+               'Terrain_Psychic Terrain']
+    types = ['Bug', 'Dark', 'Dragon', 'Electric', 'Fairy', 'Fighting', 'Fire', 'Flying', 'Ghost', 'Grass', 'Ground',
+             'Ice', 'Normal', 'Poison', 'Psychic', 'Rock', 'Steel', 'Water']
+    statuses = ['BRN', 'FALSE', 'FRZ', 'PAR', 'PSN', 'SLP', 'TOX']
+    for player in ['P1', 'P2']:
+        columns += [player + 'AtkBoosts', player + 'DefBoosts', player + 'SpaBoosts', player + 'SpdBoosts',
+                    player + 'SpeBoosts', player + 'DynamaxAvailable', player + 'HasDamageEntryHazards',
+                    player + 'HasStickyWeb', player + 'HasToxicSpikes', player + 'LeadConfused',
+                    player + 'LeadDynamaxed', player + 'LeadEncore', player + 'LeadHP', player + 'LeadLeechSeed',
+                    player + 'LeadTaunted', player + 'PokemonRemaining', player + 'PokemonRevealed',
+                    player + 'ScreenUp', player + 'TeamStatuses']
+        columns += [player + 'LeadStatus_' + status for status in statuses]
+        columns += [player + 'LeadType1_' + type for type in types]
+        columns += [player + 'LeadType2_' + type for type in types + ['None']]
+        for reserve in range(1, 6):
+            columns += [player + 'R' + str(reserve) + 'HP', player + 'R' + str(reserve) + 'Revealed']
+    return sorted(columns)
+
+
+# Fixed column -> index map for the AI model input. Encodes battle states straight into numpy rows, producing the
+# same values as the pandas based get_score_features.
+class FeatureLayout:
+    def __init__(self, scalar=None):
+        self.columns = get_feature_columns()
+        if scalar is not None and hasattr(scalar, 'feature_names_in_'):
+            self.columns = list(scalar.feature_names_in_)
+        if scalar is not None and scalar.n_features_in_ != len(self.columns):
+            raise Exception('Scalar expects ' + str(scalar.n_features_in_) + ' features, feature layout has '
+                            + str(len(self.columns)))
+        self.index = {column: index for index, column in enumerate(self.columns)}
+        self.size = len(self.columns)
+
+        index = self.index
+        self.elo = index['Elo']
+        self.weather = {'Hail': index['Weather_Hail'], 'Rain': index['Weather_Rain'],
+                        'Sandstorm': index['Weather_Sandstorm'], 'Sun': index['Weather_Sun'],
+                        None: index['Weather_None']}
+        self.terrain = {'Electric Terrain': index['Terrain_Electric Terrain'],
+                        'Grassy Terrain': index['Terrain_Grassy Terrain'],
+                        'Misty Terrain': index['Terrain_Misty Terrain'],
+                        'Psychic Terrain': index['Terrain_Psychic Terrain'], None: index['Terrain_None']}
+        self.players = [self.get_player_indexes('P1'), self.get_player_indexes('P2')]
+        self.scratchRow = self.allocate(1)
+        # Opponent ground types are recorded in the Type1 column by the original type table
+        self.players[1]['type2']['ground'] = index['P2LeadType1_Ground']
+
+    def get_player_indexes(self, player):
+        index = self.index
+        types = ['bug', 'dark', 'dragon', 'electric', 'fairy', 'fighting', 'fire', 'flying', 'ghost', 'grass',
+                 'ground', 'ice', 'normal', 'poison', 'psychic', 'rock', 'steel', 'water']
+        playerIndexes = {
+            'boosts': [(index[player + 'AtkBoosts'], 'Atk'), (index[player + 'DefBoosts'], 'Def'),
+                       (index[player + 'SpaBoosts'], 'Spa'), (index[player + 'SpdBoosts'], 'SpD'),
+                       (index[player + 'SpeBoosts'], 'Spe')],
+            'dynamaxAvailable': index[player + 'DynamaxAvailable'],
+            'damageHazards': index[player + 'HasDamageEntryHazards'],
+            'stickyWeb': index[player + 'HasStickyWeb'],
+            'toxicSpikes': index[player + 'HasToxicSpikes'],
+            'confused': index[player + 'LeadConfused'],
+            'dynamaxed': index[player + 'LeadDynamaxed'],
+            'encore': index[player + 'LeadEncore'],
+            'hp': index[player + 'LeadHP'],
+            'leechSeed': index[player + 'LeadLeechSeed'],
+            'taunted': index[player + 'LeadTaunted'],
+            'remaining': index[player + 'PokemonRemaining'],
+            'revealed': index[player + 'PokemonRevealed'],
+            'screenUp': index[player + 'ScreenUp'],
+            'teamStatuses': index[player + 'TeamStatuses'],
+            'status': {'BRN': [index[player + 'LeadStatus_BRN']], 'FRZ': [index[player + 'LeadStatus_FRZ']],
+                       'SLP': [index[player + 'LeadStatus_SLP']], 'TOX': [index[player + 'LeadStatus_TOX']],
+                       None: [index[player + 'LeadStatus_FALSE']]},
+            'type1': {type: index[player + 'LeadType1_' + type.capitalize()] for type in types},
+            'type2': {type: index[player + 'LeadType2_' + type.capitalize()] for type in types},
+            'reserveHP': [index[player + 'R' + str(reserve) + 'HP'] for reserve in range(1, 6)],
+            'reserveRevealed': [index[player + 'R' + str(reserve) + 'Revealed'] for reserve in range(1, 6)]
+        }
+        # Lead poison is flagged by paralysis, matching the columns the models were scored with
+        if player == 'P1':
+            playerIndexes['status']['PAR'] = [index['P1LeadStatus_PAR'], index['P1LeadStatus_PSN']]
+        else:
+            playerIndexes['status']['PAR'] = [index['P2LeadStatus_PAR']]
+            playerIndexes['status']['PSN'] = [index['P2LeadStatus_PSN']]
+        return playerIndexes
+
+    # Returns a zeroed matrix with one row per battle state
+    def allocate(self, rows, dtype=np.float64):
+        return np.zeros((rows, self.size), dtype=dtype)
+
+    # Returns a matrix holding the encoded battle state of every outcome in the list
+    def encode_outcomes(self, outcome_list, dtype=np.float64):
+        matrix = self.allocate(len(outcome_list), dtype)
+        for rowIndex, outcome in enumerate(outcome_list):
+            self.encode(outcome.battleState, matrix[rowIndex])
+        return matrix
+
+    # Encodes the battle state into the layout's preallocated 1 x size row. The row is reused by the next call.
+    def encode_row(self, battleState):
+        self.scratchRow.fill(0)
+        self.encode(battleState, self.scratchRow[0])
+        return self.scratchRow
+
+    # Writes the battle state into a zeroed row of length self.size
+    def encode(self, battleState, row):
+        row[self.elo] = np.nan if battleState.elo is None else battleState.elo
+        if battleState.weather['type'] in self.weather:
+            row[self.weather[battleState.weather['type']]] = 1
+        if battleState.terrain['type'] in self.terrain:
+            row[self.terrain[battleState.terrain['type']]] = 1
+        self.encode_player(row, self.players[0], battleState.myTeam, battleState.myLeadIndex, battleState.myField,
+                           battleState.myDynamaxAvailable,
+                           (battleState.get_my_pokemon_remaining(), battleState.get_my_pokemon_revealed(),
+                            battleState.get_my_team_statuses()), True)
+        self.encode_player(row, self.players[1], battleState.opponentTeam, battleState.opponentLeadIndex,
+                           battleState.opponentField, battleState.opponentDynamaxAvailable,
+                           (battleState.get_opponent_pokemon_remaining(), battleState.get_opponent_pokemon_revealed(),
+                            battleState.get_opponent_team_statuses()), False)
+        return row
+
+    # teamCounts holds the pokemon remaining, pokemon revealed and team status counts for the player
+    def encode_player(self, row, indexes, team, leadIndex, field, dynamaxAvailable, teamCounts, isMine):
+        lead = team[leadIndex]
+        for column, stat in indexes['boosts']:
+            row[column] = lead.boosts[stat]
+        row[indexes['dynamaxAvailable']] = dynamaxAvailable
+        hazards = field['entryHazards']
+        row[indexes['damageHazards']] = 'Stealth Rock' in hazards or 'Spikes' in hazards
+        row[indexes['stickyWeb']] = 'Sticky Web' in hazards
+        row[indexes['toxicSpikes']] = 'Toxic Spikes' in hazards
+        volatileConditions = lead.volatileConditions
+        row[indexes['confused']] = 'Confused' in volatileConditions
+        row[indexes['encore']] = 'Encore' in volatileConditions
+        row[indexes['leechSeed']] = 'Leech Seed' in volatileConditions
+        row[indexes['taunted']] = 'Taunt' in volatileConditions
+        row[indexes['dynamaxed']] = lead.isDynamaxed
+        row[indexes['hp']] = lead.hp
+        row[indexes['remaining']] = teamCounts[0]
+        row[indexes['revealed']] = teamCounts[1]
+        row[indexes['screenUp']] = field['reflect']['isUp'] or field['lightScreen']['isUp'] or \
+            field['auroraVeil']['isUp']
+        row[indexes['teamStatuses']] = teamCounts[2]
+        if lead.statusCondition in indexes['status']:
+            row[indexes['status'][lead.statusCondition]] = 1
+
+        # Fill in lead's types
+        row[indexes['type1'][lead.type[0]]] = 1
+        if len(lead.type) > 1:
+            row[indexes['type2'][lead.type[1]]] = 1
+
+        # Fill in reserve information
+        reserveHealth = indexes['reserveHP']
+        reserveRevealed = indexes['reserveRevealed']
+        reserveIndex = 0
+        for member in team:
+            if member is lead:
+                continue
+            row[reserveHealth[reserveIndex]] = member.hp
+            row[reserveRevealed[reserveIndex]] = member.isRevealed if isMine else True
+            reserveIndex += 1
+        while reserveIndex < 5:
+            if isMine:
+                row[reserveHealth[reserveIndex]] = np.nan
+                row[reserveRevealed[reserveIndex]] = np.nan
+            # Fill in information for unrevealed opponent team members
+            else:
+                row[reserveHealth[reserveIndex]] = 100
+            reserveIndex += 1
@@ -0,0 +1,155 @@
+import copy
+import json
+import os
+import pickle
+import numpy as np
+
+MODEL_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'battle_ai', 'models')
+
+
+# A model with the MinMaxScaler folded into its first layer. The bundle takes the unscaled feature rows from the
+# feature layout, so scoring a leaf no longer needs a scalar.transform call or a float32 copy of the row.
+class InferenceBundle:
+    def __init__(self, model, scalar):
+        self.scalar = scalar
+        self.referenceModel = model
+        self.model = fold_scalar(model, scalar)
+        self.predict = get_prediction_function(self.model)
+
+    # Raises an exception if the bundle's predictions differ from the scalar + model pipeline by more than the
+    # tolerance. If no rows are given, random rows inside the scalar's fitted range are used. Returns the largest
+    # difference found.
+    def verify(self, rows=None, tolerance=1e-6):
+        if rows is None:
+            generator = np.random.default_rng(0)
+            rows = generator.uniform(self.scalar.data_min_, self.scalar.data_max_,
+                                     (256, self.scalar.n_features_in_))
+        scaledRows = np.asarray(self.scalar.transform(rows).astype('float32'))
+        expected = np.asarray(get_prediction_function(self.referenceModel)(scaledRows), dtype=np.float64)
+        actual = np.asarray(self.predict(rows), dtype=np.float64)
+        maxError = float(np.max(np.abs(expected[:, -1] - actual[:, -1])))
+        if not maxError <= tolerance:
+            raise Exception('Inference bundle predictions differ from the unfused model by ' + str(maxError))
+        return maxError
+
+
+# Loads the named model from battle_ai/models. Returns the prediction function and the scalar to pass to the search.
+# With an inference bundle, the scalar is folded into the model and None is returned for the scalar.
+def load_prediction_model(model_name, inference_backend='NUMPY', use_inference_bundle=True):
+    if model_name in ['model1', 'model2']:
+        path = os.path.join(MODEL_DIRECTORY, model_name + '.h5')
+        if inference_backend == 'NUMPY':
+            model = load_h5_model(path)
+        elif inference_backend == 'KERAS':
+            from tensorflow import keras
+            model = keras.models.load_model(path)
+        else:
+            raise Exception('Invalid INFERENCE_BACKEND entered. (Either enter NUMPY or KERAS)')
+    else:
+        with open(os.path.join(MODEL_DIRECTORY, model_name + '.pkl'), 'rb') as file:
+            model = pickle.load(file)
+    with open(os.path.join(MODEL_DIRECTORY, 'scalar.pkl'), 'rb') as file:
+        scalar = pickle.load(file)
+    if not use_inference_bundle:
+        return get_prediction_function(model), scalar
+    bundle = InferenceBundle(model, scalar)
+    bundle.verify()
+    return bundle.predict, None
+
+
+# Returns the function used to get win probabilities from the model
+def get_prediction_function(model):
+    if hasattr(model, 'predict_proba'):
+        return model.predict_proba
+    return model.predict
+
+
+# Returns a copy of the model which gives the same predictions on unscaled rows as the model does on scaled rows.
+# The MinMaxScaler computes row * scale_ + min_, which is folded into the model's first set of weights.
+def fold_scalar(model, scalar):
+    scale = np.asarray(scalar.scale_, dtype=np.float64)
+    offset = np.asarray(scalar.min_, dtype=np.float64)
+
+    # Logistic Regression: the scalar is folded into the coefficients and intercept
+    if hasattr(model, 'coef_'):
+        foldedModel = copy.deepcopy(model)
+        foldedModel.coef_ = model.coef_ * scale
+        foldedModel.intercept_ = model.intercept_ + model.coef_ @ offset
+        return foldedModel
+
+    # Naive Bayes: each class's feature means and variances are moved into the unscaled space. The log(scale) term
+    # this adds to every class's likelihood is the same for all classes, so predict_proba is unchanged.
+    if hasattr(model, 'theta_'):
+        foldedModel = copy.deepcopy(model)
+        foldedModel.theta_ = (model.theta_ - offset) / scale
+        foldedModel.var_ = model.var_ / (scale ** 2)
+        return foldedModel
+
+    # NumPy MLP: the scalar is folded into the kernel and bias of the first Dense layer
+    if isinstance(model, NumpyMLP):
+        kernel, bias, activation = model.layers[0]
+        foldedLayer = (kernel * scale[:, None], bias + offset @ kernel, activation)
+        return NumpyMLP([foldedLayer] + model.layers[1:])
+
+    # Keras: the scalar is folded into the kernel and bias of the first Dense layer
+    if hasattr(model, 'layers'):
+        foldedModel = type(model).from_config(model.get_config())
+        foldedModel.set_weights(model.get_weights())
+        firstLayer = [layer for layer in foldedModel.layers if layer.get_weights()][0]
+        kernel, bias = firstLayer.get_weights()
+        kernel64 = kernel.astype(np.float64)
+        firstLayer.set_weights([(kernel64 * scale[:, None]).astype(kernel.dtype),
+                                (bias + offset @ kernel64).astype(bias.dtype)])
+        return foldedModel
+
+    raise Exception('Unsupported model for an inference bundle: ' + type(model).__name__)
+
+
+# A Keras Dense network run with NumPy. layers is a list of (kernel, bias, activation name) tuples. The network is
+# run in float64, which keeps a folded scalar within the inference bundle tolerance of the unfused model.
+class NumpyMLP:
+    activations = {
+        'linear': lambda x: x,
+        'relu': lambda x: np.maximum(x, 0),
+        # Written with tanh so large negative inputs don't overflow np.exp
+        'sigmoid': lambda x: 0.5 * (1 + np.tanh(0.5 * x)),
+        'tanh': np.tanh
+    }
+
+    def __init__(self, layers):
+        for kernel, bias, activation in layers:
+            if activation not in NumpyMLP.activations:
+                raise Exception('Unsupported activation for a NumPy MLP: ' + str(activation))
+        self.layers = layers
+
+    # Returns the network output for a batch of rows, with the same (rows, units) shape as keras' model.predict
+    def predict(self, arr):
+        arr = np.asarray(arr, dtype=np.float64)
+        for kernel, bias, activation in self.layers:
+            arr = NumpyMLP.activations[activation](arr @ kernel + bias)
+        return arr
+
+
+# Reads the Dense layers of a Keras .h5 model file into a NumpyMLP, without importing TensorFlow
+def load_h5_model(path):
+    import h5py
+    layers = []
+    with h5py.File(path, 'r') as file:
+        modelConfig = file.attrs['model_config']
+        if isinstance(modelConfig, bytes):
+            modelConfig = modelConfig.decode('utf-8')
+        modelWeights = file['model_weights'] if 'model_weights' in file else file
+        for layerConfig in json.loads(modelConfig)['config']['layers']:
+            className = layerConfig['class_name']
+            config = layerConfig['config']
+            # Input and dropout layers don't change the output at inference time
+            if className in ['InputLayer', 'Dropout']:
+                continue
+            if className != 'Dense':
+                raise Exception('Unsupported layer for a NumPy MLP: ' + className)
+            layerGroup = modelWeights[config['name']]
+            weights = [np.asarray(layerGroup[name], dtype=np.float64) for name in layerGroup.attrs['weight_names']]
+            kernel = weights[0]
+            bias = weights[1] if config['use_bias'] else np.zeros(kernel.shape[1])
+            layers.append((kernel, bias, config['activation']))
+    return NumpyMLP(layers)
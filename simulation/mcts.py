@@ -0,0 +1,192 @@
+import logging
+import math
+import random
+import time
+from .calculations import OutcomeNode, calculate_score, decide_option, get_my_forced_switch_options, \
+    get_opponent_forced_switch_options, get_ordered_turn_options, simulate_switch, simulate_turn
+from .splitreason import SplitReason
+
+# Decisions at a Monte Carlo node. My turn options and my forced switches are picked by me, replies and the opponent's
+# forced switches by the opponent. A chance node samples one of the outcomes of a simulated turn.
+MY_TURN = 'My turn'
+OPPONENT_REPLY = 'Opponent reply'
+MY_FORCED_SWITCH = 'My forced switch'
+OPPONENT_FORCED_SWITCH = 'Opponent forced switch'
+CHANCE = 'Chance'
+LEAF = 'Leaf'
+
+
+# A node of the Monte Carlo search tree. It wraps the OutcomeNode holding the battle state, and keeps the visit count
+# and the sum of the values backed up through it. turn_depth is the number of turns left to search below it.
+class MonteCarloNode:
+    def __init__(self, outcome, turn_depth, decision, options=None):
+        self.outcome = outcome
+        self.turnDepth = turn_depth
+        self.decision = decision
+        self.untriedOptions = list(options) if options else []
+        self.children = []
+        self.childOptions = []
+        self.probabilities = []
+        self.visits = 0
+        self.valueSum = 0
+        # Set for leaves, and for battles which are over
+        self.value = None
+
+    def get_mean_value(self):
+        if self.visits == 0:
+            return 0
+        return self.valueSum / self.visits
+
+    # Returns the child with the best upper confidence bound for the player making the decision
+    def select_child(self, exploration):
+        logVisits = math.log(self.visits)
+        bestChild = None
+        bestBound = None
+        for child in self.children:
+            meanValue = child.get_mean_value()
+            if self.decision in [OPPONENT_REPLY, OPPONENT_FORCED_SWITCH]:
+                meanValue = 1 - meanValue
+            bound = meanValue + exploration * math.sqrt(logVisits / child.visits)
+            if bestBound is None or bound > bestBound:
+                bestChild = child
+                bestBound = bound
+        return bestChild
+
+    # Returns a child outcome of a chance node, sampled by the outcomes' probabilities
+    def sample_child(self, generator):
+        return generator.choices(self.children, weights=self.probabilities)[0]
+
+
+# Returns the Monte Carlo node for a battle state at the start of a turn, or after a forced switch
+def create_state_node(outcome, turn_depth):
+    battleState = outcome.battleState
+    if not battleState.myTeam[battleState.myLeadIndex].inBattle:
+        options = get_my_forced_switch_options(battleState)
+        node = MonteCarloNode(outcome, turn_depth, MY_FORCED_SWITCH, options)
+        # If I have no lead, and no switch options, I've lost
+        if not options:
+            node.value = 0
+        return node
+    if not battleState.opponentTeam[battleState.opponentLeadIndex].inBattle:
+        options = get_opponent_forced_switch_options(battleState)
+        node = MonteCarloNode(outcome, turn_depth, OPPONENT_FORCED_SWITCH, options)
+        # If the opponent has no lead, and no switch options, I've won
+        if not options:
+            node.value = 1
+        return node
+    if turn_depth <= 0:
+        return MonteCarloNode(outcome, turn_depth, LEAF)
+    # Untried options are expanded in order, so with static option ordering the most promising are tried first
+    myPossibleOptions, opponentPossibleOptions, orderKey = get_ordered_turn_options(outcome, None)
+    node = MonteCarloNode(outcome, turn_depth, MY_TURN, myPossibleOptions)
+    node.opponentOptions = opponentPossibleOptions
+    return node
+
+
+# Expands the next untried option of a decision node, and returns the new child. Forced switches count towards the
+# depth the same way they do in decide_option.
+def expand_child(node):
+    option = node.untriedOptions.pop(0)
+    if node.decision == MY_TURN:
+        myChoice = OutcomeNode(node.outcome, 1, SplitReason.MY_TURN_DECISION)
+        myChoice.set_my_selected_option((option[0], option[1]))
+        child = MonteCarloNode(myChoice, node.turnDepth, OPPONENT_REPLY, node.opponentOptions)
+    elif node.decision == OPPONENT_REPLY:
+        myChoice = node.outcome
+        battleState = myChoice.parent.battleState
+        opponentChoice = OutcomeNode(myChoice, 1, SplitReason.OPPONENT_TURN_DECISION)
+        opponentChoice.set_oppponent_selected_option((option[0], option[1]))
+        myOption = myChoice.mySelectedOption
+        outcomes = simulate_turn(opponentChoice, battleState.myTeam[battleState.myLeadIndex],
+                                 battleState.opponentTeam[battleState.opponentLeadIndex], myOption[0], option[0],
+                                 myOption[1], option[1])
+        child = MonteCarloNode(opponentChoice, node.turnDepth, CHANCE)
+        for outcome in outcomes:
+            child.children.append(create_state_node(outcome, node.turnDepth - 1))
+            child.probabilities.append(outcome.probability)
+    elif node.decision == MY_FORCED_SWITCH:
+        newNode = OutcomeNode(node.outcome, 1, SplitReason.MY_FORCED_SWITCH, (option[1],))
+        newNode.set_my_selected_option(option)
+        simulate_switch(newNode, True, option[1])
+        child = create_state_node(newNode, node.turnDepth - 1)
+    else:
+        newNode = OutcomeNode(node.outcome, 1, SplitReason.OPPONENT_FORCED_SWITCH, (option[1],))
+        newNode.set_oppponent_selected_option(option)
+        simulate_switch(newNode, False, option[1])
+        child = create_state_node(newNode, node.turnDepth)
+    node.children.append(child)
+    node.childOptions.append(option)
+    return child
+
+
+# Runs one iteration: selects a path down the tree, expands it by one node, and backs up the new node's value. Battle
+# states are valued with the AI model the first time they are reached.
+def run_iteration(root, prediction_function, scalar, transposition_table, exploration, generator):
+    path = [root]
+    node = root
+    while True:
+        if node.value is not None:
+            value = node.value
+            break
+        if node.decision in [MY_TURN, MY_FORCED_SWITCH, LEAF] and node.visits == 0 and node is not root:
+            calculate_score(node.outcome, prediction_function, scalar, transposition_table)
+            value = float(node.outcome.score)
+            if node.decision == LEAF:
+                node.value = value
+            break
+        if node.decision == CHANCE:
+            node = node.sample_child(generator)
+        elif node.untriedOptions:
+            node = expand_child(node)
+        else:
+            node = node.select_child(exploration)
+        path.append(node)
+    for pathNode in path:
+        pathNode.visits += 1
+        pathNode.valueSum += value
+
+
+# Monte Carlo tree search version of decide_option. Runs UCT iterations until time_budget seconds have passed or
+# max_iterations have been run, whichever comes first, but always tries each of my options once. Chance outcomes are
+# sampled by their probabilities, and the opponent picks its reply after seeing my option, as in decide_option. Returns
+# the opponent's most visited reply to each of my options, scored with the mean value of my option and sorted from most
+# to least visited.
+def decide_option_mcts(outcome, max_depth, time_budget, prediction_function, scalar, transposition_table=None,
+                       max_iterations=None, exploration=1, seed=0):
+    if time_budget is None and max_iterations is None:
+        raise Exception('A Monte Carlo search needs a time budget or an iteration limit')
+    root = create_state_node(outcome, max_depth)
+    # Without a choice of mine at the root there is nothing to sample, so the root is searched exhaustively
+    if root.decision not in [MY_TURN, MY_FORCED_SWITCH] or root.value is not None:
+        return decide_option(outcome, max_depth, prediction_function, scalar, transposition_table)
+
+    generator = random.Random(seed)
+    deadline = time.perf_counter() + time_budget if time_budget is not None else None
+    iterations = 0
+    while root.untriedOptions or ((max_iterations is None or iterations < max_iterations) and
+                                  (deadline is None or time.perf_counter() < deadline)):
+        run_iteration(root, prediction_function, scalar, transposition_table, exploration, generator)
+        iterations += 1
+    logging.info('Monte Carlo search ran ' + str(iterations) + ' iterations')
+    set_outcome_scores(root)
+
+    decisionList = []
+    for child in sorted(root.children, key=lambda child: child.visits, reverse=True):
+        if root.decision == MY_FORCED_SWITCH:
+            decisionList.append(child.outcome)
+            continue
+        # The reply the opponent settled on is the one it visited most
+        reply = max(child.children, key=lambda reply: reply.visits)
+        reply.outcome.set_score(child.get_mean_value())
+        decisionList.append(reply.outcome)
+    return decisionList
+
+
+# Sets the score of each decision's outcome to its mean value, so the principal variation follows the search's picks
+def set_outcome_scores(root):
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if node.visits > 0 and node.decision != LEAF:
+            node.outcome.set_score(node.get_mean_value())
+        stack += node.children
@@ -0,0 +1,544 @@
+import json
+import logging
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from copy import deepcopy
+from datetime import datetime
+from .calculations import *
+from .inference import load_prediction_model
+from .splitreason import SplitReason, describe_split
+from .transposition import TranspositionTable
+
+
+# A deferred decide_option result. Holds every node the result may resolve to, and a resolver which performs the
+# score backup once the leaf scores are known.
+class SearchPlan:
+    def __init__(self, candidates, resolver):
+        self.candidates = candidates
+        self.resolver = resolver
+
+    def resolve(self, scores):
+        return self.resolver(scores)
+
+
+# Collects the outcomes that need an AI model score so they can be evaluated with one prediction call
+class LeafBatch:
+    def __init__(self):
+        self.outcomes = []
+        self.outcomeIds = set()
+
+    def add(self, outcome_list):
+        for outcome in outcome_list:
+            if id(outcome) not in self.outcomeIds:
+                self.outcomeIds.add(id(outcome))
+                self.outcomes.append(outcome)
+
+    # Returns a dict of outcome id -> model score
+    def evaluate(self, prediction_function, scalar, transposition_table=None):
+        scores = calculate_scores(self.outcomes, prediction_function, scalar, transposition_table)
+        return {id(outcome): score for outcome, score in zip(self.outcomes, scores)}
+
+
+# Two-phase version of decide_option. The whole tree is expanded first, every leaf is scored with a single call to the
+# prediction function, and the scores are then backed up with the same logic as decide_option. A transposition table
+# is used for leaf scores only, since subtree results aren't known until the whole tree has been expanded.
+def decide_option_batched(outcome, turn_depth, prediction_function, scalar, transposition_table=None):
+    batch = LeafBatch()
+    plan = plan_option(outcome, turn_depth, batch)
+    scores = batch.evaluate(prediction_function, scalar, transposition_table)
+    return plan.resolve(scores)
+
+
+# Expands the tree the same way decide_option does, but defers every score dependent decision to the returned plan
+def plan_option(outcome, turn_depth, batch):
+    # Check if myself or opponent needs to switch in and look at possible switch options
+    if not outcome.battleState.myTeam[outcome.battleState.myLeadIndex].inBattle:
+        myPossibleOptions = get_my_forced_switch_options(outcome.battleState)
+        # If I have no lead, and no switch options, I've lost
+        if not myPossibleOptions:
+            outcome.set_score(0)
+            return SearchPlan([outcome], lambda scores: [outcome])
+
+        childPlans = []
+        for myOption in myPossibleOptions:
+            newNode = OutcomeNode(outcome, 1, SplitReason.MY_FORCED_SWITCH, (myOption[1],))
+            newNode.set_my_selected_option(myOption)
+            simulate_switch(newNode, True, myOption[1])
+            childPlans.append(plan_option(newNode, turn_depth - 1, batch))
+        return forced_switch_plan(childPlans, batch, True)
+
+    if not outcome.battleState.opponentTeam[outcome.battleState.opponentLeadIndex].inBattle:
+        opponentPossibleOptions = get_opponent_forced_switch_options(outcome.battleState)
+        # If opponent has no lead, and no switch options, I've won
+        if not opponentPossibleOptions:
+            outcome.set_score(1)
+            return SearchPlan([outcome], lambda scores: [outcome])
+
+        childPlans = []
+        for opponentOption in opponentPossibleOptions:
+            newNode = OutcomeNode(outcome, 1, SplitReason.OPPONENT_FORCED_SWITCH, (opponentOption[1],))
+            newNode.set_oppponent_selected_option(opponentOption)
+            simulate_switch(newNode, False, opponentOption[1])
+            childPlans.append(plan_option(newNode, turn_depth, batch))
+        return forced_switch_plan(childPlans, batch, False)
+
+    # Terminal Condition
+    if turn_depth <= 0:
+        return SearchPlan([outcome], lambda scores: [outcome])
+
+    myLead = outcome.battleState.myTeam[outcome.battleState.myLeadIndex]
+    opponentLead = outcome.battleState.opponentTeam[outcome.battleState.opponentLeadIndex]
+    myPossibleOptions, opponentPossibleOptions = get_turn_options(outcome)
+
+    # Expand every option pair. Each entry holds the opponent choice node and the plans for its leaves.
+    optionMatrix = []
+    opponentChoices = []
+    for myOption in myPossibleOptions:
+        optionRow = []
+        myChoice = OutcomeNode(outcome, 1, SplitReason.MY_TURN_DECISION)
+        myChoice.set_my_selected_option((myOption[0], myOption[1]))
+        for opponentOption in opponentPossibleOptions:
+            opponentChoice = OutcomeNode(myChoice, 1, SplitReason.OPPONENT_TURN_DECISION)
+            opponentChoice.set_oppponent_selected_option((opponentOption[0], opponentOption[1]))
+            nodeList = simulate_turn(opponentChoice, myLead, opponentLead,
+                                     myOption[0], opponentOption[0], myOption[1], opponentOption[1])
+            leafPlans = []
+            for possibleOutcome in nodeList:
+                leafPlan = plan_option(possibleOutcome, turn_depth - 1, batch)
+                batch.add(leafPlan.candidates)
+                leafPlans.append(leafPlan)
+            optionRow.append((opponentChoice, leafPlans))
+            opponentChoices.append(opponentChoice)
+        optionMatrix.append(optionRow)
+
+    def resolve(scores):
+        replyMatrix = []
+        for optionRow in optionMatrix:
+            oppOptionOutcomes = []
+            for opponentChoice, leafPlans in optionRow:
+                possibleOutcomes = []
+                for leafPlan in leafPlans:
+                    possibleOutcomes.append(leafPlan.resolve(scores)[0])
+                for possibleOutcome in possibleOutcomes:
+                    possibleOutcome.set_score(scores[id(possibleOutcome)])
+                opponentChoice.set_score(get_average_score(possibleOutcomes))
+                oppOptionOutcomes.append(opponentChoice)
+            replyMatrix.append(oppOptionOutcomes)
+        return select_option_outcomes(replyMatrix)
+
+    return SearchPlan(opponentChoices, resolve)
+
+
+# Returns the plan for a forced switch. I pick the best switch, my opponent picks the worst one for me.
+def forced_switch_plan(childPlans, batch, isMySwitch):
+    candidates = []
+    for childPlan in childPlans:
+        batch.add(childPlan.candidates)
+        candidates += childPlan.candidates
+
+    def resolve(scores):
+        possibleOutcomes = []
+        for childPlan in childPlans:
+            if isMySwitch:
+                possibleOutcomes.append(childPlan.resolve(scores)[0])
+            else:
+                possibleOutcomes.append(childPlan.resolve(scores)[-1])
+        for possibleOutcome in possibleOutcomes:
+            possibleOutcome.set_score(scores[id(possibleOutcome)])
+        if isMySwitch:
+            selectedOutcome = get_best_case(possibleOutcomes)
+        else:
+            selectedOutcome = get_worst_case(possibleOutcomes)
+        # Remove the other options from the children list
+        selectedOutcome.parent.set_children([selectedOutcome])
+        return [selectedOutcome]
+
+    return SearchPlan(candidates, resolve)
+
+
+# Node counts and timings for the searches run between start() and stop(). Replies are only counted by
+# decide_option_pruned, and the depth reached only by decide_option_iterative. The probability discarded is summed over
+# every option pair searched, so it can be more than 1. Memory is in MB, and is None where the platform doesn't report
+# it. Times are in seconds. The PARALLEL search adds up the times of its workers, so they can be more than the search
+# time.
+class SearchStatistics:
+    def __init__(self):
+        self.nodesCreated = 0
+        self.turnsSimulated = 0
+        self.outcomesMerged = 0
+        self.outcomesPruned = 0
+        self.probabilityDiscarded = 0
+        self.statesCopied = 0
+        self.damageCalculations = 0
+        self.modelCalls = 0
+        self.rowsScored = 0
+        self.simulationTime = 0
+        self.encodingTime = 0
+        self.inferenceTime = 0
+        self.backupTime = 0
+        self.searchTime = 0
+        self.depthReached = None
+        self.repliesSearched = 0
+        self.repliesPruned = 0
+        self.outcomesReleased = 0
+        self.peakRss = None
+        self.rssAfterRelease = None
+        # Counters of the caches added with add_cache, by cache name
+        self.caches = {}
+        self.startCounters = None
+        self.startTime = None
+
+    def start(self):
+        self.startCounters = dict(searchCounters)
+        reset_peak_rss()
+        self.startTime = time.perf_counter()
+
+    def stop(self):
+        self.searchTime += time.perf_counter() - self.startTime
+        self.add_counters(get_counter_changes(self.startCounters))
+        self.peakRss = get_peak_rss()
+
+    # Adds the changes in searchCounters from get_counter_changes, like the ones returned by the search workers
+    def add_counters(self, counter_changes):
+        self.nodesCreated += counter_changes['nodes']
+        self.turnsSimulated += counter_changes['turns']
+        self.outcomesMerged += counter_changes['merged']
+        self.outcomesPruned += counter_changes['pruned']
+        self.probabilityDiscarded += counter_changes['discarded']
+        self.statesCopied += counter_changes['copies']
+        self.damageCalculations += counter_changes['damage']
+        self.modelCalls += counter_changes['modelCalls']
+        self.rowsScored += counter_changes['rows']
+        self.simulationTime += counter_changes['simulationTime']
+        self.encodingTime += counter_changes['encodingTime']
+        self.inferenceTime += counter_changes['inferenceTime']
+        self.backupTime += counter_changes['backupTime']
+
+    # Keeps the cache's current counters. Transposition tables are cleared by make_decision_records, so they are added
+    # before it is called.
+    def add_cache(self, cache):
+        self.caches[cache.name] = {'hits': cache.hits, 'misses': cache.misses, 'evictions': cache.evictions,
+                                   'entries': len(cache)}
+
+    # Returns the statistics as a dict which can be written as JSON
+    def get_metrics(self):
+        return {'nodesCreated': self.nodesCreated, 'turnsSimulated': self.turnsSimulated,
+                'outcomesMerged': self.outcomesMerged, 'outcomesPruned': self.outcomesPruned,
+                'probabilityDiscarded': float(self.probabilityDiscarded), 'statesCopied': self.statesCopied,
+                'damageCalculations': self.damageCalculations, 'modelCalls': self.modelCalls,
+                'rowsScored': self.rowsScored, 'searchTime': self.searchTime, 'simulationTime': self.simulationTime,
+                'encodingTime': self.encodingTime, 'inferenceTime': self.inferenceTime, 'backupTime': self.backupTime,
+                'depthReached': self.depthReached, 'repliesSearched': self.repliesSearched,
+                'repliesPruned': self.repliesPruned, 'outcomesReleased': self.outcomesReleased, 'peakRss': self.peakRss,
+                'rssAfterRelease': self.rssAfterRelease, 'caches': self.caches}
+
+    def __str__(self):
+        return 'Search statistics: ' + str(self.nodesCreated) + ' nodes created, ' + str(self.turnsSimulated) + \
+            ' turns simulated, ' + str(self.outcomesMerged) + ' outcomes merged, ' + str(self.outcomesPruned) + \
+            ' outcomes pruned (' + str(round(self.probabilityDiscarded, 4)) + ' probability discarded), ' + \
+            str(self.statesCopied) + ' battle states copied, ' + str(self.damageCalculations) + \
+            ' damage calculations, ' + str(self.modelCalls) + ' model calls (' + str(self.rowsScored) + \
+            ' rows), ' + str(self.repliesSearched) + ' root replies searched, ' + str(self.repliesPruned) + \
+            ' root replies pruned, ' + str(self.outcomesReleased) + ' outcomes released, peak RSS ' + \
+            format_megabytes(self.peakRss) + ', RSS after release ' + format_megabytes(self.rssAfterRelease) + \
+            '. Searched for ' + str(round(self.searchTime, 3)) + 's: ' + str(round(self.simulationTime, 3)) + \
+            's simulating, ' + str(round(self.encodingTime, 3)) + 's encoding, ' + \
+            str(round(self.inferenceTime, 3)) + 's in the model, ' + str(round(self.backupTime, 3)) + \
+            's backing up scores'
+
+
+# Appends the search statistics to the metrics file as one JSON line, along with the given fields
+def write_search_metrics(path, statistics, fields=None):
+    metrics = {'time': datetime.now().isoformat(timespec='seconds')}
+    if fields is not None:
+        metrics.update(fields)
+    metrics.update(statistics.get_metrics())
+    with open(path, 'a', encoding='UTF8') as file:
+        file.write(json.dumps(metrics) + '\n')
+
+
+def format_megabytes(megabytes):
+    if megabytes is None:
+        return 'unavailable'
+    return str(round(megabytes, 1)) + ' MB'
+
+
+# Returns a line from /proc/self/status in MB, or None if it can't be read
+def read_process_status(field):
+    try:
+        with open('/proc/self/status') as file:
+            for line in file:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+# Returns the process's peak resident set size in MB, or None if the platform doesn't report it. On Linux this is the
+# peak since reset_peak_rss, elsewhere it is the peak since the process started.
+def get_peak_rss():
+    peakRss = read_process_status('VmHWM')
+    if peakRss is not None:
+        return peakRss
+    try:
+        import resource
+    except ImportError:
+        return None
+    peakRss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in KB on other platforms
+    if sys.platform == 'darwin':
+        return peakRss / 1024 / 1024
+    return peakRss / 1024
+
+
+# Returns the process's resident set size in MB, or None if it can't be read
+def get_rss():
+    return read_process_status('VmRSS')
+
+
+# Starts a new peak for get_peak_rss. Only Linux allows the peak to be reset.
+def reset_peak_rss():
+    try:
+        with open('/proc/self/clear_refs', 'w') as file:
+            file.write('5')
+    except OSError:
+        pass
+
+
+# What's kept of a search result once the tree is released: my option, the opponent's expected reply, the score and the
+# principal variation. battleState is the state at the root of the search, which select_option reads names from.
+class DecisionRecord:
+    def __init__(self, outcome):
+        root = outcome
+        while root.parent is not None:
+            root = root.parent
+        self.battleState = root.battleState
+        self.mySelectedOption = outcome.mySelectedOption
+        self.opponentSelectedOption = outcome.opponentSelectedOption
+        self.score = outcome.score
+        self.principalVariation = get_principal_variation(outcome)
+
+    def __str__(self):
+        return str(round(float(self.score), 4)) + ': ' + ', '.join(self.principalVariation)
+
+
+# Returns the line of play the search expects after a decision, as a list of descriptions. My options and the
+# opponent's replies are the ones the search picked, and chance outcomes are the most likely ones.
+def get_principal_variation(outcome):
+    variation = []
+    if outcome.parent is not None and outcome.parent.split_reason == SplitReason.MY_TURN_DECISION:
+        variation.append(describe_outcome(outcome.parent))
+    node = outcome
+    while True:
+        variation.append(describe_outcome(node))
+        scoredChildren = [child for child in node.children if child.score is not None]
+        if not node.children:
+            break
+        elif node.children[0].split_reason == SplitReason.MY_TURN_DECISION:
+            # My best option is the one with the best worst reply
+            node = max(node.children, key=lambda myChoice: min(
+                [reply.score for reply in myChoice.children if reply.score is not None] or [float('-inf')]))
+        elif node.children[0].split_reason == SplitReason.OPPONENT_TURN_DECISION and scoredChildren:
+            node = min(scoredChildren, key=lambda reply: reply.score)
+        else:
+            node = max(node.children, key=lambda child: child.probability)
+    return variation
+
+
+def describe_outcome(outcome):
+    if outcome.split_reason == SplitReason.MY_TURN_DECISION:
+        return 'I ' + describe_option(outcome.mySelectedOption, outcome.battleState.myTeam)
+    if outcome.split_reason == SplitReason.OPPONENT_TURN_DECISION:
+        return 'Opponent ' + describe_option(outcome.opponentSelectedOption, outcome.battleState.opponentTeam)
+    return describe_split(outcome.split_reason, outcome.splitDetails)
+
+
+def describe_option(option, team):
+    if option[0] is not None:
+        return 'used ' + option[0].name
+    return 'switched to ' + webInterface.peek_member(team, option[1]).name
+
+
+# Returns a DecisionRecord for each outcome in the decision list, then releases the search trees they came from and
+# clears the transposition table. The outcomes in the list can't be used afterwards.
+def make_decision_records(decision_list, transposition_table=None, statistics=None):
+    records = [DecisionRecord(outcome) for outcome in decision_list]
+    roots = {}
+    for outcome in decision_list:
+        while outcome.parent is not None:
+            outcome = outcome.parent
+        roots[id(outcome)] = outcome
+    released = sum(release_tree(root) for root in roots.values())
+    if transposition_table is not None:
+        transposition_table.clear()
+    if statistics is not None:
+        statistics.outcomesReleased += released
+        statistics.rssAfterRelease = get_rss()
+    return records
+
+
+# Returns how much each of the searchCounters has changed since start_counters was copied from it
+def get_counter_changes(start_counters):
+    return {key: searchCounters[key] - start_counters[key] for key in searchCounters}
+
+
+# Version of decide_option which stops searching one of my options as soon as an opponent reply leaves it no better
+# than an option already searched. The top option is the same as decide_option's, the options after it are ordered by
+# the worst reply found before they were cut off. Only the root is pruned, since the scores backed up at inner outcomes
+# average over every leaf below them. The cut off is a maximin bound, so the root always uses MAXIMIN option selection.
+def decide_option_pruned(outcome, turn_depth, prediction_function, scalar, transposition_table=None, deadline=None,
+                         statistics=None):
+    battleState = outcome.battleState
+    if turn_depth <= 0 or not battleState.myTeam[battleState.myLeadIndex].inBattle or \
+            not battleState.opponentTeam[battleState.opponentLeadIndex].inBattle:
+        return decide_option(outcome, turn_depth, prediction_function, scalar, transposition_table, deadline)
+
+    myPossibleOptions, opponentPossibleOptions, orderKey = get_ordered_turn_options(outcome, transposition_table)
+    myOptionOutcomes = []
+    bestScore = None
+    for myOption in myPossibleOptions:
+        oppOptionOutcomes = []
+        myChoice = OutcomeNode(outcome, 1, SplitReason.MY_TURN_DECISION)
+        myChoice.set_my_selected_option((myOption[0], myOption[1]))
+        for replyIndex in range(len(opponentPossibleOptions)):
+            opponentChoice = search_option_pair(myChoice, myOption, opponentPossibleOptions[replyIndex], turn_depth,
+                                                prediction_function, scalar, transposition_table, deadline)
+            oppOptionOutcomes.append(opponentChoice)
+            replyScore = get_average_score(opponentChoice.get_children())
+            if bestScore is not None and replyScore <= bestScore:
+                if statistics is not None:
+                    statistics.repliesPruned += len(opponentPossibleOptions) - replyIndex - 1
+                break
+        if statistics is not None:
+            statistics.repliesSearched += len(oppOptionOutcomes)
+        oppSelectedOptionScore = get_worst_outcome(oppOptionOutcomes)
+        myOptionOutcomes.append(oppSelectedOptionScore)
+        optionScore = get_average_score(oppSelectedOptionScore.get_children())
+        if bestScore is None or optionScore > bestScore:
+            bestScore = optionScore
+    sort_best_outcomes(myOptionOutcomes)
+    store_option_order(orderKey, myOptionOutcomes, transposition_table)
+    return myOptionOutcomes
+
+
+# Iterative deepening version of decide_option. Searches to depth 1, 2, 3... up to max_depth, and returns the option
+# list from the deepest search finished within time_budget seconds. Depth 1 is always searched to the end, so there is
+# always an option list to return. The transposition table carries leaf scores and option ordering from one
+# depth to the next. If prune is True, each depth is searched with decide_option_pruned.
+def decide_option_iterative(outcome, max_depth, time_budget, prediction_function, scalar, transposition_table=None,
+                            prune=False, statistics=None):
+    if transposition_table is None:
+        transposition_table = TranspositionTable()
+    deadline = time.perf_counter() + time_budget
+    battleState = deepcopy(outcome.battleState)
+    rootNode = outcome
+    previousRootNode = None
+    decisionList = None
+    for turnDepth in range(1, max_depth + 1):
+        if turnDepth > 1:
+            rootNode = OutcomeNode(deepcopy(battleState), 1, SplitReason.ROOT)
+        depthDeadline = deadline if turnDepth > 1 else None
+        try:
+            if prune:
+                decisionList = decide_option_pruned(rootNode, turnDepth, prediction_function, scalar,
+                                                    transposition_table, depthDeadline, statistics)
+            else:
+                decisionList = decide_option(rootNode, turnDepth, prediction_function, scalar, transposition_table,
+                                             depthDeadline)
+        except SearchTimeout:
+            logging.info('Search to depth ' + str(turnDepth) + ' ran out of time')
+            release_tree(rootNode)
+            break
+        # The shallower search's tree isn't needed once a deeper one has finished
+        if previousRootNode is not None:
+            release_tree(previousRootNode)
+        previousRootNode = rootNode
+        if statistics is not None:
+            statistics.depthReached = turnDepth
+        logging.info('Finished search to depth ' + str(turnDepth) + ' with ' +
+                     str(round(deadline - time.perf_counter(), 2)) + ' seconds left')
+        if time.perf_counter() >= deadline:
+            break
+    return decisionList
+
+
+# The model loaded by each search worker process
+searchWorkerModel = {}
+
+
+# Runs once in each search worker process, so the model is loaded and the search is set up before the first search
+def init_search_worker(model_name, inference_backend, use_inference_bundle, min_branch_probability, option_selection,
+                       max_opponent_replies, min_move_probability):
+    predictionFunction, scalar = load_prediction_model(model_name, inference_backend, use_inference_bundle)
+    searchWorkerModel['prediction_function'] = predictionFunction
+    searchWorkerModel['scalar'] = scalar
+    set_min_branch_probability(min_branch_probability)
+    set_option_selection(option_selection)
+    set_max_opponent_replies(max_opponent_replies)
+    set_min_move_probability(min_move_probability)
+
+
+# Returns a process pool for decide_option_parallel, with the model loaded in every worker
+def create_search_pool(workers, model_name, inference_backend='NUMPY', use_inference_bundle=True,
+                       min_branch_probability=0, option_selection='MAXIMIN', max_opponent_replies=None,
+                       min_move_probability=None):
+    return ProcessPoolExecutor(max_workers=workers, initializer=init_search_worker,
+                               initargs=(model_name, inference_backend, use_inference_bundle, min_branch_probability,
+                                         option_selection, max_opponent_replies, min_move_probability))
+
+
+# Runs in a search worker. Searches every opponent reply to my option at option_index, and returns the index of the
+# opponent's best reply, its score, and the changes in searchCounters.
+def search_root_option(battleState, option_index, option_count, turn_depth):
+    startCounters = dict(searchCounters)
+    rootNode = OutcomeNode(battleState, 1, SplitReason.ROOT)
+    myPossibleOptions, opponentPossibleOptions = get_turn_options(rootNode)
+    if len(myPossibleOptions) != option_count:
+        raise Exception('Search worker found ' + str(len(myPossibleOptions)) + ' options, expected ' +
+                        str(option_count))
+    myOption = myPossibleOptions[option_index]
+    myChoice = OutcomeNode(rootNode, 1, SplitReason.MY_TURN_DECISION)
+    myChoice.set_my_selected_option((myOption[0], myOption[1]))
+    transpositionTable = TranspositionTable()
+    oppOptionOutcomes = []
+    for opponentOption in opponentPossibleOptions:
+        oppOptionOutcomes.append(search_option_pair(myChoice, myOption, opponentOption, turn_depth,
+                                                    searchWorkerModel['prediction_function'],
+                                                    searchWorkerModel['scalar'], transpositionTable, None))
+    oppSelectedOptionScore = get_worst_outcome(oppOptionOutcomes)
+    return (oppOptionOutcomes.index(oppSelectedOptionScore), get_average_score(oppSelectedOptionScore.get_children()),
+            get_counter_changes(startCounters))
+
+
+# Version of decide_option which searches each of my options in a worker process from search_pool. Every option's
+# result is returned as my choice and the opponent's best reply, scored with the average of the reply's outcomes, and
+# sorted best first. The outcomes below the replies stay in the workers. prediction_function and scalar are only used
+# in this process, when a forced switch is needed. Each worker only sees one row of the root's payoff matrix, so the
+# root always uses MAXIMIN option selection.
+def decide_option_parallel(outcome, turn_depth, prediction_function, scalar, search_pool, statistics=None):
+    battleState = outcome.battleState
+    if turn_depth <= 0 or not battleState.myTeam[battleState.myLeadIndex].inBattle or \
+            not battleState.opponentTeam[battleState.opponentLeadIndex].inBattle:
+        return decide_option(outcome, turn_depth, prediction_function, scalar)
+
+    myPossibleOptions, opponentPossibleOptions = get_turn_options(outcome)
+    futures = [search_pool.submit(search_root_option, battleState, optionIndex, len(myPossibleOptions), turn_depth)
+               for optionIndex in range(len(myPossibleOptions))]
+    myOptionOutcomes = []
+    for myOption, future in zip(myPossibleOptions, futures):
+        replyIndex, score, counterChanges = future.result()
+        myChoice = OutcomeNode(outcome, 1, SplitReason.MY_TURN_DECISION)
+        myChoice.set_my_selected_option((myOption[0], myOption[1]))
+        opponentOption = opponentPossibleOptions[replyIndex]
+        opponentChoice = OutcomeNode(myChoice, 1, SplitReason.OPPONENT_TURN_DECISION)
+        opponentChoice.set_oppponent_selected_option((opponentOption[0], opponentOption[1]))
+        # The reply has no children here and a probability of 1, so sort_best_outcomes keeps this score
+        opponentChoice.set_score(score)
+        myOptionOutcomes.append(opponentChoice)
+        if statistics is not None:
+            statistics.add_counters(counterChanges)
+            statistics.repliesSearched += len(opponentPossibleOptions)
+    sort_best_outcomes(myOptionOutcomes)
+    return myOptionOutcomes
@@ -0,0 +1,102 @@
+from itertools import combinations
+
+# Moves in a random battle set
+SET_SIZE = 4
+# Status moves choice item sets can still carry
+CHOICE_STATUS_MOVES = ['trick', 'switcheroo']
+# Physical moves choice specs sets can still carry
+PIVOT_MOVES = ['u-turn', 'flip-turn']
+# Moves an item is only given with. A set with the item has at least one of them.
+ITEM_REQUIRED_MOVES = {
+    'Light Clay': ['reflect', 'light-screen', 'aurora-veil'],
+    'Chesto Berry': ['rest']
+}
+# Marginal move probabilities from get_move_probabilities, keyed by get_move_set_key
+moveProbabilityCache = {}
+
+
+# Returns True if a set of random battle moves could be given with the item. Choice items and assault vests are only
+# given to sets without status moves, choice band sets have no special attacks and choice specs sets have no physical
+# attacks other than pivot moves.
+def is_set_legal_with_item(moves, item):
+    damageClasses = [move.damage_class.name for move in moves]
+    if item in ['Choice Band', 'Choice Scarf', 'Choice Specs']:
+        if any(damageClass == 'status' and move.name not in CHOICE_STATUS_MOVES
+               for move, damageClass in zip(moves, damageClasses)):
+            return False
+        if item == 'Choice Band' and 'special' in damageClasses:
+            return False
+        if item == 'Choice Specs' and any(damageClass == 'physical' and move.name not in PIVOT_MOVES
+                                          for move, damageClass in zip(moves, damageClasses)):
+            return False
+    elif item == 'Assault Vest' and 'status' in damageClasses:
+        return False
+    if item in ITEM_REQUIRED_MOVES and not any(move.name in ITEM_REQUIRED_MOVES[item] for move in moves):
+        return False
+    return True
+
+
+# Returns the sets of 4 moves the pokemon could have, as tuples of moves, along with the probability of each. Every
+# set holds the pokemon's known moves and is filled from its possible moves. Each of the pokemon's possible items is
+# equally likely, and each set the item could be given with is equally likely. Items no set could be given with, given
+# the known moves, are ruled out.
+def get_move_set_distribution(pokemon):
+    knownNames = [move.name for move in pokemon.knownMoves]
+    if len(knownNames) >= SET_SIZE:
+        return [(tuple(pokemon.knownMoves), 1)]
+    unknownMoves = []
+    for move in pokemon.possibleMoves:
+        if move.name not in knownNames and move.name not in [unknown.name for unknown in unknownMoves]:
+            unknownMoves.append(move)
+    missing = min(SET_SIZE - len(knownNames), len(unknownMoves))
+    moveSets = [tuple(pokemon.knownMoves) + moves for moves in combinations(unknownMoves, missing)]
+    # Every set has an attack, if one could
+    attackingSets = [moveSet for moveSet in moveSets if any(move.damage_class.name != 'status' for move in moveSet)]
+    if attackingSets:
+        moveSets = attackingSets
+
+    items = pokemon.item if isinstance(pokemon.item, list) else [pokemon.item]
+    itemSets = [[moveSet for moveSet in moveSets if is_set_legal_with_item(moveSet, item)] for item in items]
+    itemSets = [legalSets for legalSets in itemSets if legalSets]
+    # Without an item the known moves fit, each set is equally likely
+    if not itemSets:
+        itemSets = [moveSets]
+    # Sets are keyed by their move names, since moves aren't hashable
+    distribution = {}
+    for legalSets in itemSets:
+        for moveSet in legalSets:
+            key = tuple(move.name for move in moveSet)
+            probability = distribution[key][1] if key in distribution else 0
+            distribution[key] = (moveSet, probability + 1 / (len(itemSets) * len(legalSets)))
+    return list(distribution.values())
+
+
+# Returns the key moveProbabilityCache stores the pokemon's move probabilities under
+def get_move_set_key(pokemon):
+    items = pokemon.item if isinstance(pokemon.item, list) else [pokemon.item]
+    return (tuple(move.name for move in pokemon.possibleMoves), tuple(sorted(move.name for move in pokemon.knownMoves)),
+            tuple(items))
+
+
+# Returns a dict of move name -> probability the move is in the pokemon's set, for its known and possible moves. Known
+# moves have a probability of 1, and possible moves no set could hold have a probability of 0.
+def get_move_probabilities(pokemon):
+    key = get_move_set_key(pokemon)
+    if key in moveProbabilityCache:
+        return moveProbabilityCache[key]
+    moveProbabilities = {move.name: 0 for move in pokemon.possibleMoves}
+    for moveSet, probability in get_move_set_distribution(pokemon):
+        for move in moveSet:
+            moveProbabilities[move.name] = moveProbabilities.get(move.name, 0) + probability
+    moveProbabilityCache[key] = moveProbabilities
+    return moveProbabilities
+
+
+# Returns the pokemon's possible moves which are in its set with at least the given probability, keeping their order.
+# Moves no set could hold are left out, unless min_probability is None, which returns every possible move.
+def get_likely_moves(pokemon, min_probability=0):
+    if min_probability is None:
+        return pokemon.possibleMoves
+    moveProbabilities = get_move_probabilities(pokemon)
+    return [move for move in pokemon.possibleMoves if moveProbabilities[move.name] > 0 and
+            moveProbabilities[move.name] >= min_probability]
@@ -0,0 +1,46 @@
+from enum import Enum
+
+
+# Why an outcome was split from its parent. Outcomes keep the reason and the names it refers to as split details, and
+# the description is only formatted when an outcome is described, so simulating a turn doesn't build strings. Each
+# value is the format string for the description, filled in with the split details in order.
+class SplitReason(Enum):
+    ROOT = 'Root'
+    MY_TURN_DECISION = 'My Turn decision'
+    OPPONENT_TURN_DECISION = 'Opponent Turn Decision'
+    MY_FORCED_SWITCH = 'My forced switch. Index: {0}'
+    OPPONENT_FORCED_SWITCH = 'Opponent forced switch. Index: {0}'
+    SPEED_TIE = 'Speed tie'
+    STAYED_ASLEEP = '{0} stayed asleep'
+    WOKE_UP = '{0} woke up'
+    FULLY_PARALYZED = "{0} can't move due to paralysis"
+    MOVED_THROUGH_PARALYSIS = '{0} paralyzed, but moved'
+    FROZEN = '{0} is frozen'
+    THAWED_OUT = '{0} thawed out'
+    SNAPPED_OUT_OF_CONFUSION = '{0} snapped out of confusion'
+    ATTACKED_THROUGH_CONFUSION = '{0} attacked through confusion'
+    HIT_ITSELF_IN_CONFUSION = '{0} hit itself in confusion'
+    MISSED = '{0} missed their attack'
+    HIT = '{0} hit their attack'
+    PROTECT_FAILED = '{0} failed their protect'
+    PROTECTED = '{0} protected'
+    KNOCKED_OUT = "{0}'s {1} KOd {2}"
+    SURVIVED = '{0} survived {1}'
+    INFLICTED_STATUS = "{0}'s {1} inflicted status"
+    DIDNT_INFLICT_STATUS = "{0}'s {1} didn't inflict side effect status"
+    FLINCHED = '{0} caused {1} to flinch'
+    DIDNT_FLINCH = "{0}'s {1} didn't flinch"
+    CHANGED_STATS = "{0}'s {1} caused a stat change"
+    DIDNT_CHANGE_STATS = "{0}'s {1} didn't cause stat change"
+    DIDNT_CONFUSE = "{0}'s {1} didn't confuse"
+    CAUSED_CONFUSION = "{0}'s {1} caused confusion"
+    # Outcomes merged because they reached the same battle state. The split details are the (reason, details) pairs of
+    # the merged outcomes.
+    MERGED = ' / '
+
+
+# Returns the description of a split reason, filled in with its split details
+def describe_split(split_reason, split_details):
+    if split_reason == SplitReason.MERGED:
+        return SplitReason.MERGED.value.join(describe_split(*merged) for merged in split_details)
+    return split_reason.value.format(*split_details)
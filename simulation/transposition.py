@@ -0,0 +1,135 @@
+import copy
+from collections import OrderedDict
+
+
+# Returns a hashable copy of a value made of dicts, lists and hashable values
+def freeze_value(value):
+    if isinstance(value, dict):
+        return tuple((key, freeze_value(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return tuple(freeze_value(item) for item in value)
+    return value
+
+
+# Returns a hashable fingerprint of everything about the pokemon which can change during a simulated turn. Moves,
+# possible sets and leveled stats are fixed for the turn being searched, so they are left out.
+def get_pokemon_fingerprint(pokemon):
+    ability = pokemon.ability
+    item = pokemon.item
+    return (pokemon.name, pokemon.hp, tuple(pokemon.type), tuple(ability) if isinstance(ability, list) else ability,
+            tuple(item) if isinstance(item, list) else item, pokemon.statusCondition, pokemon.sleepTurns,
+            pokemon.nextToxicDamage, tuple(pokemon.volatileConditions), pokemon.confusionTurns,
+            tuple(pokemon.boosts.values()), pokemon.substituteHP, tuple(pokemon.effectiveStats.values()),
+            pokemon.fainted, pokemon.inBattle, pokemon.isRevealed, pokemon.lastUsedMove, pokemon.isDynamaxed,
+            pokemon.turnsDynamaxed, pokemon.recharging, pokemon.hasMoved, pokemon.isProtected, pokemon.flinched,
+            pokemon.lastDamageTaken)
+
+
+def get_field_fingerprint(field):
+    return (field['reflect']['isUp'], field['reflect']['minTurns'], field['reflect']['maxTurns'],
+            field['lightScreen']['isUp'], field['lightScreen']['minTurns'], field['lightScreen']['maxTurns'],
+            field['auroraVeil']['isUp'], field['auroraVeil']['minTurns'], field['auroraVeil']['maxTurns'],
+            field['tailwind']['isUp'], field['tailwind']['turns'], tuple(field['entryHazards']))
+
+
+# Returns a hashable fingerprint of the battle state. Two battle states with the same fingerprint simulate and score
+# the same way.
+def get_battle_state_fingerprint(battleState):
+    return get_simulation_fingerprint(battleState) + (battleState.turnNumber,)
+
+
+# Returns the battle state fingerprint without the turn number, which simulating a turn doesn't read or change. A battle
+# state reached by simulating a turn has the same simulation fingerprint as the one scraped at the start of that turn.
+def get_simulation_fingerprint(battleState):
+    return (tuple([get_pokemon_fingerprint(member) for member in battleState.myTeam]),
+            tuple([get_pokemon_fingerprint(member) for member in battleState.opponentTeam]),
+            get_field_fingerprint(battleState.myField), get_field_fingerprint(battleState.opponentField),
+            freeze_value(battleState.weather), freeze_value(battleState.trickRoom), freeze_value(battleState.terrain),
+            battleState.elo, battleState.myLeadIndex, battleState.opponentLeadIndex, battleState.myDynamaxAvailable,
+            battleState.opponentDynamaxAvailable, battleState.iCanSwitch, battleState.opponentCanSwitch,
+            battleState.turnsUntilMyWish, battleState.turnsUntilOpponentWish)
+
+
+# Bounded cache for a turn's search, keyed by battle state fingerprints. Once full, the least recently used entry is
+# evicted. The name is used when the table's statistics are logged.
+class TranspositionTable:
+    def __init__(self, max_size=100000, name='Transposition table'):
+        self.maxSize = max_size
+        self.name = name
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # Returns the stored value, or None if the key isn't in the table
+    def get(self, key):
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return self.entries[key]
+        self.misses += 1
+        return None
+
+    def put(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.maxSize:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def get_hit_rate(self):
+        if self.hits + self.misses == 0:
+            return 0
+        return self.hits / (self.hits + self.misses)
+
+    def clear(self):
+        self.entries.clear()
+        self.reset_counters()
+
+    # Resets the hit, miss and eviction counts but keeps the entries
+    def reset_counters(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __str__(self):
+        return self.name + ': ' + str(self.hits) + ' hits, ' + str(self.misses) + ' misses (' + \
+            str(round(self.get_hit_rate() * 100, 1)) + '% hit rate), ' + str(self.evictions) + ' evictions, ' + \
+            str(len(self.entries)) + ' entries'
+
+
+# Returns a copy of the subtree below node. Nodes are copied, battle states are shared. Probabilities are multiplied
+# by scale, and nodeMap is filled with id(original node) -> copied node.
+def copy_subtree(node, parent, scale, nodeMap):
+    nodeCopy = copy.copy(node)
+    nodeCopy.parent = parent
+    nodeCopy.probability = node.probability * scale
+    # Selected options inherited from the parent are taken from the new parent
+    if parent is not None and node.parent is not None:
+        if node.mySelectedOption is node.parent.mySelectedOption:
+            nodeCopy.mySelectedOption = parent.mySelectedOption
+        if node.opponentSelectedOption is node.parent.opponentSelectedOption:
+            nodeCopy.opponentSelectedOption = parent.opponentSelectedOption
+    nodeMap[id(node)] = nodeCopy
+    nodeCopy.children = [copy_subtree(child, nodeCopy, scale, nodeMap) for child in node.children]
+    nodeCopy.rebuild_leaves()
+    return nodeCopy
+
+
+# Returns a detached copy of an expanded outcome and the decide_option result for it, for storing in the table
+def make_subtree_entry(outcome, result):
+    nodeMap = {}
+    snapshot = copy_subtree(outcome, None, 1, nodeMap)
+    return snapshot, [nodeMap[id(node)] for node in result]
+
+
+# Attaches a copy of a stored subtree below the given outcome, and returns the decide_option result for it
+def graft_subtree_entry(outcome, entry):
+    snapshot, result = entry
+    scale = outcome.probability / snapshot.probability
+    nodeMap = {id(snapshot): outcome}
+    outcome.set_children([copy_subtree(child, outcome, scale, nodeMap) for child in snapshot.children])
+    return [nodeMap[id(node)] for node in result]
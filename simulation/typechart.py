@@ -0,0 +1,57 @@
+import numpy as np
+
+# Types in the order of the type chart's rows and columns
+TYPES = ['normal', 'fighting', 'flying', 'poison', 'ground', 'rock', 'bug', 'ghost', 'steel', 'fire', 'water', 'grass',
+         'electric', 'psychic', 'ice', 'dragon', 'dark', 'fairy']
+defenderTypeIds = {type: index for index, type in enumerate(TYPES)}
+# Freeze-dry is super effective against water types, so it has its own attacking row after the 18 types
+attackTypeIds = dict(defenderTypeIds, **{'freeze-dry': len(TYPES)})
+# Second type index for single typed defenders
+NO_TYPE_ID = len(TYPES)
+
+# TYPE_CHART[attack type, defender type] is the effectiveness of an attack against a single type
+TYPE_CHART = np.array([
+    [1, 1, 1, 1, 1, .5, 1, 0, .5, 1, 1, 1, 1, 1, 1, 1, 1, 1],  # normal
+    [2, 1, .5, .5, 1, 2, .5, 0, 2, 1, 1, 1, 1, .5, 2, 1, 2, .5],  # fighting
+    [1, 2, 1, 1, 1, .5, 2, 1, .5, 1, 1, 2, .5, 1, 1, 1, 1, 1],  # flying
+    [1, 1, 1, .5, .5, .5, 1, .5, 0, 1, 1, 2, 1, 1, 1, 1, 1, 2],  # poison
+    [1, 1, 0, 2, 1, 2, .5, 1, 2, 2, 1, .5, 2, 1, 1, 1, 1, 1],  # ground
+    [1, .5, 2, 1, .5, .5, 2, 1, .5, 2, 1, 1, 1, 1, 2, 1, 1, 1],  # rock
+    [1, .5, .5, .5, 1, 1, 1, .5, .5, .5, 1, 2, 1, 2, 1, 1, 2, .5],  # bug
+    [0, 1, 1, 1, 1, 1, 1, 2, 1, 1, 1, 1, 1, 2, 1, 1, 2, 1],  # ghost
+    [1, 1, 1, 1, 1, 2, 1, 1, .5, .5, .5, 1, .5, 1, 2, 1, 1, 2],  # steel
+    [1, 1, 1, 1, 1, .5, 2, 1, 2, .5, .5, 2, 1, 1, 2, .5, 1, 1],  # fire
+    [1, 1, 1, 1, 2, 2, 1, 1, 1, 2, .5, .5, 1, 1, 1, .5, 1, 1],  # water
+    [1, 1, .5, .5, 2, 2, .5, 1, .5, .5, 2, .5, 1, 1, 1, .5, 1, 1],  # grass
+    [1, 1, 2, 1, 0, 1, 1, 1, 1, 1, 2, .5, .5, 1, 1, .5, 1, 1],  # electric
+    [1, 2, 1, 2, 1, 1, 1, 1, .5, 1, 1, 1, 1, .5, 1, 1, 0, 1],  # psychic
+    [1, 1, 2, 1, 2, 1, 1, 1, .5, .5, .5, 2, 1, 1, .5, 2, 1, 1],  # ice
+    [1, 1, 1, 1, 1, 1, 1, 1, .5, 1, 1, 1, 1, 1, 1, 2, 1, 0],  # dragon
+    [1, .5, 1, 1, 1, 1, 1, 2, 1, 1, 1, 1, 1, 2, 1, 1, .5, .5],  # dark
+    [1, 2, 1, .5, 1, 1, 1, 1, .5, .5, 1, 1, 1, 1, 1, 2, 2, 1],  # fairy
+    [1, 1, 2, 1, 2, 1, 1, 1, .5, .5, 2, 2, 1, 1, .5, 2, 1, 1],  # freeze-dry
+], dtype=np.float64)
+
+# DUAL_TYPE_CHART[attack type, type 1, type 2] is the effectiveness of an attack against a defender with both types.
+# type 2 is NO_TYPE_ID for single typed defenders.
+DUAL_TYPE_CHART = np.empty((len(attackTypeIds), len(TYPES), len(TYPES) + 1), dtype=np.float64)
+DUAL_TYPE_CHART[:, :, :NO_TYPE_ID] = TYPE_CHART[:, :, None] * TYPE_CHART[:, None, :]
+DUAL_TYPE_CHART[:, :, NO_TYPE_ID] = TYPE_CHART
+
+# Nested list copy of DUAL_TYPE_CHART. Indexing lists gives plain floats and is faster than indexing the array one
+# value at a time.
+dualTypeEffectiveness = DUAL_TYPE_CHART.tolist()
+
+
+# Returns the effectiveness of an attack type (or 'freeze-dry') against a defender's list of types
+def get_type_effectiveness(attack_type, defender_types):
+    attackRow = dualTypeEffectiveness[attackTypeIds[attack_type]]
+    if len(defender_types) == 1:
+        return attackRow[defenderTypeIds[defender_types[0]]][NO_TYPE_ID]
+    if len(defender_types) == 2:
+        return attackRow[defenderTypeIds[defender_types[0]]][defenderTypeIds[defender_types[1]]]
+    # Moves like forest's curse can give a defender a third type
+    typeEffectiveness = 1
+    for defenderType in defender_types:
+        typeEffectiveness *= attackRow[defenderTypeIds[defenderType]][NO_TYPE_ID]
+    return typeEffectiveness
@@ -0,0 +1,81 @@
+import random
+from types import SimpleNamespace
+import pytest
+import webInterface
+from simulation import TYPES, OutcomeNode, SplitReason, simulate_turn
+
+
+# Returns a random move with the attributes the simulation reads from a pokeapi move
+def make_random_move(generator):
+    ailment = generator.choice(['none', 'none', 'burn', 'paralysis', 'poison'])
+    return SimpleNamespace(name='move-' + str(generator.randrange(10 ** 6)), type=SimpleNamespace(
+        name=generator.choice(TYPES)), power=generator.choice([40, 60, 80, 90, 100, 120]),
+        accuracy=generator.choice([None, 100, 100, 90, 85]), priority=generator.choice([0, 0, 0, 1]),
+        damage_class=SimpleNamespace(name=generator.choice(['physical', 'special'])),
+        target=SimpleNamespace(name='selected-pokemon'), stat_changes=[], effect_chance=None,
+        meta=SimpleNamespace(ailment=SimpleNamespace(name=ailment), ailment_chance=0 if ailment == 'none' else 10,
+                             crit_rate=0, drain=0, healing=0, flinch_chance=0, category=SimpleNamespace(name='damage')))
+
+
+# Returns a random, fully revealed pokemon
+def make_random_pokemon(generator, name):
+    pokemon = webInterface.Pokemon()
+    pokemon.name = name
+    pokemon.level = generator.randrange(75, 90)
+    pokemon.hp = generator.choice([100, 100, generator.uniform(5, 100)])
+    pokemon.type = generator.sample(TYPES, generator.choice([1, 2]))
+    pokemon.ability = [generator.choice(['Overgrow', 'Blaze', 'Levitate', 'Intimidate', 'Pressure'])]
+    pokemon.weight = generator.randrange(50, 2000)
+    for stat in pokemon.leveledStats:
+        pokemon.leveledStats[stat] = generator.randrange(150, 350)
+    pokemon.item = [generator.choice(['Leftovers', 'Life Orb'])]
+    pokemon.knownMoves = [make_random_move(generator) for i in range(4)]
+    pokemon.possibleMoves = pokemon.knownMoves + [make_random_move(generator) for i in range(2)]
+    pokemon.maxMoves = []
+    pokemon.isRevealed = True
+    return pokemon
+
+
+# Returns a random battle state with full teams on both sides and both leads in battle
+def make_random_state(seed):
+    generator = random.Random(seed)
+    battleState = webInterface.BattleState()
+    battleState.elo = 1100
+    battleState.myTeam = [make_random_pokemon(generator, 'Mine' + str(i)) for i in range(6)]
+    battleState.opponentTeam = [make_random_pokemon(generator, 'Theirs' + str(i)) for i in range(6)]
+    battleState.myLeadIndex = 0
+    battleState.opponentLeadIndex = 0
+    battleState.myTeam[0].inBattle = True
+    battleState.opponentTeam[0].inBattle = True
+    battleState.myDynamaxAvailable = False
+    battleState.opponentDynamaxAvailable = False
+    for member in battleState.myTeam:
+        webInterface.calculate_effective_stats(member, battleState.myField, battleState)
+    for member in battleState.opponentTeam:
+        webInterface.calculate_effective_stats(member, battleState.opponentField, battleState)
+    return battleState
+
+
+# Returns the root and the leaves of the turn where both leads use their first move
+def get_turn_leaves(battleState):
+    rootNode = OutcomeNode(battleState, 1, SplitReason.ROOT)
+    myLead = battleState.myTeam[battleState.myLeadIndex]
+    opponentLead = battleState.opponentTeam[battleState.opponentLeadIndex]
+    myChoice = OutcomeNode(rootNode, 1, SplitReason.MY_TURN_DECISION)
+    myChoice.set_my_selected_option((myLead.knownMoves[0], None))
+    opponentChoice = OutcomeNode(myChoice, 1, SplitReason.OPPONENT_TURN_DECISION)
+    opponentChoice.set_oppponent_selected_option((opponentLead.knownMoves[0], None))
+    simulate_turn(opponentChoice, myLead, opponentLead, myLead.knownMoves[0], opponentLead.knownMoves[0], None, None)
+    return [rootNode] + opponentChoice.get_children()
+
+
+# Returns make_random_state, so tests can make the same battle state more than once
+@pytest.fixture
+def state_factory():
+    return make_random_state
+
+
+# Returns get_turn_leaves, so tests can simulate a turn below their own battle states
+@pytest.fixture
+def leaf_factory():
+    return get_turn_leaves
@@ -0,0 +1,52 @@
+import webInterface
+from simulation import OutcomeNode, SplitReason, get_turn_options, get_my_forced_switch_options, \
+    get_opponent_forced_switch_options, sort_options_by_static_score
+
+
+# Returns the indexes of the team's members which aren't shared with the other team
+def get_copied_indexes(team, other_team):
+    return [i for i in range(len(team))
+            if webInterface.peek_member(team, i) is not webInterface.peek_member(other_team, i)]
+
+
+# Finding the turn's options only reads the bench, so a child outcome only has its own copies of the leads
+def test_reading_options_does_not_copy_the_bench(state_factory):
+    for seed in range(5):
+        rootNode = OutcomeNode(state_factory(seed), 1, SplitReason.ROOT)
+        rootNode.battleState.opponentTeam[3].isRevealed = False
+        node = OutcomeNode(rootNode, 1, SplitReason.MY_TURN_DECISION)
+        battleState = node.battleState
+        myOptions, opponentOptions = get_turn_options(node)
+        get_my_forced_switch_options(battleState)
+        get_opponent_forced_switch_options(battleState)
+        sort_options_by_static_score(battleState, myOptions, True)
+        sort_options_by_static_score(battleState, opponentOptions, False)
+        assert get_copied_indexes(battleState.myTeam, rootNode.battleState.myTeam) == [battleState.myLeadIndex]
+        assert get_copied_indexes(battleState.opponentTeam, rootNode.battleState.opponentTeam) == \
+            [battleState.opponentLeadIndex]
+
+
+# Changing a member through an index only changes that battle state, whichever copy it is made on. Outcomes below the
+# root all hold copies, so the parent is a copy of the scraped battle state.
+def test_copies_do_not_share_changes(state_factory):
+    parent = state_factory(0).copy()
+    parent.myTeam[2].hp = 60
+    child = parent.copy()
+    sibling = parent.copy()
+    grandchild = child.copy()
+
+    child.myTeam[2].hp = 40
+    child.opponentTeam[4].boosts['Atk'] = 2
+    assert parent.myTeam[2].hp == 60
+    assert sibling.myTeam[2].hp == 60
+    assert grandchild.myTeam[2].hp == 60
+    assert parent.opponentTeam[4].boosts['Atk'] == 0
+    assert grandchild.opponentTeam[4].boosts['Atk'] == 0
+
+    grandchild.myTeam[2].fainted = True
+    parent.myTeam[3].statusCondition = 'BRN'
+    assert not child.myTeam[2].fainted
+    assert child.myTeam[2].hp == 40
+    assert child.myTeam[3].statusCondition is None
+    assert sibling.myTeam[3].statusCondition is None
+    assert grandchild.myTeam[3].statusCondition is None
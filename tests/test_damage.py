@@ -0,0 +1,79 @@
+import copy
+import pytest
+import webInterface
+import simulation.calculations as calculations
+from simulation import SplitReason, TranspositionTable, calculate_damage_core
+
+
+# Returns a random battle state where the opponent's faster lead attacks first with a move that can miss, splitting the
+# turn, and then my lead's water attack is absorbed by the opponent's lead. Attacks fail against a pokemon without an
+# item, so both leads hold an item which doesn't change the turn.
+def make_absorbing_state(state_factory, seed, ability):
+    battleState = state_factory(seed)
+    myLead = battleState.myTeam[battleState.myLeadIndex]
+    opponentLead = battleState.opponentTeam[battleState.opponentLeadIndex]
+    myMove = myLead.knownMoves[0]
+    myMove.type.name = 'water'
+    myMove.damage_class.name = 'special'
+    myMove.accuracy = 100
+    opponentMove = opponentLead.knownMoves[0]
+    opponentMove.power = 20
+    opponentMove.accuracy = 50
+    for pokemon, move in [(myLead, myMove), (opponentLead, opponentMove)]:
+        move.priority = 0
+        move.meta.ailment.name = 'none'
+        move.meta.ailment_chance = 0
+        pokemon.item = ['Heavy Duty Boots']
+    myLead.hp = 100
+    myLead.leveledStats['Spe'] = 1
+    opponentLead.leveledStats['Spe'] = 1000
+    opponentLead.ability = [ability]
+    opponentLead.hp = 50
+    webInterface.calculate_effective_stats(myLead, battleState.myField, battleState)
+    webInterface.calculate_effective_stats(opponentLead, battleState.opponentField, battleState)
+    return battleState
+
+
+# Returns the opponent choice node the leaf was simulated below
+def get_opponent_choice(leaf):
+    node = leaf
+    while node.split_reason != SplitReason.OPPONENT_TURN_DECISION:
+        node = node.parent
+    return node
+
+
+# Once the turn has split, an absorbed attack heals or boosts the defender in each leaf, and leaves the defender of the
+# outcome the turn split from alone. The results in the damage cache stay the same as the damage calculated without it.
+@pytest.mark.parametrize('ability', ['Water Absorb', 'Storm Drain'])
+def test_side_effects_only_change_the_leaves(ability, state_factory, leaf_factory):
+    calculations.damageCache = TranspositionTable(name='Damage cache')
+    try:
+        for seed in range(3):
+            battleState = make_absorbing_state(state_factory, seed, ability)
+            leaves = leaf_factory(battleState)[1:]
+            assert len(leaves) > 1
+            cachedResults = copy.deepcopy(list(calculations.damageCache.entries.values()))
+            # The same turn again takes its damage from the damage cache
+            leaf_factory(make_absorbing_state(state_factory, seed, ability))
+            assert calculations.damageCache.hits > 0
+            assert list(calculations.damageCache.entries.values()) == cachedResults
+
+            opponentChoice = get_opponent_choice(leaves[0]).battleState
+            splitLead = opponentChoice.opponentTeam[opponentChoice.opponentLeadIndex]
+            assert splitLead.hp == 50
+            assert splitLead.boosts['Spa'] == 0
+            for leaf in leaves:
+                leafLead = leaf.battleState.opponentTeam[leaf.battleState.opponentLeadIndex]
+                if ability == 'Water Absorb':
+                    assert leafLead.hp > 50
+                else:
+                    assert leafLead.boosts['Spa'] == 1
+
+            myLead = opponentChoice.myTeam[opponentChoice.myLeadIndex]
+            damage, sideEffects = calculate_damage_core(myLead, splitLead, myLead.knownMoves[0], False,
+                                                        opponentChoice.opponentField, opponentChoice)
+            assert damage == 0
+            assert (damage, sideEffects) in cachedResults
+            calculations.damageCache.clear()
+    finally:
+        calculations.damageCache = None
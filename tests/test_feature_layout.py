@@ -0,0 +1,58 @@
+import os
+import pickle
+import random
+import numpy as np
+from simulation import FeatureLayout, MODEL_DIRECTORY, get_score_features
+
+
+# Returns the scalar the models were trained with
+def load_scalar():
+    with open(os.path.join(MODEL_DIRECTORY, 'scalar.pkl'), 'rb') as file:
+        return pickle.load(file)
+
+
+# Returns the battle state with a random mix of the conditions the features encode
+def add_random_conditions(battleState, seed):
+    generator = random.Random(seed)
+    battleState.weather['type'] = generator.choice([None, 'Rain', 'Sun', 'Sandstorm', 'Hail'])
+    battleState.terrain['type'] = generator.choice([None, 'Electric Terrain', 'Grassy Terrain', 'Misty Terrain',
+                                                    'Psychic Terrain'])
+    battleState.opponentDynamaxAvailable = generator.choice([True, False])
+    for team, field in [(battleState.myTeam, battleState.myField),
+                        (battleState.opponentTeam, battleState.opponentField)]:
+        field['entryHazards'] = generator.sample(['Stealth Rock', 'Spikes', 'Sticky Web', 'Toxic Spikes'],
+                                                 generator.randrange(3))
+        field['reflect']['isUp'] = generator.choice([True, False])
+        for member in team:
+            member.statusCondition = generator.choice([None, None, 'BRN', 'PAR', 'PSN', 'TOX', 'SLP', 'FRZ'])
+            if member.statusCondition == 'SLP':
+                member.sleepTurns = 1
+            member.volatileConditions = generator.sample(['Confused', 'Encore', 'Leech Seed', 'Taunt'],
+                                                         generator.randrange(3))
+            for stat in member.boosts:
+                member.boosts[stat] = generator.randrange(-2, 3)
+        for member in team[1:]:
+            member.isRevealed = generator.choice([True, False])
+            if generator.random() < .3:
+                member.hp = 0
+                member.fainted = True
+    return battleState
+
+
+# The feature layout gives the columns and values of the pandas features, before and after scaling
+def test_feature_layout_matches_score_features(state_factory, leaf_factory):
+    scalar = load_scalar()
+    layout = FeatureLayout(scalar)
+    outcomes = []
+    for seed in range(10):
+        outcomes += leaf_factory(add_random_conditions(state_factory(seed), seed))
+    for outcome in outcomes:
+        features = get_score_features(outcome)
+        assert list(features.columns) == layout.columns
+        expected = features.to_numpy().astype('float64')
+        encoded = layout.encode_row(outcome.battleState)
+        assert np.array_equal(expected, encoded, equal_nan=True), \
+            [layout.columns[i] for i in np.flatnonzero(expected[0] != encoded[0])]
+        expected = np.asarray(scalar.transform(expected).astype('float32'))
+        encoded = np.asarray(scalar.transform(encoded).astype('float32'))
+        assert expected.tobytes() == encoded.tobytes()
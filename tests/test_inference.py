@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+from simulation import load_prediction_model, calculate_scores
+
+MODEL_NAMES = ['model1', 'model2', 'model3', 'model4']
+
+
+# Returns the root and turn leaves of ten random battle states
+def get_outcomes(state_factory, leaf_factory):
+    outcomes = []
+    for seed in range(10):
+        outcomes += leaf_factory(state_factory(seed))
+    return outcomes
+
+
+# The inference bundle scores leaves within the bundle tolerance of the model and scalar it was folded from
+@pytest.mark.parametrize('model_name', MODEL_NAMES)
+def test_inference_bundle_matches_unfused_scores(model_name, state_factory, leaf_factory):
+    outcomes = get_outcomes(state_factory, leaf_factory)
+    bundleFunction, bundleScalar = load_prediction_model(model_name, 'NUMPY', True)
+    predictionFunction, scalar = load_prediction_model(model_name, 'NUMPY', False)
+    assert bundleScalar is None
+    bundleScores = calculate_scores(outcomes, bundleFunction, bundleScalar)
+    scores = calculate_scores(outcomes, predictionFunction, scalar)
+    assert np.max(np.abs(np.asarray(bundleScores) - np.asarray(scores))) <= 1e-6
+
+
+# The NumPy engine scores leaves the same as the .h5 model loaded through Keras
+@pytest.mark.parametrize('model_name', ['model1', 'model2'])
+def test_numpy_engine_matches_keras(model_name, state_factory, leaf_factory):
+    pytest.importorskip('tensorflow')
+    outcomes = get_outcomes(state_factory, leaf_factory)
+    numpyFunction, scalar = load_prediction_model(model_name, 'NUMPY', False)
+    kerasFunction, scalar = load_prediction_model(model_name, 'KERAS', False)
+    numpyScores = calculate_scores(outcomes, numpyFunction, scalar)
+    kerasScores = calculate_scores(outcomes, kerasFunction, scalar)
+    # Keras runs the network in float32
+    assert np.max(np.abs(np.asarray(numpyScores) - np.asarray(kerasScores))) <= 1e-5
@@ -0,0 +1,20 @@
+from simulation import OutcomeNode, SplitReason
+
+
+# Every leaf below the outcome which isn't frozen or an end node is returned, from every branch rather than only the
+# last one, in the order the leaves were made
+def test_non_frozen_children_come_from_every_branch(state_factory):
+    rootNode = OutcomeNode(state_factory(0), 1, SplitReason.ROOT)
+    hit = OutcomeNode(rootNode, .75, SplitReason.HIT)
+    missed = OutcomeNode(rootNode, .25, SplitReason.MISSED)
+    leaves = [OutcomeNode(branch, .5, reason) for branch in [hit, missed]
+              for reason in [SplitReason.FLINCHED, SplitReason.DIDNT_FLINCH]]
+    leaves[1].freeze_node()
+    leaves[3].set_as_endNode()
+    assert rootNode.get_non_frozen_children() == [leaves[0], leaves[2]]
+    assert hit.get_non_frozen_children() == [leaves[0]]
+    assert leaves[0].get_non_frozen_children() == [leaves[0]]
+    assert leaves[1].get_non_frozen_children() == []
+
+    rootNode.unfreeze_nodes()
+    assert rootNode.get_non_frozen_children() == [leaves[0], leaves[1], leaves[2]]
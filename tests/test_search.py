@@ -0,0 +1,54 @@
+import pytest
+import simulation.calculations as calculations
+from simulation import OutcomeNode, SplitReason, SearchStatistics, load_prediction_model, decide_option, \
+    decide_option_pruned, get_option_key, get_average_score, get_turn_options, set_max_opponent_replies, \
+    sort_options_by_static_score, get_static_damage, get_ko_threshold
+
+
+# Returns the key and score of the top option in a decision list
+def get_top_option(decision_list):
+    return get_option_key(decision_list[0].mySelectedOption), get_average_score(decision_list[0].get_children())
+
+
+# The pruned search stops searching options which can't beat the best one, so it picks the same top option, with the
+# same score, as the exhaustive search
+def test_pruned_search_matches_exhaustive_top_option(state_factory):
+    predictionFunction, scalar = load_prediction_model('model3')
+    repliesPruned = 0
+    for seed in range(6):
+        exhaustive = decide_option(OutcomeNode(state_factory(seed), 1, SplitReason.ROOT), 1, predictionFunction,
+                                   scalar)
+        statistics = SearchStatistics()
+        pruned = decide_option_pruned(OutcomeNode(state_factory(seed), 1, SplitReason.ROOT), 1, predictionFunction,
+                                      scalar, None, None, statistics)
+        repliesPruned += statistics.repliesPruned
+        prunedOption, prunedScore = get_top_option(pruned)
+        exhaustiveOption, exhaustiveScore = get_top_option(exhaustive)
+        assert prunedOption == exhaustiveOption
+        assert prunedScore == pytest.approx(exhaustiveScore)
+    # The states have to give the pruning something to cut off
+    assert repliesPruned > 0
+
+
+# Every opponent reply is searched unless a limit is set. With one, the reply with the highest static score is kept
+# along with every attack the static estimate expects to KO my lead.
+def test_opponent_replies_are_only_narrowed_when_limited(state_factory):
+    assert calculations.maxOpponentReplies is None
+    try:
+        for seed in range(5):
+            node = OutcomeNode(state_factory(seed), 1, SplitReason.ROOT)
+            battleState = node.battleState
+            allReplies = get_turn_options(node)[1]
+            set_max_opponent_replies(1)
+            narrowedReplies = get_turn_options(node)[1]
+            set_max_opponent_replies(None)
+            myLead = battleState.myTeam[battleState.myLeadIndex]
+            opponentLead = battleState.opponentTeam[battleState.opponentLeadIndex]
+            koThreats = [option for option in allReplies if option[0] is not None and
+                         (get_static_damage(opponentLead, myLead, option[0], battleState.myField, battleState) or 0)
+                         >= get_ko_threshold(myLead)]
+            bestReply = sort_options_by_static_score(battleState, allReplies, False)[0]
+            assert [get_option_key(option) for option in narrowedReplies] == \
+                [get_option_key(option) for option in allReplies if option is bestReply or option in koThreats]
+    finally:
+        set_max_opponent_replies(None)
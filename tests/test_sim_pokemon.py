@@ -0,0 +1,39 @@
+import webInterface
+
+
+# A SimPokemon shares nothing with the scraped Pokemon it was made from, which is changed as the battle goes on, and
+# the values its copies share can't be changed in place
+def test_sim_pokemon_does_not_share_mutable_values(state_factory):
+    pokemon = state_factory(0).myTeam[1]
+    simPokemon = webInterface.SimPokemon.from_pokemon(pokemon)
+    pokemonCopy = simPokemon.copy()
+    pokemon.type.append('ghost')
+    pokemon.ability.append('Pressure')
+    pokemon.knownMoveNames.append('tackle')
+    pokemon.possibleMoves.append(pokemon.knownMoves[0])
+    pokemon.leveledStats['Atk'] += 1
+    for member in [simPokemon, pokemonCopy]:
+        assert 'ghost' not in member.type
+        assert len(member.ability) == 1
+        assert 'tackle' not in member.knownMoveNames
+        assert len(member.possibleMoves) == 6
+        assert member.leveledStats['Atk'] == pokemon.leveledStats['Atk'] - 1
+        for name in ['type', 'ability', 'knownMoveNames', 'knownMoves', 'possibleMoves', 'maxMoves']:
+            assert isinstance(getattr(member, name), tuple)
+    pokemonCopy.leveledStats['Spe'] += 1
+    assert simPokemon.leveledStats['Spe'] == pokemon.leveledStats['Spe']
+
+
+# SimPokemon gets the shared methods from PokemonBehaviour, and they change it the same way they change a Pokemon
+def test_sim_pokemon_behaves_like_pokemon(state_factory):
+    pokemon = state_factory(1).myTeam[0]
+    simPokemon = webInterface.SimPokemon.from_pokemon(pokemon)
+    assert not hasattr(simPokemon, '__dict__')
+    for member in [pokemon, simPokemon]:
+        member.take_damage(member.effectiveStats['HP'] / 4)
+        member.boost_stat('Atk', 2)
+        member.set_status_condition('SLP')
+        member.switch_out()
+    converted = simPokemon.to_pokemon()
+    for name in ['hp', 'boosts', 'statusCondition', 'inBattle', 'fainted', 'type', 'ability', 'knownMoves']:
+        assert getattr(converted, name) == getattr(pokemon, name)
@@ -0,0 +1,55 @@
+from collections import Counter
+import simulation.calculations as calculations
+from simulation import OutcomeNode, SplitReason, TranspositionTable, get_battle_state_fingerprint, simulate_turn, \
+    set_min_branch_probability
+
+
+# Simulates the turn where both leads use their first move, below an outcome with the given probability. Returns a
+# count of the leaves' (fingerprint, probability) pairs, with probabilities relative to the outcome.
+def simulate_leaves(battleState, probability):
+    rootNode = OutcomeNode(battleState, 1, SplitReason.ROOT)
+    myChoice = OutcomeNode(rootNode, probability, SplitReason.MY_TURN_DECISION)
+    myLead = battleState.myTeam[battleState.myLeadIndex]
+    opponentLead = battleState.opponentTeam[battleState.opponentLeadIndex]
+    myChoice.set_my_selected_option((myLead.knownMoves[0], None))
+    opponentChoice = OutcomeNode(myChoice, 1, SplitReason.OPPONENT_TURN_DECISION)
+    opponentChoice.set_oppponent_selected_option((opponentLead.knownMoves[0], None))
+    simulate_turn(opponentChoice, myLead, opponentLead, myLead.knownMoves[0], opponentLead.knownMoves[0], None, None)
+    return Counter((get_battle_state_fingerprint(leaf.battleState), round(leaf.probability / probability, 9))
+                   for leaf in opponentChoice.get_children())
+
+
+# The cache keeps turns unpruned and prunes them once copied, so a turn copied from the cache has the same leaves as one
+# simulated into it, whatever probability it was first simulated at
+def test_turn_cache_matches_at_other_probabilities(state_factory):
+    set_min_branch_probability(.05)
+    try:
+        for seed in range(10):
+            calculations.turnCache = TranspositionTable(name='Turn cache')
+            simulatedLow = simulate_leaves(state_factory(seed), .1)
+            copiedHigh = simulate_leaves(state_factory(seed), 1)
+            assert calculations.turnCache.hits == 1
+            calculations.turnCache = TranspositionTable(name='Turn cache')
+            simulatedHigh = simulate_leaves(state_factory(seed), 1)
+            copiedLow = simulate_leaves(state_factory(seed), .1)
+            assert calculations.turnCache.hits == 1
+            assert copiedHigh == simulatedHigh
+            assert copiedLow == simulatedLow
+    finally:
+        calculations.turnCache = None
+        set_min_branch_probability(0)
+
+
+# Without min branch probability, the cache gives the same leaves as simulating the turn without it
+def test_turn_cache_matches_uncached_turns(state_factory):
+    for seed in range(10):
+        calculations.turnCache = None
+        uncached = simulate_leaves(state_factory(seed), 1)
+        calculations.turnCache = TranspositionTable(name='Turn cache')
+        try:
+            simulated = simulate_leaves(state_factory(seed), 1)
+            copied = simulate_leaves(state_factory(seed), 1)
+        finally:
+            calculations.turnCache = None
+        assert simulated == uncached
+        assert copied == uncached
@@ -11,73 +11,10 @@ from selenium.webdriver.common.action_chains import ActionChains
 from selenium.webdriver.common.by import By
 
 
-class Pokemon:
-    def __init__(self):
-        self.lookupPerformed = False
-        self.name = None
-        self.level = -1
-        self.hp = 100  # As %
-        self.type = []
-        self.ability = None
-        self.weight = 0
-        self.leveledStats = {
-            'HP': None,
-            'Atk': None,
-            'Def': None,
-            'Spa': None,
-            'SpD': None,
-            'Spe': None
-        }
-        self.effectiveStats = {
-            'HP': None,
-            'Atk': None,
-            'Def': None,
-            'Spa': None,
-            'SpD': None,
-            'Spe': None
-        }
-        self.fainted = False
-        self.inBattle = False
-        self.item = []
-        self.statusCondition = None  # Brn, Psn, Tox, Par, Slp, Frz
-        self.sleepTurns = None
-        self.nextToxicDamage = None
-        self.volatileConditions = []  # Confusion, Drowsy, Encore, Infatuation, Taunt
-        self.confusionTurns = 0
-        self.boosts = {
-            'Atk': 0,
-            'Def': 0,
-            'Spa': 0,
-            'SpD': 0,
-            'Spe': 0,
-            'Acc': 0,
-            'Eva': 0
-        }
-        self.substituteHP = 0
-        self.isRevealed = False
-        self.knownMoveNames = []
-        self.knownMoves = []
-        self.possibleMoves = []
-        self.maxMoves = []
-        self.lastUsedMove = None
-        self.isDynamaxed = False
-        self.turnsDynamaxed = 0
-        self.recharging = False
-        self.hasMoved = False
-        self.isProtected = False
-        self.flinched = False
-        self.lastDamageTaken = 0
-
-    def __deepcopy__(self, memodict={}):
-        cls = self.__class__
-        result = cls.__new__(cls)
-        memodict[id(self)] = result
-        for k, v in self.__dict__.items():
-            if k in ['knownMoveNames', 'knownMoves', 'possibleMoves', 'maxMoves', 'lastUsedMove', 'type']:
-                setattr(result, k, v)
-            else:
-                setattr(result, k, deepcopy(v, memodict))
-        return result
+# Behaviour shared by Pokemon and SimPokemon. The methods only use attributes both classes have, and the class keeps
+# no state of its own, so SimPokemon keeps its __slots__.
+class PokemonBehaviour:
+    __slots__ = ()
 
     def heal(self, health):
         currentHp = self.effectiveStats['HP'] * (self.hp * .01)
@@ -178,29 +115,6 @@ class Pokemon:
         if self.statusCondition is None:
             self.statusCondition = status
 
-    def add_volatile_condition(self, condition):
-        if self.substituteHP != 0 or condition in self.volatileConditions:
-            return
-
-        if self.lastUsedMove is None and condition == 'Encore':
-            return
-
-        # Type immunities
-        if 'grass' in self.type and condition == 'Leech Seed':
-            return
-
-        # Ability Immunities
-        if 'Oblivious' in self.ability and condition == 'Taunt':
-            return
-        elif 'Own Tempo' in self.ability and condition == 'Confused':
-            return
-
-        self.volatileConditions.append(condition)
-
-    def remove_volatile_condition(self, condition):
-        if condition in self.volatileConditions:
-            self.volatileConditions.remove(condition)
-
     def switch_out(self):
         self.substituteHP = 0
         self.inBattle = False
@@ -276,6 +190,316 @@ class Pokemon:
         self.lastUsedMove = move
 
 
+class Pokemon(PokemonBehaviour):
+    def __init__(self):
+        self.lookupPerformed = False
+        self.name = None
+        self.level = -1
+        self.hp = 100  # As %
+        self.type = []
+        self.ability = None
+        self.weight = 0
+        self.leveledStats = {
+            'HP': None,
+            'Atk': None,
+            'Def': None,
+            'Spa': None,
+            'SpD': None,
+            'Spe': None
+        }
+        self.effectiveStats = {
+            'HP': None,
+            'Atk': None,
+            'Def': None,
+            'Spa': None,
+            'SpD': None,
+            'Spe': None
+        }
+        self.fainted = False
+        self.inBattle = False
+        self.item = []
+        self.statusCondition = None  # Brn, Psn, Tox, Par, Slp, Frz
+        self.sleepTurns = None
+        self.nextToxicDamage = None
+        self.volatileConditions = []  # Confusion, Drowsy, Encore, Infatuation, Taunt
+        self.confusionTurns = 0
+        self.boosts = {
+            'Atk': 0,
+            'Def': 0,
+            'Spa': 0,
+            'SpD': 0,
+            'Spe': 0,
+            'Acc': 0,
+            'Eva': 0
+        }
+        self.substituteHP = 0
+        self.isRevealed = False
+        self.knownMoveNames = []
+        self.knownMoves = []
+        self.possibleMoves = []
+        self.maxMoves = []
+        self.lastUsedMove = None
+        self.isDynamaxed = False
+        self.turnsDynamaxed = 0
+        self.recharging = False
+        self.hasMoved = False
+        self.isProtected = False
+        self.flinched = False
+        self.lastDamageTaken = 0
+
+    def __deepcopy__(self, memodict={}):
+        cls = self.__class__
+        result = cls.__new__(cls)
+        memodict[id(self)] = result
+        for k, v in self.__dict__.items():
+            if k in ['knownMoveNames', 'knownMoves', 'possibleMoves', 'maxMoves', 'lastUsedMove', 'type']:
+                setattr(result, k, v)
+            else:
+                setattr(result, k, deepcopy(v, memodict))
+        return result
+
+    # Returns a copy for a copy-on-write team. Battle states copied for the search hold SimPokemon, so the copy is one.
+    def copy(self):
+        return SimPokemon.from_pokemon(self)
+
+    def add_volatile_condition(self, condition):
+        if self.substituteHP != 0 or condition in self.volatileConditions:
+            return
+
+        if self.lastUsedMove is None and condition == 'Encore':
+            return
+
+        # Type immunities
+        if 'grass' in self.type and condition == 'Leech Seed':
+            return
+
+        # Ability Immunities
+        if 'Oblivious' in self.ability and condition == 'Taunt':
+            return
+        elif 'Own Tempo' in self.ability and condition == 'Confused':
+            return
+
+        self.volatileConditions.append(condition)
+
+    def remove_volatile_condition(self, condition):
+        if condition in self.volatileConditions:
+            self.volatileConditions.remove(condition)
+
+
+# Volatile conditions a SimPokemon keeps as bitflags, in the order they're listed by volatileConditions. Any other
+# condition scraped from the battle is kept by name in otherVolatileConditions.
+VOLATILE_CONDITIONS = ['Confused', 'Drowsy', 'Encore', 'Infatuation', 'Leech Seed', 'Taunt']
+volatileConditionFlags = {condition: 1 << index for index, condition in enumerate(VOLATILE_CONDITIONS)}
+
+
+# Returns the bitflags for a list of volatile conditions, and a tuple of the conditions which don't have a flag
+def get_volatile_flags(conditions):
+    flags = 0
+    otherConditions = []
+    for condition in conditions:
+        if condition in volatileConditionFlags:
+            flags |= volatileConditionFlags[condition]
+        elif condition not in otherConditions:
+            otherConditions.append(condition)
+    return flags, tuple(otherConditions)
+
+
+# The Pokemon used by the search. It has the same attributes and methods as Pokemon, but keeps them in __slots__ and
+# its volatile conditions in bitflags, so it's smaller and much cheaper to copy. Types, abilities and moves are kept as
+# tuples, so copies can share them without one copy changing another.
+class SimPokemon(PokemonBehaviour):
+    __slots__ = ('lookupPerformed', 'name', 'level', 'hp', 'type', 'ability', 'weight', 'leveledStats',
+                 'effectiveStats', 'fainted', 'inBattle', 'item', 'statusCondition', 'sleepTurns', 'nextToxicDamage',
+                 'volatileFlags', 'otherVolatileConditions', 'confusionTurns', 'boosts', 'substituteHP', 'isRevealed',
+                 'knownMoveNames', 'knownMoves', 'possibleMoves', 'maxMoves', 'lastUsedMove', 'isDynamaxed',
+                 'turnsDynamaxed', 'recharging', 'hasMoved', 'isProtected', 'protected', 'flinched',
+                 'lastDamageTaken')
+
+    # Volatile conditions as a tuple of names. Conditions are changed with add_volatile_condition,
+    # remove_volatile_condition, or by setting a new list.
+    @property
+    def volatileConditions(self):
+        flags = self.volatileFlags
+        if not flags:
+            return self.otherVolatileConditions
+        return tuple([condition for condition in VOLATILE_CONDITIONS if flags & volatileConditionFlags[condition]]) \
+            + self.otherVolatileConditions
+
+    @volatileConditions.setter
+    def volatileConditions(self, conditions):
+        self.volatileFlags, self.otherVolatileConditions = get_volatile_flags(conditions)
+
+    def has_volatile_condition(self, condition):
+        if condition in volatileConditionFlags:
+            return bool(self.volatileFlags & volatileConditionFlags[condition])
+        return condition in self.otherVolatileConditions
+
+    def add_volatile_condition(self, condition):
+        if self.substituteHP != 0 or self.has_volatile_condition(condition):
+            return
+
+        if self.lastUsedMove is None and condition == 'Encore':
+            return
+
+        # Type immunities
+        if 'grass' in self.type and condition == 'Leech Seed':
+            return
+
+        # Ability Immunities
+        if 'Oblivious' in self.ability and condition == 'Taunt':
+            return
+        elif 'Own Tempo' in self.ability and condition == 'Confused':
+            return
+
+        if condition in volatileConditionFlags:
+            self.volatileFlags |= volatileConditionFlags[condition]
+        else:
+            self.otherVolatileConditions += (condition,)
+
+    def remove_volatile_condition(self, condition):
+        if condition in volatileConditionFlags:
+            self.volatileFlags &= ~volatileConditionFlags[condition]
+        elif condition in self.otherVolatileConditions:
+            self.otherVolatileConditions = tuple([other for other in self.otherVolatileConditions
+                                                  if other != condition])
+
+    # Returns a copy for a child outcome. The dicts and the item list are copied, and the tuples are shared.
+    def copy(self):
+        result = SimPokemon.__new__(SimPokemon)
+        result.lookupPerformed = self.lookupPerformed
+        result.name = self.name
+        result.level = self.level
+        result.hp = self.hp
+        result.type = self.type
+        result.ability = self.ability
+        result.weight = self.weight
+        result.leveledStats = self.leveledStats.copy()
+        result.effectiveStats = self.effectiveStats.copy()
+        result.fainted = self.fainted
+        result.inBattle = self.inBattle
+        result.item = self.item.copy() if isinstance(self.item, list) else self.item
+        result.statusCondition = self.statusCondition
+        result.sleepTurns = self.sleepTurns
+        result.nextToxicDamage = self.nextToxicDamage
+        result.volatileFlags = self.volatileFlags
+        result.otherVolatileConditions = self.otherVolatileConditions
+        result.confusionTurns = self.confusionTurns
+        result.boosts = self.boosts.copy()
+        result.substituteHP = self.substituteHP
+        result.isRevealed = self.isRevealed
+        result.knownMoveNames = self.knownMoveNames
+        result.knownMoves = self.knownMoves
+        result.possibleMoves = self.possibleMoves
+        result.maxMoves = self.maxMoves
+        result.lastUsedMove = self.lastUsedMove
+        result.isDynamaxed = self.isDynamaxed
+        result.turnsDynamaxed = self.turnsDynamaxed
+        result.recharging = self.recharging
+        result.hasMoved = self.hasMoved
+        result.isProtected = self.isProtected
+        result.protected = self.protected
+        result.flinched = self.flinched
+        result.lastDamageTaken = self.lastDamageTaken
+        return result
+
+    def __deepcopy__(self, memodict={}):
+        result = self.copy()
+        memodict[id(self)] = result
+        return result
+
+    # Returns a SimPokemon with the same state as a scraped Pokemon. Nothing is shared with the scraped Pokemon, which
+    # is changed as the battle goes on.
+    @staticmethod
+    def from_pokemon(pokemon):
+        result = SimPokemon.__new__(SimPokemon)
+        for name in SimPokemon.__slots__:
+            if name not in ['volatileFlags', 'otherVolatileConditions', 'protected']:
+                setattr(result, name, getattr(pokemon, name))
+        result.type = tuple(pokemon.type)
+        result.ability = tuple(pokemon.ability) if isinstance(pokemon.ability, list) else pokemon.ability
+        result.leveledStats = pokemon.leveledStats.copy()
+        result.effectiveStats = pokemon.effectiveStats.copy()
+        result.boosts = pokemon.boosts.copy()
+        result.item = pokemon.item.copy() if isinstance(pokemon.item, list) else pokemon.item
+        result.knownMoveNames = tuple(pokemon.knownMoveNames)
+        result.knownMoves = tuple(pokemon.knownMoves)
+        result.possibleMoves = tuple(pokemon.possibleMoves)
+        result.maxMoves = tuple(pokemon.maxMoves)
+        result.volatileConditions = pokemon.volatileConditions
+        result.protected = getattr(pokemon, 'protected', False)
+        return result
+
+    # Returns a scraped Pokemon with the same state as this SimPokemon
+    def to_pokemon(self):
+        result = Pokemon()
+        for name in SimPokemon.__slots__:
+            if name not in ['volatileFlags', 'otherVolatileConditions']:
+                setattr(result, name, getattr(self, name))
+        result.leveledStats = self.leveledStats.copy()
+        result.effectiveStats = self.effectiveStats.copy()
+        result.boosts = self.boosts.copy()
+        result.type = list(self.type)
+        result.ability = list(self.ability) if isinstance(self.ability, tuple) else self.ability
+        result.item = self.item.copy() if isinstance(self.item, list) else self.item
+        result.knownMoveNames = list(self.knownMoveNames)
+        result.knownMoves = list(self.knownMoves)
+        result.possibleMoves = list(self.possibleMoves)
+        result.maxMoves = list(self.maxMoves)
+        result.volatileConditions = list(self.volatileConditions)
+        return result
+
+
+# A team which shares its members with the team it was copied from. A member is copied the first time it's taken by
+# index, so only the members a simulated turn touches are copied. Iterating over the team or reading a member with
+# peek_member doesn't copy anything, so members must be changed through an index, e.g. team[i].hp = 0.
+class CopyOnWriteTeam(list):
+    def __init__(self, members, owned_indexes=()):
+        super().__init__(members)
+        # Indexes of the members which were copied for this team, and aren't shared with any other team
+        self.ownedIndexes = set(owned_indexes)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        member = list.__getitem__(self, index)
+        if index not in self.ownedIndexes:
+            member = member.copy()
+            list.__setitem__(self, index, member)
+            self.ownedIndexes.add(index)
+        return member
+
+    def __setitem__(self, index, member):
+        list.__setitem__(self, index, member)
+        if not isinstance(index, slice):
+            self.ownedIndexes.add(index % len(self))
+
+
+# Returns the team member at the index without copying it, from a CopyOnWriteTeam or a list. The member may be shared
+# with other teams, so it must only be read.
+def peek_member(team, index):
+    return list.__getitem__(team, index)
+
+
+# Returns a copy of a team which shares every member with the given team except the lead, which is copied straight
+# away. Members of the given team which are now shared are copied again the next time they're taken by index.
+def copy_team(team, lead_index):
+    if isinstance(team, CopyOnWriteTeam):
+        team.ownedIndexes &= {lead_index}
+    teamCopy = CopyOnWriteTeam(list.__iter__(team))
+    # The lead is almost always changed by a simulated turn, and copying it here keeps checks like
+    # member is team[leadIndex] working while iterating over the team
+    if lead_index is not None and lead_index < len(teamCopy):
+        teamCopy[lead_index]
+    return teamCopy
+
+
+# Returns a copy of a field, weather, terrain or trick room dict
+def copy_field(field):
+    return {key: value.copy() if isinstance(value, (dict, list)) else value for key, value in field.items()}
+
+
 class BattleState:
     def __init__(self):
         self.opponentName = ''
@@ -328,6 +552,24 @@ class BattleState:
             setattr(result, k, deepcopy(v, memodict))
         return result
 
+    # Returns a copy-on-write copy for a child outcome. The teams share their members with this battle state, and a
+    # member is only copied once it's taken by index. The field dicts are small, so they're copied straight away.
+    def copy(self):
+        cls = self.__class__
+        result = cls.__new__(cls)
+        for k, v in self.__dict__.items():
+            if k == 'myTeam':
+                setattr(result, k, copy_team(v, self.myLeadIndex))
+            elif k == 'opponentTeam':
+                setattr(result, k, copy_team(v, self.opponentLeadIndex))
+            elif isinstance(v, dict):
+                setattr(result, k, copy_field(v))
+            elif isinstance(v, list):
+                setattr(result, k, v.copy())
+            else:
+                setattr(result, k, v)
+        return result
+
     def my_switch(self, index):
         if index == self.myLeadIndex:
             raise Exception("Switch index can't be the same as my team's lead index. Lead index = "
@@ -564,7 +806,7 @@ class BattleState:
             self.opponentTeam[self.opponentLeadIndex].nextToxicDamage += 6.25
         # Convert drowsy
         if 'drowsy' in self.myTeam[self.myLeadIndex].volatileConditions:
-            self.myTeam[self.myLeadIndex].volatileConditions.remove('Drowsy')
+            self.myTeam[self.myLeadIndex].remove_volatile_condition('Drowsy')
             if self.myTeam[self.myLeadIndex].statusCondition is None:
                 self.myTeam[self.myLeadIndex].statusCondition = 'SLP'
         # Remove flinch
@@ -1431,7 +1673,7 @@ def get_pokemon_index(team, pokemonName):
 # Fills in known moves from previous team in battle state object. Returns pokemon object
 def fill_known_moves(pokemon, previousPokemon):
     # Fill possible moves using previous BattleState team array if it exists.
-    logging.info('Grabbing possible moves for ' + pokemon.name)
+    logging.info('Grabbing possible moves for %s', pokemon.name)
     returnList = []
     if previousPokemon is not None:
         returnList = previousPokemon.knownMoves